@@ -4,6 +4,7 @@ import ctypes
 import platform
 import sys
 import os
+import threading
 from Config import Config
 
 
@@ -25,6 +26,8 @@ class Log:
         self.ansi_terminal = _check_ansi()
         self.warnings_count = 0
         self.errors_count = 0
+        # Messages can be written from several threads, e.g. by the stages of the article pipeline
+        self._lock = threading.RLock()
 
     def log_config(self, in_terminal: bool = False):
         if (in_terminal):
@@ -38,19 +41,21 @@ class Log:
 
     def show_log_in_terminal(self, type, message, stop_script=False):
         # Show log in terminal
-        self.log_config(True)
-        self._count_errorwarning(type)
-        self.message(type, message)
+        with self._lock:
+            self.log_config(True)
+            self._count_errorwarning(type)
+            self.message(type, message)
         if (stop_script is True):
             exit()
 
     def write_log_in_file(self, type, message, show_in_terminal=False, stop_script=False):
         # Show log in file
-        self.log_config(False)
-        self._count_errorwarning(type)
-        if (show_in_terminal is True):
-            print(datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3] + ":" + self._format_messagetype_ansi(type.upper()) + ": " + message)
-        self.message(type, message)
+        with self._lock:
+            self.log_config(False)
+            self._count_errorwarning(type)
+            if (show_in_terminal is True):
+                print(datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3] + ":" + self._format_messagetype_ansi(type.upper()) + ": " + message)
+            self.message(type, message)
         if (stop_script is True):
             exit()
 
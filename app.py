@@ -2,11 +2,13 @@ import os
 import argparse
 from version import __version__, __commit__
 from Log import Log
-from figshare.Utils import inspect_dart, upload_to_remote, get_archival_staging_storage
+from figshare.Utils import inspect_dart, upload_to_remote, get_archival_staging_storage, get_preserved_packages_index
+from figshare.Utils import get_harvest_state, get_figshare_client
 from figshare.Article import Article
 from datetime import datetime
 from Config import Config
 from figshare.Collection import Collection
+from figshare.Client import async_harvest_available
 from pathlib import Path
 
 args = None
@@ -28,6 +30,29 @@ def get_args():
                         help='Checks if a preservation package exists in remote staging storage.')
     parser.add_argument('--dry-run', action='store_true',
                         help='Fetch, match and verify items only. Do not download, delete, or upload to preservation any files.')
+    parser.add_argument('--rebuild-aptrust-index', action='store_true',
+                        help='Discard the local index of archival storage (AP Trust) objects and fetch all objects again.')
+    parser.add_argument('--full-curation-scan', action='store_true',
+                        help='Scan all folders in curation storage instead of only the folders changed since the previous run.')
+    parser.add_argument('--async-harvest', action='store_true',
+                        help='Fetch items from the Figshare API with asyncio instead of threads. Requires aiohttp.')
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help='Do not use or update the on-disk cache of Figshare version metadata.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of articles processed at the same time. Versions of the same article are processed one after the other.')
+    parser.add_argument('--verify-downloads', action='store_true',
+                        help='Read each downloaded file again from disk to check its hash, instead of hashing the data as it is downloaded.')
+    parser.add_argument('--full-rehash', action='store_true',
+                        help='Read all files of staged packages to check their hash, instead of using the hashes recorded by previous runs.')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process articles page by page as they are fetched, instead of after fetching all articles.')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Like --stream, but fetch, match, download and bag articles in concurrent stages connected by queues.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only fetch articles and collections modified since the last successful run. Requires state_location.')
+    parser.add_argument('--full-harvest', action='store_true',
+                        help='Fetch and check all articles and collections in this run, including versions recorded as preserved '
+                        + 'by previous runs. With --incremental, also resets the watermark.')
     args = parser.parse_args()
 
 
@@ -78,6 +103,15 @@ def main():
     config_obj.add_setting(name='continue-on-error', value=args.continue_on_error)
     config_obj.add_setting(name='dry-run', value=args.dry_run)
     config_obj.add_setting(name='check-remote-staging', value=args.check_remote_staging)
+    config_obj.add_setting(name='rebuild-aptrust-index', value=args.rebuild_aptrust_index)
+    config_obj.add_setting(name='full-curation-scan', value=args.full_curation_scan)
+    config_obj.add_setting(name='async-harvest', value=args.async_harvest)
+    config_obj.add_setting(name='no-http-cache', value=args.no_http_cache)
+    config_obj.add_setting(name='incremental-harvest', value=args.incremental)
+    config_obj.add_setting(name='full-harvest', value=args.full_harvest)
+    config_obj.add_setting(name='workers', value=args.workers)
+    config_obj.add_setting(name='verify-downloads', value=args.verify_downloads)
+    config_obj.add_setting(name='full-rehash', value=args.full_rehash)
 
     figshare_config = config_obj.figshare_config()
     system_config = config_obj.system_config()
@@ -135,6 +169,18 @@ def main():
                               + "not be reached or read.",
                               True, True)
 
+    # Check state path is writable if set, if not then give error and stop processing
+    state_location = system_config.get("state_location", "")
+    if (state_location != ""):
+        try:
+            os.makedirs(state_location, exist_ok=True)
+        except OSError:
+            pass
+        if (os.access(state_location, os.W_OK) is False):
+            log.write_log_in_file('error',
+                                  "The state location specified in the config file could not be reached or written.",
+                                  True, True)
+
     # Check if the path to the post-processing external script exists and if the folder is accessible
     if (post_process_script_command != "Bagger"):
         post_process_script_path_exists = os.path.exists(post_process_script_command)
@@ -153,6 +199,14 @@ def main():
                               "dart-runner is not executable or version is lower than 1.0. Bagging will not occur.",
                               True)
 
+    if args.incremental and state_location == "":
+        log.write_log_in_file('warning',
+                              "state_location is not set. All articles and collections will be fetched.", True)
+
+    if args.async_harvest and not async_harvest_available():
+        log.write_log_in_file('warning',
+                              "aiohttp is not installed. Items will be fetched with threads instead of asyncio.", True)
+
     return config_obj, log
 
 
@@ -160,10 +214,22 @@ if __name__ == "__main__":
     get_args()
     config, log = main()
 
+    if args.rebuild_aptrust_index:
+        log.write_log_in_file('info', "Rebuilding local index of archival storage objects.", True)
+        get_preserved_packages_index(rebuild=True, system_config=config.system_config())
+
     log.write_log_in_file('info', " ", True)
-    log.write_log_in_file('info', "------- Fetching articles -------", True)
     article_obj = Article(config, log, args.ids)
-    article_data, skipped_items_counts_dict = article_obj.get_articles()
+    if args.stream or args.pipeline:
+        # Articles are fetched and processed together, the results are summarized below
+        if args.pipeline:
+            article_processing_counts = article_obj.process_articles_pipelined()
+        else:
+            article_processing_counts = article_obj.process_articles_streaming()
+        skipped_items_counts_dict = article_obj.skipped_items_counts_dict
+    else:
+        log.write_log_in_file('info', "------- Fetching articles -------", True)
+        article_data, skipped_items_counts_dict = article_obj.get_articles()
 
     already_preserved_articles_count = len(skipped_items_counts_dict['already_preserved_article_ids'])
     already_preserved_versions_count = skipped_items_counts_dict['already_preserved_versions']
@@ -175,11 +241,11 @@ if __name__ == "__main__":
     published_articles_versions_count = 0
     published_unpublished_count = 0
 
-    for i, (k, v) in enumerate(article_data.items()):
+    for article_id, versions_count in article_obj.fetched_versions_count.items():
         published_unpublished_count += 1
-        if len(v) > 0:
+        if versions_count > 0:
             published_articles_count += 1
-            published_articles_versions_count += len(v)
+            published_articles_versions_count += versions_count
 
     log.write_log_in_file('info', "Fetched: "
                           + f"Total articles: {published_unpublished_count}, "
@@ -204,8 +270,14 @@ if __name__ == "__main__":
     print(" ")
 
     # Start articles processing after completing fetching data from API
+    if not args.stream and not args.pipeline:
+        article_processing_counts = article_obj.process_articles(article_data)
     processed_articles_versions_count, ap_trust_preserved_article_version_count, wasabi_preserved_versions, articles_with_processing_error, \
-        articles_versions_with_processing_error = article_obj.process_articles(article_data)
+        articles_versions_with_processing_error = article_processing_counts
+
+    # Packages bagged and removed from preservation staging storage no longer need their files in the local file store
+    if not args.dry_run:
+        article_obj.clean_download_storage()
 
     # Start collections processing after completing fetching data from API and articles processing.
     processed_collections_versions_count, already_preserved_collections_counts = collection_obj.process_collections(collection_data)
@@ -328,6 +400,31 @@ if __name__ == "__main__":
                               'The number of articles versions or collections versions successfully processed is different'
                               + ' than the number fetched. Check the log for details.', True)
 
+    harvest_state = get_harvest_state(config.system_config())
+    if harvest_state is not None:
+        # Items that could not be fetched or processed are recorded with the watermark and fetched again by ID by the
+        # next run. Items missing from an incomplete list are unknown, so they keep the watermark back.
+        harvest_failed = article_obj.listing_fetch_failed or collection_obj.listing_fetch_failed
+        failed_ids = {'articles': article_obj.get_failed_ids(), 'collections': collection_obj.get_failed_ids()}
+        if args.ids:
+            log.write_log_in_file('info', "Items were selected by ID. The incremental harvest watermark was not changed.", True)
+        elif args.dry_run:
+            log.write_log_in_file('info', "*Dry Run* The incremental harvest watermark was not changed.", True)
+        elif not harvest_failed:
+            harvest_state.commit(failed_ids)
+            log.write_log_in_file('info', f"Incremental harvest watermark set to {harvest_state.started}.", True)
+            if len(failed_ids['articles']) > 0 or len(failed_ids['collections']) > 0:
+                log.write_log_in_file('info',
+                                      f"Articles {sorted(failed_ids['articles'])} and collections {sorted(failed_ids['collections'])} "
+                                      + "could not be fetched or processed. The next run fetches them again.", True)
+        else:
+            log.write_log_in_file('warning',
+                                  "The list of articles or collections could not be fetched completely. The incremental harvest "
+                                  + "watermark was not changed, so the next run fetches the same items again.", True)
+
+    # Closes the connections, and the event loop and session of --async-harvest
+    get_figshare_client(config.figshare_config()).close()
+
     log.write_log_in_file('info',
                           f"ReBACH finished with {log.warnings_count} warnings and {log.errors_count} errors",
                           True)
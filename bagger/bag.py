@@ -6,10 +6,11 @@ from typing import Union
 
 from figshare.Utils import extract_item_id_only, extract_version_only, extract_metadata_hash_only, check_local_path, compare_hash
 from figshare.Utils import extract_lastname_only, extract_bag_count, extract_bag_date, upload_to_remote, get_preserved_version_hash_and_size
+from figshare.Utils import find_remote_staging_packages, refresh_remote_staging_index
 from bagger import Status, Dryable
 from bagger.job import Job
 from bagger.metadata import Metadata
-from bagger.wasabi import Wasabi, get_filenames_from_ls
+from bagger.wasabi import Wasabi
 from bagger.ntf import NamedTemporaryFile, TemporaryFile
 
 
@@ -52,7 +53,11 @@ class Bagger:
                              s3host=config['Wasabi']['host'],
                              s3bucket=config['Wasabi']['bucket'],
                              s3hostbucket=config['Wasabi']['host_bucket'],
-                             dart_hostbucket_override=config['Wasabi']['dart_workflow_hostbucket_override'])
+                             dart_hostbucket_override=config['Wasabi']['dart_workflow_hostbucket_override'],
+                             backend=config['Wasabi'].get('backend', 's3cmd'),
+                             max_pool_connections=config['Wasabi'].get('max_pool_connections', 10))
+        if self.wasabi.backend == 'boto3' and not self.wasabi.native:
+            self.log.warning('boto3 is not installed. Wasabi will be listed with s3cmd.')
 
     @staticmethod
     def decompose_name(package_name: str) -> tuple[str, str, str, str, str, str]:
@@ -112,8 +117,7 @@ class Bagger:
             return Status.INVALID_PATH
 
         if upload_to_remote():
-            folder_to_list = f"s3://{self.wasabi.s3bucket}"
-            wasabi_ls, wasabi_error = self.wasabi.list_bucket(folder_to_list)
+            wasabi_packages, wasabi_error = find_remote_staging_packages(bag_name, self.wasabi)
 
             if wasabi_error:
                 wasabi_errors = (e for e in wasabi_error.split('\n') if e != '')
@@ -121,9 +125,7 @@ class Bagger:
                     self.log.error(f"[Wasabi] {e.strip('ERROR: ')}")
                 return Status.WASABI_ERROR
 
-            wasabi_list = get_filenames_from_ls(wasabi_ls)
-
-            if bag_name in wasabi_list and not self.overwrite:
+            if bag_name in wasabi_packages and not self.overwrite:
                 return Status.DUPLICATE_BAG
         else:
             version_local_final_preserved_list = check_local_path(int(article_id), version)
@@ -184,6 +186,10 @@ class Bagger:
 
         data, error, exit_code = job.run()
 
+        if exit_code == 0 and upload_to_remote():
+            # Keep the remote staging index used for duplicate checks in sync with the uploaded bag
+            refresh_remote_staging_index(bag_name, self.wasabi)
+
         if error:
             # Remove trailing newline from DART runner error output
             self.log.error(error.rstrip())
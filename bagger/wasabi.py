@@ -2,11 +2,19 @@ from subprocess import run
 
 from bagger import Dryable
 
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    boto3 = None
+
 
 class Wasabi:
 
     def __init__(self, access_key: str, secret_key: str, s3host: str, s3bucket: str,
-                 s3hostbucket: str, dart_hostbucket_override: bool) -> None:
+                 s3hostbucket: str, dart_hostbucket_override: bool, backend: str = 's3cmd',
+                 max_pool_connections: int = 10) -> None:
         """
         Initialize Wasabi class with Wasabi connection information
 
@@ -16,6 +24,9 @@ class Wasabi:
         :param s3bucket: Wasabi s3 bucket
         :param s3hostbucket: Template for accessing s3 bucket
         :param dart_hostbucket_override: Override the host and bucket specified in a DART workflow
+        :param backend: 'boto3' to list objects with an in-process S3 client, 's3cmd' to run s3cmd.
+            Falls back to s3cmd if boto3 is not installed.
+        :param max_pool_connections: Size of the connection pool of the in-process S3 client
         """
         self.s3host = s3host
         self.s3bucket = s3bucket
@@ -23,6 +34,10 @@ class Wasabi:
         self.access_key = access_key
         self.s3hostbucket = s3hostbucket
         self.dart_hostbucket_override = dart_hostbucket_override
+        self.backend = backend
+        self.native = backend == 'boto3' and boto3 is not None
+        self.max_pool_connections = max_pool_connections
+        self._client = None
 
     def __str__(self):
         _access_key, _secret_key = 'unset', 'unset'
@@ -33,7 +48,7 @@ class Wasabi:
 
         return f"Wasabi( access_key={_access_key}, secret_key={_secret_key}, " \
                f"s3host='{self.s3host}', s3bucket='{self.s3bucket}', s3hostbucket='{self.s3hostbucket}', " \
-               f"dart_hostbucket_override='{self.dart_hostbucket_override}')"
+               f"dart_hostbucket_override='{self.dart_hostbucket_override}', backend='{self.backend}')"
 
     @Dryable(dry_return=('', ''))
     def list_bucket(self, folder_to_list: str) -> tuple[str, str]:
@@ -50,6 +65,44 @@ class Wasabi:
         ls_result = run(cmd, capture_output=True, text=True)
         return ls_result.stdout, ls_result.stderr
 
+    def get_client(self):
+        """
+        Return the in-process S3 client, creating it on first use. The client keeps a pool of
+        connections to the Wasabi host and is safe to share between threads.
+
+        :return: boto3 S3 client
+        """
+        if self._client is None:
+            endpoint_url = self.s3host if '://' in self.s3host else f'https://{self.s3host}'
+            self._client = boto3.client('s3', endpoint_url=endpoint_url,
+                                        aws_access_key_id=self.access_key,
+                                        aws_secret_access_key=self.secret_key,
+                                        config=BotoConfig(max_pool_connections=self.max_pool_connections,
+                                                          retries={'max_attempts': 3, 'mode': 'standard'}))
+        return self._client
+
+    @Dryable(dry_return=([], ''))
+    def list_objects(self, prefix: str = '') -> tuple[list[tuple[str, int]], str]:
+        """
+        List the files at the top level of the bucket whose names start with prefix
+
+        :param prefix: Only list files whose names start with this prefix. Lists all files if empty.
+        :return: Tuple of a list of (filename, size) tuples and the errors of the listing
+        """
+        if not self.native:
+            ls, ls_error = self.list_bucket(f's3://{self.s3bucket}/{prefix}')
+            return get_filenames_and_sizes_from_ls(ls), ls_error
+
+        objects = []
+        try:
+            paginator = self.get_client().get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.s3bucket, Prefix=prefix, Delimiter='/'):
+                for item in page.get('Contents', []):
+                    objects.append((item['Key'], item['Size']))
+        except (BotoCoreError, ClientError) as e:
+            return [], str(e)
+        return objects, ''
+
 
 def get_filenames_from_ls(ls: str) -> list[str]:
     """
@@ -61,3 +114,15 @@ def get_filenames_from_ls(ls: str) -> list[str]:
     lines = ls.splitlines()
     return [line.rsplit('/', 1)[-1] for line in lines if
             line.rsplit('/', 1)[-1] != '']
+
+
+def get_filenames_and_sizes_from_ls(ls: str) -> list[tuple[str, int]]:
+    """
+    Parse ls output and return filenames and sizes
+
+    :param ls: Output of ls command to parse
+    :return: List of (filename, size) tuples parsed from ls
+    """
+    lines = ls.splitlines()
+    return [(line.rsplit('/', 1)[-1], int(line.split()[-2])) for line in lines if
+            line.rsplit('/', 1)[-1] != '']
@@ -0,0 +1,124 @@
+import sqlite3
+import requests
+from time import sleep
+
+# State of the objects that are preserved in AP Trust. Deleted objects have state 'D'.
+ACTIVE = 'A'
+
+
+class APTrustIndex:
+
+    def __init__(self, index_file: str, base_url: str, user: str, token: str, items_per_page: int = 100,
+                 alt_identifier_starts_with: str = '', retries: int = 3, retries_wait: int = 10) -> None:
+        """
+        On-disk index of the active objects preserved in AP Trust. Each sync only fetches the objects updated
+        since the previous successful sync (the watermark). Objects deleted in AP Trust are updated with a state
+        other than active, and are removed from the index by the sync.
+
+        :param index_file: Path to the SQLite file holding the index
+        :param base_url: AP Trust member API url including the version
+        :param user: AP Trust user email address
+        :param token: AP Trust user secret token
+        :param items_per_page: Maximum number of objects to request per page
+        :param alt_identifier_starts_with: Prefix for alternate identifier in AP Trust
+        :param retries: Number of times a page request is retried
+        :param retries_wait: Number of seconds to wait between retries. Also used as request timeout.
+        """
+        self.index_file = index_file
+        self.base_url = base_url if base_url[-1] == '/' else base_url + '/'
+        self.headers = {'X-Pharos-API-User': user,
+                        'X-Pharos-API-Key': token}
+        self.items_per_page = items_per_page
+        self.alt_identifier_starts_with = alt_identifier_starts_with
+        self.retries = retries
+        self.retries_wait = retries_wait
+        self._connection = sqlite3.connect(self.index_file)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS objects (id INTEGER PRIMARY KEY, bag_name TEXT, payload_size INTEGER, "
+                                 + "updated_at TEXT)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS sync (name TEXT PRIMARY KEY, value TEXT)")
+        self._connection.commit()
+
+    def get_watermark(self) -> str:
+        """
+        Returns the greatest updated_at value seen by the last successful sync
+
+        :return: ISO formatted timestamp, or empty string if the index has never been synced
+        """
+        row = self._connection.execute("SELECT value FROM sync WHERE name = 'updated_at'").fetchone()
+        return row[0] if row else ''
+
+    def sync(self, rebuild: bool = False) -> int:
+        """
+        Fetches from AP Trust the objects updated since the watermark and stores them in the index, or removes them
+        from the index if they are no longer active.
+        The watermark only moves forward once all pages have been fetched, so an interrupted sync is
+        repeated in full on the next run.
+
+        :param rebuild: Discard the index and fetch all objects
+        :return: Number of objects fetched
+        """
+        if rebuild:
+            self._connection.execute("DELETE FROM objects")
+            self._connection.execute("DELETE FROM sync")
+            self._connection.commit()
+
+        watermark = self.get_watermark()
+        new_watermark = watermark
+        fetched = 0
+        page = 1
+        page_empty = False
+        while not page_empty:
+            params = {'page': page, 'per_page': self.items_per_page,
+                      'alt_identifier__starts_with': self.alt_identifier_starts_with}
+            if watermark:
+                params['updated_at__gteq'] = watermark
+            preserved_packages = self._get_page(params)
+            if not preserved_packages:
+                page_empty = True
+                continue
+            for package in preserved_packages:
+                if package.get('state', ACTIVE) != ACTIVE:
+                    self._connection.execute("DELETE FROM objects WHERE id = ?", (package['id'],))
+                else:
+                    self._connection.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)",
+                                             (package['id'], package['bag_name'], package['payload_size'], package.get('updated_at', '')))
+                new_watermark = max(new_watermark, package.get('updated_at') or '')
+            fetched += len(preserved_packages)
+            page += 1
+
+        if new_watermark:
+            self._connection.execute("INSERT OR REPLACE INTO sync VALUES ('updated_at', ?)", (new_watermark,))
+        self._connection.commit()
+        return fetched
+
+    def _get_page(self, params: dict) -> list:
+        """
+        Requests one page of the AP Trust objects list, retrying on failure
+
+        :param params: Query parameters of the request
+        :return: List of objects in the page. Empty if the page is past the end of the list.
+        """
+        tries = 1
+        while True:
+            try:
+                response = requests.get(f'{self.base_url}objects', headers=self.headers, params=params, timeout=self.retries_wait)
+                response.raise_for_status()
+                return response.json()['results'] or []
+            except requests.exceptions.RequestException as e:
+                tries += 1
+                print(f"Request to AP Trust failed: {e}. Retrying {tries}/{self.retries}...")
+                if tries > self.retries:
+                    print("Max retries reached. Raising exception.")
+                    raise
+                sleep(self.retries_wait)
+
+    def get_packages(self) -> list:
+        """
+        Returns all indexed packages
+
+        :return: List of tuples. Each tuple contains bag name and payload size of a preserved package.
+        """
+        return self._connection.execute("SELECT bag_name, payload_size FROM objects ORDER BY id").fetchall()
+
+    def close(self) -> None:
+        self._connection.close()
@@ -6,13 +6,27 @@ import time
 import requests
 import hashlib
 import re
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from figshare.Integration import Integration
+from figshare.Curation import CurationIndex
+from figshare.Pipeline import Pipeline, Stage
+from figshare.PartialDownload import PartialDownload, JOURNAL_INTERVAL, remove_stale_partials
+from figshare.ContentStore import ContentStore
+from figshare.Client import RETRY_STATUS_CODES, get_retry_after
+from figshare.PreviousBag import PreviousBag, find_previous_bag
 from figshare.Utils import standardize_api_result, sorter_api_result, get_preserved_version_hash_and_size, metadata_to_hash, check_local_path
-from figshare.Utils import compare_hash, check_wasabi, calculate_payload_size, get_article_id_and_version_from_path, stringify_metadata
-from figshare.Utils import format_version, get_folder_name_in_local_storage, upload_to_remote, inspect_dart
+from figshare.Utils import compare_hash, check_wasabi, calculate_payload_size, stringify_metadata
+from figshare.Utils import format_version, get_folder_name_in_local_storage, upload_to_remote, inspect_dart, get_state_file_path
+from figshare.Utils import get_archival_staging_storage, get_file_hash_cache
+from figshare.Utils import get_figshare_client, get_harvest_state, get_version_state_store, get_download_scheduler
+from figshare.VersionState import PRESERVED
 from slugify import slugify
-from requests.adapters import HTTPAdapter, Retry
+
+# Longest wait asked by a Retry-After header that is followed before downloading a file again
+MAX_DOWNLOAD_RETRY_WAIT = 300
 
 
 class Article:
@@ -36,6 +50,20 @@ class Article:
         self.bag_creation_date = datetime.today().strftime('%Y%m%d')
         self.retries = int(figshare_config["retries"]) if figshare_config["retries"] is not None else 3
         self.retry_wait = int(figshare_config["retries_wait"]) if figshare_config["retries_wait"] is not None else 10
+        self.max_workers = int(figshare_config.get("max_workers") or 1)
+        self.download_workers = int(figshare_config.get("download_workers") or 4)
+        self.download_scheduler = get_download_scheduler(figshare_config)
+        # Files of at least segmented_download_threshold bytes are downloaded in segments. Zero disables segmented downloads.
+        segmented_download_threshold = figshare_config.get("segmented_download_threshold")
+        segmented_download_threshold = float(segmented_download_threshold) if segmented_download_threshold not in (None, '') else 1024
+        self.segmented_download_threshold = int(segmented_download_threshold * 1024 * 1024)
+        self.segment_size = max(1, int(float(figshare_config.get("segment_size") or 256) * 1024 * 1024))
+        self.segment_workers = int(figshare_config.get("segment_workers") or 4)
+        # Read downloaded files again to check their hash, instead of hashing the downloaded data
+        self.verify_downloads = self.system_config.get('verify-downloads', 'False') == 'True'
+        self.client = get_figshare_client(figshare_config, self.system_config)
+        self.async_harvest = self.system_config.get('async-harvest', 'False') == 'True'
+        self.async_concurrency = int(figshare_config.get("async_concurrency") or 20)
         self.logs = log
         self.errors = []
         self.exclude_dirs = [".DS_Store"]
@@ -44,6 +72,15 @@ class Article:
         self.ingest_staging_storage = self.system_config["ingest_staging_storage"]
         if self.ingest_staging_storage[-1] != "/":
             self.ingest_staging_storage = self.ingest_staging_storage + "/"
+        # Downloads in progress are kept outside of the package folders, which are deleted when a download fails
+        self.partial_download_dir = os.path.join(self.ingest_staging_storage, '.rebach', 'partial')
+        self.partial_download_max_age_days = float(self.system_config.get('partial_download_max_age_days') or 7)
+        # Files of a version whose files are the same as in the bag of an earlier version are copied from that bag
+        self.reuse_previous_bags = self.system_config.get('reuse_previous_bags', 'True') != 'False'
+        # Downloaded files are shared between packages through the content store, unless it is disabled
+        self.content_store = None
+        if self.system_config.get('content_store', 'True') != 'False':
+            self.content_store = ContentStore(os.path.join(self.ingest_staging_storage, '.rebach', 'store'))
         self.curation_storage_location = self.system_config["curation_storage_location"]
         if self.curation_storage_location[-1] != "/":
             self.curation_storage_location = self.curation_storage_location + "/"
@@ -53,6 +90,13 @@ class Article:
         self.matched_curation_folder_list = []
         self.no_matched = 0
         self.no_unmatched = 0
+        self.checked_versions_count = 0
+        # Number of versions fetched for each article, kept for the summary
+        self.fetched_versions_count = {}
+        # True if the list of articles could not be fetched completely
+        self.listing_fetch_failed = False
+        # IDs of articles whose versions or version metadata could not be fetched, see get_failed_ids
+        self.failed_article_ids = set()
 
         # This dict is used to store counts of skipped items. Set articles_with_fetch_error keeps article_ids that failed during preprocessing.
         # while set articles_with_processing_error keeps articled_ids that failed during processing and their intersection is o to avoid
@@ -64,8 +108,31 @@ class Article:
                                           'articles_locally_preserved': 0, 'articles_versions_with_processing_error': 0
                                           }
         self.skipped_article_versions = {}
+        # Guards the counts above that are updated while processing, as versions can be processed in several threads
+        self.counts_lock = threading.Lock()
         self.check_dart = inspect_dart()
         self.processor = Integration(self.config_obj, self.logs)
+        self.scan_workers = int(self.system_config.get('scan_workers') or 4)
+        self.workers = max(1, int(self.system_config.get('workers') or 1))
+        self.pipeline_download_workers = int(self.system_config.get('pipeline_download_workers') or self.workers)
+        self.pipeline_bag_workers = int(self.system_config.get('pipeline_bag_workers') or 1)
+        self.pipeline_queue_size = int(self.system_config.get('pipeline_queue_size') or 2)
+        self.pipeline_status_interval = int(self.system_config.get('pipeline_status_interval') or 0)
+        self.harvest_state = get_harvest_state(self.system_config)
+        self.modified_since = ''
+        if self.harvest_state is not None and not self.input_articles_id:
+            self.modified_since = self.harvest_state.get_modified_since('articles')
+        self.version_state = get_version_state_store(self.system_config)
+        # Hashes of staged files are reused while the files are unchanged, unless --full-rehash is given
+        self.file_hash_cache = get_file_hash_cache(self.system_config)
+        self.full_rehash = self.system_config.get('full-rehash', 'False') == 'True'
+        # Versions recorded as preserved are checked again in full harvests
+        self.skip_preserved_versions = self.version_state is not None and self.system_config.get('full-harvest', 'False') != 'True' \
+            and (self.harvest_state is None or not self.harvest_state.is_full('articles'))
+        self.curation_index = CurationIndex(self.curation_storage_location, self.exclude_dirs,
+                                            get_state_file_path(self.system_config, 'curation_snapshot.json'),
+                                            self.system_config.get('full-curation-scan', 'False') == 'True',
+                                            self.scan_workers, self.system_config.get('dry-run', 'False') == 'False')
 
     """
     This function is sending requests to 'account/institution/articles api.
@@ -74,15 +141,60 @@ class Article:
     will be called with article param.
     No. of tries implemented in while loop, loop will exit if API is not giving 200
     response after no. of tries defined in config file.
+    If article IDs are given, they are fetched directly from the articles API and
+    the list of articles is only paged through for IDs that could not be fetched.
+    In incremental harvest, the articles that the last harvest could not fetch or
+    process are fetched directly as well.
     """
     def get_articles(self):
+        article_data = {}
+        for page_article_data in self.iter_article_pages():
+            article_data.update(page_article_data)
+
+        return article_data, self.skipped_items_counts_dict
+
+    """
+    Generator fetching the articles one page at a time, see get_articles.
+    Yields a dict of the article versions of each page, keyed by article id.
+    """
+    def iter_article_pages(self):
         articles_api = self.api_endpoint + '/account/institution/articles'
         if self.api_endpoint[-1] == "/":
             articles_api = self.api_endpoint + "account/institution/articles"
         retries = 1
         page = 1
+        prefetched_page = 0
+        # The number of pages is not known, so the pages prefetched at a time start at 2 and double while pages are
+        # full, which keeps the requests for pages past the end of the list to at most the number of pages listed.
+        # Nothing is prefetched after a page that is not full, as it is the last one.
+        prefetch_pages = 2
+        last_page_full = False
         success = False
-        article_data = {}
+        listing_ids = self.input_articles_id
+        # Articles fetched directly are left out of the list of articles
+        fetched_ids = set()
+        if self.input_articles_id:
+            article_data, listing_ids = self.get_articles_by_id({}, self.input_articles_id)
+            yield article_data
+            if len(listing_ids) == 0:
+                self.client.clear_prefetched()
+                return
+            self.logs.write_log_in_file("info", f"Looking for IDs {listing_ids} in the list of articles.", True)
+        elif self.modified_since and len(self.harvest_state.get_failed_ids('articles')) > 0:
+            retry_ids = self.harvest_state.get_failed_ids('articles')
+            self.logs.write_log_in_file("info", f"Fetching again articles {retry_ids} that the last harvest could not fetch or process.", True)
+            article_data, unresolved_ids = self.get_articles_by_id({}, retry_ids)
+            if len(unresolved_ids) > 0:
+                # Articles that are not public are only listed again by incremental harvests if they are modified
+                self.logs.write_log_in_file("warning", f"Articles {unresolved_ids} could not be fetched again. The next run tries "
+                                            + "again, and the next full harvest looks for them in the list.", True)
+            self.failed_article_ids.update(unresolved_ids)
+            fetched_ids = set(retry_ids) - set(unresolved_ids)
+            yield article_data
+        if self.modified_since:
+            self.logs.write_log_in_file("info", f"Incremental harvest. Fetching articles modified since {self.modified_since}.", True)
+        elif self.harvest_state is not None and not self.input_articles_id:
+            self.logs.write_log_in_file("info", "Full harvest. Fetching all articles.", True)
         while not success and retries <= int(self.retries):
             try:
                 # pagination implemented.
@@ -92,12 +204,11 @@ class Article:
                 while (not page_empty):
                     self.logs.write_log_in_file("info",
                                                 f"Getting page {page} of articles. Total amount of pages not available.", True)
-                    params = {'page': page, 'page_size': page_size, 'institution': self.institution}
-                    get_response = requests.get(articles_api,
-                                                headers={'Authorization': 'token ' + self.api_token},
-                                                params=params,
-                                                timeout=self.retry_wait
-                                                )
+                    params = self.get_articles_params(page, page_size)
+                    if page > prefetched_page and last_page_full:
+                        prefetched_page = self.prefetch_article_pages(articles_api, page, page_size, prefetch_pages)
+                        prefetch_pages *= 2
+                    get_response = self.client.get(articles_api, authenticated=True, params=params)
                     if (get_response.status_code == 200):
                         articles = get_response.json()
                         if (len(articles) == 0):
@@ -105,20 +216,20 @@ class Article:
                             self.logs.write_log_in_file("info",
                                                         f"Page {page} is empty.", True)
                             break
+                        last_page_full = len(articles) >= page_size
 
-                        if (self.input_articles_id):
-                            filtered_data = [item for item in articles if item['id'] in self.input_articles_id]
-                            filtered_json = json.dumps(filtered_data)
-                            filtered_articles = json.loads(filtered_json)
-                            article_data = self.article_loop(filtered_articles, page_size, page, article_data)
+                        if (listing_ids):
+                            filtered_articles = [item for item in articles if item['id'] in listing_ids]
+                            yield self.article_loop(filtered_articles, page_size, page, {})
                         else:
-                            article_data = self.article_loop(articles, page_size, page, article_data)
+                            yield self.article_loop(self.filter_listed_articles(articles, fetched_ids), page_size, page, {})
 
                         success = True
                     else:
                         retries = self.retries_if_error(
                             f"API is not reachable. Retry {retries}", get_response.status_code, retries)
                         if (retries > self.retries):
+                            self.listing_fetch_failed = True
                             break
                     page += 1
 
@@ -126,11 +237,99 @@ class Article:
                 retries = self.retries_if_error(e, 500, retries)
                 success = False
                 if (retries > self.retries):
+                    self.listing_fetch_failed = True
                     break
 
-        return article_data, self.skipped_items_counts_dict
+        self.client.clear_prefetched()
+
+    """
+    Fetch the given article IDs directly from the articles API and fetch their versions.
+    :param article_data dict
+    :param article_ids list
+    :return article_data dict, and list of IDs that could not be fetched. They are either not public, e.g. private or
+    embargoed articles that are only in the list of articles of the institution, or the API did not answer.
+    IDs of articles of other institutions are not returned.
+    """
+    def get_articles_by_id(self, article_data, article_ids):
+        articles = []
+        unresolved_ids = []
+        self.prefetch([self.get_article_api_url(article_id) for article_id in article_ids])
+        for article_id in article_ids:
+            self.logs.write_log_in_file("info", f"Getting article {article_id}.", True)
+            article, resolved = self.get_article_by_id(article_id)
+            if article is not None:
+                articles.append(article)
+            elif not resolved:
+                unresolved_ids.append(article_id)
+        return self.article_loop(articles, len(articles), 1, article_data), unresolved_ids
+
+    """
+    Fetch an article from the articles API.
+    :param article_id int
+    :return article dict or None, and boolean telling if the article was resolved. The article is None and resolved if
+    it belongs to another institution. It is None and not resolved if the public API does not have it or did not answer.
+    """
+    def get_article_by_id(self, article_id):
+        retries = 1
+        while retries <= int(self.retries):
+            try:
+                get_response = self.client.get(self.get_article_api_url(article_id))
+                if (get_response.status_code == 200):
+                    article = get_response.json()
+                    if article.get('institution_id', self.institution) != self.institution:
+                        self.logs.write_log_in_file("warning", f"{article_id} - Article of institution {article['institution_id']}. "
+                                                    + "It will be skipped.", True)
+                        return None, True
+                    return article, True
+                elif (get_response.status_code == 404):
+                    # Private and embargoed articles are only in the list of articles of the institution
+                    self.logs.write_log_in_file("info", f"{article_id} - Not found in the public articles API.", True)
+                    return None, False
+                retries = self.retries_if_error(f"{article_id} API not reachable. Retry {retries}", get_response.status_code, retries)
+            except requests.exceptions.RequestException as e:
+                retries = self.retries_if_error(f"{e}. Retry {retries}", 500, retries)
+        return None, False
+
+    def get_article_api_url(self, article_id):
+        if self.api_endpoint[-1] == "/":
+            return self.api_endpoint + f"articles/{article_id}"
+        return self.api_endpoint + f"/articles/{article_id}"
+
+    """
+    Query parameters of a page of the articles API. In incremental harvest, only articles modified since the watermark are requested.
+    :param page int
+    :param page_size int
+    :return params dict
+    """
+    def get_articles_params(self, page, page_size):
+        params = {'page': page, 'page_size': page_size, 'institution': self.institution}
+        if self.modified_since:
+            params['modified_since'] = self.modified_since
+        return params
+
+    """
+    Articles of a page of the list of articles to fetch. In incremental harvest, only articles modified since the watermark are kept.
+    :param articles list of articles from the articles API.
+    :param fetched_ids set of IDs of articles already fetched directly, which are left out.
+    :return list of articles
+    """
+    def filter_listed_articles(self, articles, fetched_ids):
+        articles = [article for article in articles if article['id'] not in fetched_ids]
+        if self.modified_since:
+            # Articles listed without modified date are kept
+            articles = [article for article in articles if (article.get('modified_date') or self.modified_since) >= self.modified_since]
+        return articles
+
+    """
+    IDs of the articles that could not be fetched or processed in this run. They are fetched again by ID in the next incremental harvest.
+    :return set of article IDs
+    """
+    def get_failed_ids(self):
+        return self.failed_article_ids | self.skipped_items_counts_dict['articles_with_fetch_error'] \
+            | self.skipped_items_counts_dict['articles_with_processing_error']
 
     def article_loop(self, articles, page_size, page, article_data):
+        self.prefetch_article_versions(articles)
         no_of_article = 0
         for article in articles:
             if (article['published_date'] is not None or article['published_date'] != ''):
@@ -138,9 +337,82 @@ class Article:
                 self.logs.write_log_in_file("info",
                                             f"Fetching article {no_of_article} on page {page}. ID: {article['id']}.", True)
                 article_data[article['id']] = self.__get_article_versions(article)
+                self.fetched_versions_count[article['id']] = len(article_data[article['id']] or [])
 
         return article_data
 
+    """
+    Fetch concurrently the versions list, the version metadata and the private metadata of the given articles.
+    Requests are sent by up to max_workers threads, or from an asyncio event loop in async harvest mode.
+    The shared client keeps the responses and returns them to __get_article_versions, __get_article_metadata_by_version,
+    private_article_for_data and private_article_for_files, which still process the articles one at a time so that
+    results, counters and logs are in the same order. Failed requests are made again, with retries, during processing.
+    :param articles list of articles from the articles API.
+    """
+    def prefetch_article_versions(self, articles):
+        articles = [article for article in articles if article]
+        versions_responses = self.prefetch([article['url_public_api'] + "/versions" for article in articles])
+        metadata_urls = []
+        private_urls = []
+        for article, versions_response in zip(articles, versions_responses):
+            try:
+                versions = versions_response.json()
+            except (AttributeError, ValueError):
+                continue
+            if len(versions) > 0:
+                metadata_urls += [version['url'] for version in versions if not self.is_preserved_and_unchanged(article, version)]
+            else:
+                private_urls.append(article['url_private_api'])
+        for metadata_response in self.prefetch(metadata_urls, cached=True):
+            try:
+                version_data = metadata_response.json()
+            except (AttributeError, ValueError):
+                continue
+            if version_data.get('size', 0) > 0 and 'files' not in version_data:
+                private_urls.append(version_data['url_private_api'])
+        self.prefetch(private_urls, authenticated=True)
+
+    """
+    Fetch the first pages of the given version files lists concurrently, see prefetch_article_versions.
+    :param versions list of version data of the versions to download.
+    """
+    def prefetch_article_version_files(self, versions):
+        page_size = 100
+        urls = []
+        for version_data in versions:
+            article_version_files_api = self.api_endpoint + "/articles/{0}/versions/{1}/files".format(version_data['id'], version_data['version'])
+            for page in range(1, version_data.get('total_num_files', 0) // page_size + 2):
+                urls.append((article_version_files_api, {'page': page, 'page_size': page_size}))
+        self.prefetch(urls, authenticated=True)
+
+    """
+    Fetch the given urls concurrently with the shared client, using threads or asyncio depending on the harvest mode.
+    Nothing is fetched if neither max_workers nor async harvest is set.
+    :param urls list of urls or (url, params) tuples.
+    :param authenticated boolean send the API token.
+    :param cached boolean use the on-disk HTTP cache.
+    :return list of responses in the same order, None for failed requests.
+    """
+    def prefetch(self, urls, authenticated=False, cached=False):
+        if self.async_harvest:
+            return self.client.prefetch(urls, authenticated, self.async_concurrency, use_async=True, cached=cached)
+        return self.client.prefetch(urls, authenticated, self.max_workers, cached=cached)
+
+    """
+    Fetch concurrently the pages of the articles list from the given page, see prefetch_article_versions.
+    The number of pages is capped by the concurrency of the harvest.
+    :param articles_api string
+    :param page int first page to fetch.
+    :param page_size int
+    :param pages int number of pages to fetch.
+    :return int last page fetched.
+    """
+    def prefetch_article_pages(self, articles_api, page, page_size, pages):
+        pages = min(pages, self.async_concurrency if self.async_harvest else self.max_workers)
+        self.prefetch([(articles_api, self.get_articles_params(next_page, page_size)) for next_page in range(page, page + pages)],
+                      authenticated=True)
+        return page + pages - 1
+
     """
     This function will send request to fetch article versions.
     :param article object.
@@ -159,22 +431,31 @@ class Article:
                     public_url = article['url_public_api']
                     private_url = article['url_private_api']
                     version_url = public_url + "/versions"
-                    get_response = requests.get(version_url)
+                    get_response = self.client.get(version_url)
                     if (get_response.status_code == 200):
                         versions = get_response.json()
                         metadata = []
                         if (len(versions) > 0):
                             for version in versions:
-                                self.logs.write_log_in_file("info",
-                                                            f"Fetching article {article['id']} version {version['version']}.", True)
-                                version_data = self.__get_article_metadata_by_version(version, article['id'])
+                                if self.is_preserved_and_unchanged(article, version):
+                                    self.__count_already_preserved(article['id'])
+                                    self.logs.write_log_in_file("info",
+                                                                f"Article {article['id']} version {version['version']} already preserved "
+                                                                + "and not modified since the last check. Skipping.", True)
+                                    version_data = None
+                                else:
+                                    self.logs.write_log_in_file("info",
+                                                                f"Fetching article {article['id']} version {version['version']}.", True)
+                                    version_data = self.__get_article_metadata_by_version(version, article['id'],
+                                                                                          article.get('modified_date', ''))
                                 if version_data is None:
                                     article_version = 'v' + str(version['version']).zfill(2) if version['version'] <= 9 \
                                         else 'v' + str(version['version'])
                                     article_id = str(article['id'])
-                                    if article_id not in self.skipped_article_versions.keys():
-                                        self.skipped_article_versions[article_id] = set()
-                                    self.skipped_article_versions[article_id].add(article_version)
+                                    with self.counts_lock:
+                                        if article_id not in self.skipped_article_versions.keys():
+                                            self.skipped_article_versions[article_id] = set()
+                                        self.skipped_article_versions[article_id].add(article_version)
                                     continue
                                 metadata.append(version_data)
                         else:
@@ -194,6 +475,9 @@ class Article:
                 success = False
                 if (retries > self.retries):
                     break
+        if article:
+            with self.counts_lock:
+                self.failed_article_ids.add(article['id'])
 
     def private_article_for_data(self, private_url, article_id):
         retries = 1
@@ -202,9 +486,7 @@ class Article:
         while not success and retries <= int(self.retries):
             try:
                 if (private_url):
-                    get_response = requests.get(private_url,
-                                                headers={'Authorization': 'token ' + self.api_token},
-                                                timeout=self.retry_wait)
+                    get_response = self.client.get(private_url, authenticated=True)
                     if (get_response.status_code == 200):
                         version_data = get_response.json()
                         total_file_size = version_data['size']
@@ -249,6 +531,16 @@ class Article:
                 if (retries > self.retries):
                     break
 
+    """
+    Counts an article version skipped because it is already preserved. Versions are fetched from several
+    threads under --pipeline, so the counts are updated under counts_lock.
+    :param article_id int
+    """
+    def __count_already_preserved(self, article_id):
+        with self.counts_lock:
+            self.skipped_items_counts_dict['already_preserved_article_ids'].add(article_id)
+            self.skipped_items_counts_dict['already_preserved_versions'] += 1
+
     """
     Fetch article metadata by version url.
     :param version object value.
@@ -262,7 +554,7 @@ class Article:
     200 response after no. of tries defined in config file.
     If files > 0 then __download_files will be called
     """
-    def __get_article_metadata_by_version(self, version, article_id):
+    def __get_article_metadata_by_version(self, version, article_id, modified_date=''):
         retries = 1
         success = False
         in_alternative_remote_storage = already_preserved = in_ap_trust = False
@@ -272,10 +564,10 @@ class Article:
             try:
                 if (version):
                     public_url = version['url']
-                    get_response = requests.get(public_url)
+                    get_response = self.client.get(public_url, cached=True)
                     if (get_response.status_code == 200):
                         version_data = get_response.json()
-                        payload_size = calculate_payload_size(self.system_config, version_data)
+                        payload_size = calculate_payload_size(version_data, self.curation_index)
 
                         if payload_size == 0:
                             if self.system_config['continue-on-error'] == "False":
@@ -283,8 +575,9 @@ class Article:
                                                             f"Curation folder for article {article_id} version {version['version']} not found.",
                                                             True)
                                 self.logs.write_log_in_file("info", "Aborting execution.", True, True)
-                            self.skipped_items_counts_dict['articles_with_fetch_error'].add(article_id)
-                            self.skipped_items_counts_dict['article_versions_with_fetch_error'] += 1
+                            with self.counts_lock:
+                                self.skipped_items_counts_dict['articles_with_fetch_error'].add(article_id)
+                                self.skipped_items_counts_dict['article_versions_with_fetch_error'] += 1
                             self.logs.write_log_in_file("error",
                                                         f"Curation folder for article {article_id} version {version['version']} not found."
                                                         + " Article version will be skipped.",
@@ -322,7 +615,7 @@ class Article:
                                                         True)
 
                         # Checking archival storage (final remote) for existence of package
-                        version_final_storage_preserved_list = get_preserved_version_hash_and_size(article_id, version['version'])
+                        version_final_storage_preserved_list = get_preserved_version_hash_and_size(article_id, version['version'], self.system_config)
                         if len(version_final_storage_preserved_list) > 1:
                             self.logs.write_log_in_file("warning",
                                                         f"Multiple copies of article {article_id} version {version['version']} "
@@ -332,7 +625,8 @@ class Article:
                         # Comparison in archival staging storage (final local)
                         if compare_hash(version_md5, version_local_final_preserved_list):
                             already_preserved = True
-                            self.skipped_items_counts_dict['articles_locally_preserved'] += 1
+                            with self.counts_lock:
+                                self.skipped_items_counts_dict['articles_locally_preserved'] += 1
                             self.logs.write_log_in_file("info",
                                                         f"Article {article_id} version {version['version']} "
                                                         + "already preserved in archival staging storage",
@@ -341,7 +635,8 @@ class Article:
                         # Comparison in archival storage (final remote)
                         if compare_hash(version_md5, version_final_storage_preserved_list):
                             already_preserved = in_ap_trust = True
-                            self.skipped_items_counts_dict['ap_trust_preserved_versions'] += 1
+                            with self.counts_lock:
+                                self.skipped_items_counts_dict['ap_trust_preserved_versions'] += 1
                             self.logs.write_log_in_file("info",
                                                         f"Article {article_id} version {version['version']} "
                                                         + "already preserved in archival storage.",
@@ -349,7 +644,9 @@ class Article:
 
                         # Checking alternative archival staging storage (remote) for existence of package
                         if self.system_config['check-remote-staging'] == 'True' or upload_item:
-                            version_staging_storage_preserved_list = check_wasabi(article_id, version['version'])
+                            # For targeted runs only look up this version instead of listing the whole bucket
+                            version_staging_storage_preserved_list = check_wasabi(article_id, version['version'],
+                                                                                  self.bag_name_prefix if self.input_articles_id else '')
                             if len(version_staging_storage_preserved_list) > 1:
                                 self.logs.write_log_in_file("warning",
                                                             f"Multiple copies of article {article_id} version {version['version']} "
@@ -358,16 +655,19 @@ class Article:
 
                             # Comparison in alternative archival staging storage (remote)
                             if compare_hash(version_md5, version_staging_storage_preserved_list):
-                                self.skipped_items_counts_dict['wasabi_preserved_versions'] += 1
+                                with self.counts_lock:
+                                    self.skipped_items_counts_dict['wasabi_preserved_versions'] += 1
                                 self.logs.write_log_in_file("info", f"Article {article_id} version {version['version']} "
                                                                     + "already preserved in alternative archival staging storage.",
                                                             True)
                                 if upload_to_remote():
                                     in_alternative_remote_storage = True
 
+                        if (upload_item and in_alternative_remote_storage) or (already_preserved and not upload_item):
+                            self.__record_preserved_version(article_id, version['version'], version_md5, modified_date)
+
                         if already_preserved and upload_item and in_alternative_remote_storage:
-                            self.skipped_items_counts_dict['already_preserved_article_ids'].add(article_id)
-                            self.skipped_items_counts_dict['already_preserved_versions'] += 1
+                            self.__count_already_preserved(article_id)
                             if in_ap_trust:
                                 for version_hash in version_final_storage_preserved_list:
                                     if version_hash[0] == version_md5 and version_hash[1] != payload_size:
@@ -377,12 +677,10 @@ class Article:
                                                                     True)
                             return None
                         elif not already_preserved and upload_item and in_alternative_remote_storage:
-                            self.skipped_items_counts_dict['already_preserved_article_ids'].add(article_id)
-                            self.skipped_items_counts_dict['already_preserved_versions'] += 1
+                            self.__count_already_preserved(article_id)
                             return None
                         elif already_preserved and not upload_item and in_alternative_remote_storage:
-                            self.skipped_items_counts_dict['already_preserved_article_ids'].add(article_id)
-                            self.skipped_items_counts_dict['already_preserved_versions'] += 1
+                            self.__count_already_preserved(article_id)
                             if in_ap_trust:
                                 for version_hash in version_final_storage_preserved_list:
                                     if version_hash[0] == version_md5 and version_hash[1] != payload_size:
@@ -392,8 +690,7 @@ class Article:
                                                                     True)
                             return None
                         elif already_preserved and not upload_item and not in_alternative_remote_storage:
-                            self.skipped_items_counts_dict['already_preserved_article_ids'].add(article_id)
-                            self.skipped_items_counts_dict['already_preserved_versions'] += 1
+                            self.__count_already_preserved(article_id)
                             if in_ap_trust:
                                 for version_hash in version_final_storage_preserved_list:
                                     if version_hash[0] == version_md5 and version_hash[1] != payload_size:
@@ -424,6 +721,31 @@ class Article:
                 retries = self.retries_if_error(f"{e}. Retry {retries}", get_response.status_code, retries)
                 if (retries > self.retries):
                     break
+        if version:
+            with self.counts_lock:
+                self.failed_article_ids.add(article_id)
+
+    """
+    Check in the version state store if a version was found preserved by a previous run and its article was not modified since.
+    :param article dict article from the articles API.
+    :param version dict version from the versions API.
+    :return boolean, always False if the store is not used in this run.
+    """
+    def is_preserved_and_unchanged(self, article, version):
+        if not self.skip_preserved_versions:
+            return False
+        return self.version_state.is_preserved_and_unchanged(article['id'], version['version'], article.get('modified_date', ''))
+
+    """
+    Record in the version state store that a version is preserved.
+    :param article_id int
+    :param version int
+    :param version_md5 string metadata hash of the version.
+    :param modified_date string modified date of the article.
+    """
+    def __record_preserved_version(self, article_id, version, version_md5, modified_date):
+        if self.version_state is not None and modified_date:
+            self.version_state.set(article_id, version, version_md5, modified_date, PRESERVED)
 
     def set_version_metadata(self, version_data, files, private_version_no, version_md5, total_file_size):
         # item_subtype conditions
@@ -460,12 +782,11 @@ class Article:
         while not success and retries <= self.retries:
             try:
                 page_empty = False
-                header = {'Authorization': 'token ' + self.api_token}
                 article_version_files_api = self.api_endpoint + "/articles/{0}/versions/{1}/files".format(article_id, version)
                 article_version_files = []
                 while not page_empty:
                     params = {'page': page, 'page_size': page_size}
-                    get_response = requests.get(article_version_files_api, headers=header, params=params, timeout=self.retry_wait)
+                    get_response = self.client.get(article_version_files_api, authenticated=True, params=params)
                     if get_response.status_code == 200:
                         if len(get_response.json()) > 0:
                             article_version_files += get_response.json()
@@ -486,9 +807,7 @@ class Article:
                     return None
 
     def private_article_for_files(self, version_data):
-        get_response = requests.get(version_data['url_private_api'],
-                                    headers={'Authorization': 'token ' + self.api_token},
-                                    timeout=self.retry_wait)
+        get_response = self.client.get(version_data['url_private_api'], authenticated=True)
         file_len = 0
         files = []
         private_version_no = 0
@@ -510,88 +829,397 @@ class Article:
 
     """
     This function will download files and place them in directory, with version_metadata.
+    Up to download_workers files are downloaded at the same time. Returns True if any file failed,
+    in which case the whole folder is to be deleted.
     """
     def __download_files(self, files, version_data, folder_name):
         delete_folder = False
         self.logs.write_log_in_file('info', "Downloading files.", True)
 
-        retry_strategy = Retry(
-            total=self.retries,
-            status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        http = requests.Session()
-        http.mount("https://", adapter)
-        http.mount("http://", adapter)
-
         if (len(files) > 0):
             version_no = format_version(version_data["version"])
             article_folder = os.path.join(folder_name, version_no)
-            file_no = 0
-            for file in files:
-                if (file['is_link_only'] is False):
-                    article_files_folder = os.path.join(article_folder, "DATA")
-                    ingest_staging_storage = self.ingest_staging_storage
-                    article_folder_path = os.path.join(ingest_staging_storage, article_files_folder)
-                    article_files_path_exists = os.path.exists(article_folder_path)
-                    if (article_files_path_exists is False):
-                        os.makedirs(article_folder_path, exist_ok=True)
-
-                    folder_for_file = ''
-                    # if an item version has no folders, folders dict will be empty
-                    if 'folder_structure' in version_data.keys() and len(version_data['folder_structure'].keys()) > 0 and \
-                            str(file['id']) in version_data['folder_structure'].keys():
-                        folder_for_file = version_data['folder_structure'][str(file['id'])]
-                    filepath = os.path.join(article_folder_path, folder_for_file)
-                    if not os.path.exists(filepath):
-                        os.makedirs(filepath, exist_ok=True)
-                    file_name_with_path = os.path.join(filepath, str(file['id']) + "_" + file['name'])
-                    self.logs.write_log_in_file("info",
-                                                f"Downloading file {file['id']} for article {version_data['id']} - "
-                                                + f"version {version_data['version']}", True)
-
-                    status_code = -1
-                    with http.get(file['download_url'], stream=True, allow_redirects=True,
-                                  headers={'Authorization': 'token ' + self.api_token}) as r:
-                        r.raise_for_status()
-                        try:
-                            with open(file_name_with_path, 'wb') as f:
-                                for chunk in r.iter_content(chunk_size=8192):
-                                    f.write(chunk)
-                            status_code = r.status_code
-                        except requests.exceptions.HTTPError as e:
-                            status_code = e.response.status_code
-                        except Exception as e:
-                            status_code = -1
-                            self.logs.write_log_in_file("error", str(e), True)
-
-                    if (status_code == 200):
-                        file_no = file_no + 1
-                        self.logs.write_log_in_file("info", "Checking hash")
-                        existing_file_hash = self.__get_single_file_hash(file_name_with_path)
-                        compare_hash = file['supplied_md5']
-                        if (compare_hash == ""):
-                            compare_hash = file['computed_md5']
-
-                        if (existing_file_hash != compare_hash):
-                            self.logs.write_log_in_file("error",
-                                                        f"{version_data['id']} version {version_data['version']} - Hash didn't "
-                                                        + f"match after downloading: Filename {file['name']}. Folder will be deleted.", True)
-                            delete_folder = True
-                            break
-                        else:
-                            self.logs.write_log_in_file("info", "Download ok", True)
-                    else:
-                        self.logs.write_log_in_file("error",
-                                                    f"{version_data['id']} version {version_data['version']} - File couldn't download. Status "
-                                                    + f"code {status_code}. Filename {file['name']}. Folder will be deleted.", True)
+            article_files_folder = os.path.join(article_folder, "DATA")
+            article_folder_path = os.path.join(self.ingest_staging_storage, article_files_folder)
+            download_files = [file for file in files if file['is_link_only'] is False]
+            if self.reuse_previous_bags and len(download_files) > 0 and \
+                    self.__copy_files_from_previous_bag(download_files, version_data, article_folder_path):
+                return delete_folder
+            if self.download_workers <= 1 or len(download_files) <= 1:
+                for file in download_files:
+                    if not self.__download_file(file, version_data, article_folder_path):
                         delete_folder = True
                         break
+            else:
+                # Files are downloaded in parallel. The first failed file stops the download of the files not started yet.
+                executor = ThreadPoolExecutor(max_workers=self.download_workers)
+                try:
+                    futures = [executor.submit(self.__download_file, file, version_data, article_folder_path) for file in download_files]
+                    for future in as_completed(futures):
+                        if not future.result():
+                            delete_folder = True
+                            break
+                finally:
+                    executor.shutdown(cancel_futures=True)
         else:
             self.logs.write_log_in_file("info", "No files to download.", True)
 
         return delete_folder
 
+    """
+    Path of a file of an article version relative to the DATA folder, following the folder structure of the version.
+    :param file dict file metadata from the Figshare API.
+    :param version_data dict
+    :return string
+    """
+    def __get_file_path_in_data(self, file, version_data):
+        folder_for_file = ''
+        # if an item version has no folders, folders dict will be empty
+        if 'folder_structure' in version_data.keys() and len(version_data['folder_structure'].keys()) > 0 and \
+                str(file['id']) in version_data['folder_structure'].keys():
+            folder_for_file = version_data['folder_structure'][str(file['id'])]
+        return os.path.join(folder_for_file, str(file['id']) + "_" + file['name'])
+
+    """
+    MD5 hash a downloaded file must have: the hash supplied by the depositor if any, otherwise the hash computed by Figshare.
+    :param file dict file metadata from the Figshare API.
+    :return string
+    """
+    def __get_expected_file_hash(self, file):
+        compare_hash = file['supplied_md5']
+        if (compare_hash == ""):
+            compare_hash = file['computed_md5']
+        return compare_hash
+
+    """
+    Copy the files of an article version from the bag of an earlier version in archival staging storage, instead of
+    downloading them, if the bag has exactly the same files (paths in DATA and MD5 hashes). Files in the content store
+    are linked from the store instead.
+    :param files list of files to download, from the Figshare API.
+    :param version_data dict
+    :param article_folder_path string path to the DATA folder of the version.
+    :return bool True if all files were copied from the bag. If False, the files are to be downloaded.
+    """
+    def __copy_files_from_previous_bag(self, files, version_data, article_folder_path):
+        bag_path = find_previous_bag(get_archival_staging_storage(), version_data['id'], version_data['version'])
+        if bag_path is None:
+            return False
+        expected_files = {self.__get_file_path_in_data(file, version_data): self.__get_expected_file_hash(file) for file in files}
+        with PreviousBag(bag_path) as previous_bag:
+            try:
+                if previous_bag.get_data_files() != expected_files:
+                    return False
+            except (OSError, KeyError, StopIteration, tarfile.TarError) as e:
+                self.logs.write_log_in_file("warning", f"Unable to read files of {bag_path}: {e}.", True)
+                return False
+
+            self.logs.write_log_in_file("info", f"Files of article {version_data['id']} version {version_data['version']} are the same "
+                                        + f"as in {os.path.basename(bag_path)}. Copying them from the bag instead of downloading.", True)
+            for file in files:
+                path = self.__get_file_path_in_data(file, version_data)
+                md5 = expected_files[path]
+                file_name_with_path = os.path.join(article_folder_path, path)
+                os.makedirs(os.path.dirname(file_name_with_path), exist_ok=True)
+                # Files still in the content store, e.g. from the package of the previous version, are linked rather than copied
+                if self.__link_from_content_store(file, version_data, file_name_with_path):
+                    continue
+                try:
+                    copied_hash = previous_bag.extract(path, file_name_with_path)
+                except (OSError, tarfile.TarError) as e:
+                    copied_hash = str(e)
+                if copied_hash != md5:
+                    self.logs.write_log_in_file("warning", f"Unable to copy {path} from {os.path.basename(bag_path)}. Downloading files.", True)
+                    return False
+                self.__record_file_hash(file_name_with_path, md5)
+                if self.content_store is not None:
+                    self.content_store.add(md5, os.path.getsize(file_name_with_path), file_name_with_path)
+        return True
+
+    """
+    Put a file of an article version in its folder under DATA from the content store, if the store has it.
+    With --verify-downloads, the linked file is read to check its hash, and removed from the store if it does not match.
+    :param file dict file metadata from the Figshare API.
+    :param version_data dict
+    :param file_name_with_path string path of the file in the DATA folder.
+    :return bool True if the file was linked from the store.
+    """
+    def __link_from_content_store(self, file, version_data, file_name_with_path):
+        compare_hash = self.__get_expected_file_hash(file)
+        file_size = int(file.get('size') or 0)
+        if self.content_store is None or not self.content_store.link(compare_hash, file_size, file_name_with_path):
+            return False
+        if not self.verify_downloads or self.__get_single_file_hash(file_name_with_path) == compare_hash:
+            self.logs.write_log_in_file("info",
+                                        f"File {file['id']} for article {version_data['id']} - version {version_data['version']} "
+                                        + "found in local file store. Not downloaded.", True)
+            return True
+        self.logs.write_log_in_file("warning", f"Hash of {file['name']} in local file store didn't match. Downloading it again.", True)
+        os.remove(self.content_store.get_entry_path(compare_hash, file_size))
+        os.remove(file_name_with_path)
+        return False
+
+    """
+    Download a file of an article version in its folder under DATA and check its hash.
+    The file is downloaded to a partial file in partial_download_dir first. An interrupted download is resumed with
+    a Range request, by the next attempt in this run or by the next run. The download starts over if the server does
+    not accept the range, or if the hash of a resumed download does not match.
+    :param file dict file metadata from the Figshare API.
+    :param version_data dict
+    :param article_folder_path string path to the DATA folder of the version.
+    :return bool True if the file was downloaded and its hash matches.
+    """
+    def __download_file(self, file, version_data, article_folder_path):
+        file_name_with_path = os.path.join(article_folder_path, self.__get_file_path_in_data(file, version_data))
+        os.makedirs(os.path.dirname(file_name_with_path), exist_ok=True)
+        compare_hash = self.__get_expected_file_hash(file)
+
+        file_size = int(file.get('size') or 0)
+        if self.__link_from_content_store(file, version_data, file_name_with_path):
+            return True
+
+        partial = PartialDownload(self.partial_download_dir, f"{file['id']}_{compare_hash}")
+        segmented = self.segmented_download_threshold > 0 and file_size >= self.segmented_download_threshold
+        if segmented:
+            self.logs.write_log_in_file("info",
+                                        f"Downloading file {file['id']} for article {version_data['id']} - "
+                                        + f"version {version_data['version']} in segments of {self.segment_size} bytes", True)
+            status_code = self.__download_segments(file, version_data, partial)
+            if status_code is None:
+                self.logs.write_log_in_file("warning", f"Server did not accept byte ranges for {file['name']}. Downloading it in one piece.", True)
+                partial.restart()
+                segmented = False
+        if not segmented:
+            resume_from = partial.resume()
+            if resume_from > 0:
+                self.logs.write_log_in_file("info",
+                                            f"Resuming download of file {file['id']} for article {version_data['id']} - "
+                                            + f"version {version_data['version']} from byte {resume_from}", True)
+            else:
+                self.logs.write_log_in_file("info",
+                                            f"Downloading file {file['id']} for article {version_data['id']} - "
+                                            + f"version {version_data['version']}", True)
+            status_code = self.__download_to_partial(file, version_data, partial)
+
+        if (status_code == 200):
+            self.logs.write_log_in_file("info", "Checking hash")
+            existing_file_hash = self.__get_partial_file_hash(partial, segmented)
+            if partial.resumed and existing_file_hash != compare_hash:
+                self.logs.write_log_in_file("warning", f"Hash didn't match after resuming download of {file['name']}. Downloading it again.", True)
+                partial.restart()
+                if segmented:
+                    status_code = self.__download_segments(file, version_data, partial)
+                else:
+                    status_code = self.__download_to_partial(file, version_data, partial)
+                if (status_code == 200):
+                    existing_file_hash = self.__get_partial_file_hash(partial, segmented)
+
+        if (status_code == 200):
+            if (existing_file_hash != compare_hash):
+                partial.discard()
+                self.logs.write_log_in_file("error",
+                                            f"{version_data['id']} version {version_data['version']} - Hash didn't "
+                                            + f"match after downloading: Filename {file['name']}. Folder will be deleted.", True)
+                return False
+            partial.complete(file_name_with_path)
+            self.__record_file_hash(file_name_with_path, compare_hash)
+            if self.content_store is not None and file_size > 0:
+                self.content_store.add(compare_hash, file_size, file_name_with_path)
+            self.logs.write_log_in_file("info", "Download ok", True)
+            return True
+
+        self.logs.write_log_in_file("error",
+                                    f"{version_data['id']} version {version_data['version']} - File couldn't download. Status "
+                                    + f"code {status_code}. Filename {file['name']}. Folder will be deleted.", True)
+        return False
+
+    """
+    Return the MD5 hash of a downloaded partial file. Segments are received out of order, so the file of a segmented
+    download is read to compute its hash. Otherwise the hash is computed while downloading, unless --verify-downloads is given.
+    :param partial PartialDownload
+    :param segmented bool True if the file was downloaded in segments.
+    :return string
+    """
+    def __get_partial_file_hash(self, partial, segmented):
+        if segmented or self.verify_downloads:
+            return self.__get_single_file_hash(partial.part_file)
+        return partial.hash.hexdigest()
+
+    """
+    Download a file in segments of segment_size bytes, up to segment_workers segments at the same time. Each segment is
+    written at its position in the partial file, which has the size of the whole file. Segments received by a previous
+    attempt or run are not downloaded again.
+    :param file dict file metadata from the Figshare API.
+    :param version_data dict
+    :param partial PartialDownload
+    :return int 200 if all segments were received, None if the server does not accept byte ranges, otherwise the status
+            code of the failed request or -1.
+    """
+    def __download_segments(self, file, version_data, partial):
+        size = int(file['size'])
+        done = partial.resume_segments(size, self.segment_size)
+        segments = [start for start in range(0, size, self.segment_size) if start not in done]
+        if len(done) > 0:
+            self.logs.write_log_in_file("info", f"Resuming download of {file['name']}: {len(done)} segments of "
+                                        + f"{len(done) + len(segments)} already received.", True)
+
+        def get_status_code(segment_status_code):
+            # A server that does not accept byte ranges answers with the whole file
+            return 200 if segment_status_code == 206 else None if segment_status_code == 200 else segment_status_code
+
+        if len(segments) == 0:
+            return 200
+        # The first segment is downloaded alone, so that a server that does not accept byte ranges gets a single request
+        status_code = get_status_code(self.__download_segment(file, version_data, partial, segments[0],
+                                                              min(segments[0] + self.segment_size, size) - 1))
+        if status_code != 200:
+            return status_code
+        executor = ThreadPoolExecutor(max_workers=self.segment_workers)
+        try:
+            futures = [executor.submit(self.__download_segment, file, version_data, partial, start, min(start + self.segment_size, size) - 1)
+                       for start in segments[1:]]
+            for future in as_completed(futures):
+                status_code = get_status_code(future.result())
+                if status_code != 200:
+                    break
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return status_code
+
+    """
+    Download the bytes start to end (inclusive) of a file to the same position in its partial file. Interrupted
+    transfers and responses with a transient error status are retried up to `retries` times each. The segment is
+    recorded in the journal once received.
+    :return int 206 if the segment was received, otherwise the status code of the response or -1.
+    """
+    def __download_segment(self, file, version_data, partial, start, end):
+        position = start
+        interruptions = 0
+        status_retries = 0
+        retry_wait = 0
+        with open(partial.part_file, 'r+b') as f:
+            while True:
+                time.sleep(retry_wait)
+                retry_wait = 0
+                try:
+                    with self.download_scheduler.slot(file['download_url'], f"{version_data['id']}_{version_data['version']}"), \
+                            self.client.get(file['download_url'], authenticated=True, stream=True, allow_redirects=True,
+                                            headers={'Range': f"bytes={position}-{end}"}) as r:
+                        if r.status_code in RETRY_STATUS_CODES:
+                            retry_wait = self.__get_download_retry_wait(file, r, status_retries)
+                            if retry_wait is None:
+                                return r.status_code
+                            status_retries += 1
+                            continue
+                        if r.status_code != 206:
+                            return r.status_code
+                        f.seek(position)
+                        for chunk in self.download_scheduler.iter_content(r, chunk_size=1024 * 1024):
+                            # Never write past the end of the segment, into the next one
+                            chunk = chunk[:end + 1 - position]
+                            f.write(chunk)
+                            position += len(chunk)
+                            if position > end:
+                                break
+                    if position <= end:
+                        raise requests.exceptions.ChunkedEncodingError(f"Response ended after {position - start} of {end + 1 - start} bytes")
+                    f.flush()
+                    partial.save_segment(start)
+                    return 206
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout) as e:
+                    interruptions += 1
+                    if interruptions > self.retries:
+                        self.logs.write_log_in_file("error", f"Download of bytes {start}-{end} of {file['name']} failed: {e}.", True)
+                        return -1
+                    self.logs.write_log_in_file("warning", f"Download of bytes {start}-{end} of {file['name']} interrupted after "
+                                                + f"{position - start} bytes: {e}. Resuming.", True)
+
+    """
+    Download a file to a partial file, resuming from the bytes already received. Interrupted transfers and responses
+    with a transient error status are retried up to `retries` times each. The partial file and its journal are kept
+    if the download does not complete.
+    :param file dict file metadata from the Figshare API.
+    :param version_data dict
+    :param partial PartialDownload
+    :return int 200 if the whole file was received, otherwise the status code of the failed request or -1.
+    """
+    def __download_to_partial(self, file, version_data, partial):
+        status_code = -1
+        interruptions = 0
+        status_retries = 0
+        retry_wait = 0
+        while True:
+            time.sleep(retry_wait)
+            retry_wait = 0
+            resume_from = partial.bytes_received
+            headers = {'Range': f"bytes={resume_from}-"} if resume_from > 0 else None
+            try:
+                # Downloads of all article versions share the limits of the download scheduler
+                with self.download_scheduler.slot(file['download_url'], f"{version_data['id']}_{version_data['version']}"), \
+                        self.client.get(file['download_url'], authenticated=True, stream=True, allow_redirects=True, headers=headers) as r:
+                    if r.status_code in RETRY_STATUS_CODES:
+                        retry_wait = self.__get_download_retry_wait(file, r, status_retries)
+                        if retry_wait is None:
+                            return r.status_code
+                        status_retries += 1
+                        continue
+                    if resume_from > 0 and r.status_code == 416 and resume_from == file.get('size'):
+                        # All bytes were received before the previous attempt stopped
+                        return 200
+                    if resume_from > 0 and r.status_code != 206:
+                        self.logs.write_log_in_file("warning", f"Download of {file['name']} cannot be resumed (status code "
+                                                    + f"{r.status_code}). Downloading it again.", True)
+                        partial.restart()
+                        if r.status_code != 200:
+                            continue
+                    try:
+                        r.raise_for_status()
+                        with partial.open() as f:
+                            for chunk in self.download_scheduler.iter_content(r, chunk_size=8192):
+                                f.write(chunk)
+                                partial.update(chunk)
+                                if partial.bytes_received - partial.saved_bytes >= JOURNAL_INTERVAL:
+                                    f.flush()
+                                    partial.save()
+                        status_code = r.status_code
+                    except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                            requests.exceptions.Timeout):
+                        raise
+                    except requests.exceptions.HTTPError as e:
+                        status_code = e.response.status_code
+                    except Exception as e:
+                        status_code = -1
+                        self.logs.write_log_in_file("error", str(e), True)
+                return 200 if status_code in (200, 206) else status_code
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout) as e:
+                if partial.bytes_received > 0:
+                    partial.save()
+                interruptions += 1
+                if interruptions > self.retries:
+                    self.logs.write_log_in_file("error", f"Download of {file['name']} interrupted after {partial.bytes_received} bytes: {e}. "
+                                                + "It will be resumed by the next run.", True)
+                    return -1
+                self.logs.write_log_in_file("warning", f"Download of {file['name']} interrupted after {partial.bytes_received} bytes: {e}. "
+                                            + "Resuming.", True)
+
+    """
+    Time to wait before downloading a file again after a response with a transient error status (429 or 5xx). The
+    Retry-After header of the response is followed if given, up to MAX_DOWNLOAD_RETRY_WAIT seconds. Otherwise the wait
+    doubles from 1 second with each retry.
+    :param file dict file metadata from the Figshare API.
+    :param response requests.Response
+    :param status_retries int number of retries already done after such responses.
+    :return float number of seconds, or None if no retries are left.
+    """
+    def __get_download_retry_wait(self, file, response, status_retries):
+        if status_retries >= self.retries:
+            self.logs.write_log_in_file("error", f"Download of {file['name']} failed with status code {response.status_code}.", True)
+            return None
+        retry_after = get_retry_after(response)
+        wait = min(retry_after, MAX_DOWNLOAD_RETRY_WAIT) if retry_after is not None else 2 ** status_retries
+        self.logs.write_log_in_file("warning", f"Download of {file['name']} got status code {response.status_code}. "
+                                    + f"Retrying in {wait} seconds.", True)
+        return wait
+
     """
     Retries function.
     :param msg
@@ -614,67 +1242,59 @@ class Article:
     """
     def __check_curation_dir(self, version_data):
         curation_storage_location = self.curation_storage_location
-        dirs = os.listdir(curation_storage_location)
         version_no = format_version(version_data["version"])
         version_data["matched"] = False
-        for dir in dirs:
-            if (dir not in self.exclude_dirs):
-                dir_array = dir.split("_")
-                # check author name with article id directory exists like 'John_Smith_546187'
-                author_dir = dir
-                if (str(version_data['id']) in dir_array):
-                    article_dir_in_curation = curation_storage_location + dir
-                    # read author dir
-                    read_dirs = os.listdir(article_dir_in_curation)
-                    version_data["curation_info"] = {}
-                    for dir in read_dirs:
-                        if dir not in self.exclude_dirs:
-                            if (dir == version_no):
-                                version_dir = article_dir_in_curation + "/" + dir
-                                # read version dir
-                                read_version_dirs = os.listdir(version_dir)
-                                version_data["matched"] = is_matched = True
-                                version_data['author_dir'] = author_dir
-                                # item_subtype conditions
-                                sub_type = ''
-                                if (version_data['has_linked_file']):
-                                    sub_type = 'linked'
-                                elif (version_data['is_metadata_record']):
-                                    sub_type = 'metadata'
-                                else:
-                                    sub_type = 'regular'
-                                version_data["curation_info"] = {'item_type': 'article', 'item_subtype': sub_type,
-                                                                 'id': version_data['id'], 'version': version_data['version'],
-                                                                 'first_author': version_data['authors'][0]['full_name'], 'url': version_data['url'],
-                                                                 'md5': version_data['version_md5'], 'path': version_dir,
-                                                                 'total_files': version_data['total_num_files'],
-                                                                 'total_files_size': version_data['file_size_sum'],
-                                                                 'is_matched': is_matched
-                                                                 }
-                                # article version data with curation info saved in logs.
-                                self.logs.write_log_in_file("info", f"{version_data} ")
-
-                                # check if UAL_RDM dir exists
-                                if "UAL_RDM" not in read_version_dirs:
-                                    self.logs.write_log_in_file("error",
-                                                                f"{version_data['id']} version {version_data['version']} - UAL_RDM directory "
-                                                                + "missing in curation storage. Path is {version_dir}", True)
-                                    break
-                                else:
-                                    version_data = self.read_version_dirs_fun(read_version_dirs, version_dir, version_data)
+        # check author name with article id directory exists like 'John_Smith_546187'
+        for author_dir in self.curation_index.get_author_dirs(version_data['id']):
+            article_dir_in_curation = curation_storage_location + author_dir
+            version_data["curation_info"] = {}
+            curation_version = self.curation_index.get_version(author_dir, version_no)
+            if curation_version is not None:
+                version_dir = article_dir_in_curation + "/" + version_no
+                read_version_dirs = curation_version['entries']
+                version_data["matched"] = is_matched = True
+                version_data['author_dir'] = author_dir
+                # item_subtype conditions
+                sub_type = ''
+                if (version_data['has_linked_file']):
+                    sub_type = 'linked'
+                elif (version_data['is_metadata_record']):
+                    sub_type = 'metadata'
+                else:
+                    sub_type = 'regular'
+                version_data["curation_info"] = {'item_type': 'article', 'item_subtype': sub_type,
+                                                 'id': version_data['id'], 'version': version_data['version'],
+                                                 'first_author': version_data['authors'][0]['full_name'], 'url': version_data['url'],
+                                                 'md5': version_data['version_md5'], 'path': version_dir,
+                                                 'total_files': version_data['total_num_files'],
+                                                 'total_files_size': version_data['file_size_sum'],
+                                                 'is_matched': is_matched
+                                                 }
+                # article version data with curation info saved in logs.
+                self.logs.write_log_in_file("info", f"{version_data} ")
+
+                # check if UAL_RDM dir exists
+                if curation_version['ual_rdm'] is None:
+                    self.logs.write_log_in_file("error",
+                                                f"{version_data['id']} version {version_data['version']} - UAL_RDM directory "
+                                                + f"missing in curation storage. Path is {version_dir}", True)
+                else:
+                    ual_rdm_files = [name for name, size in curation_version['ual_rdm']]
+                    version_data = self.read_version_dirs_fun(read_version_dirs, version_dir, version_data, ual_rdm_files)
 
         return version_data
 
-    def read_version_dirs_fun(self, read_version_dirs, version_dir, version_data):
+    def read_version_dirs_fun(self, read_version_dirs, version_dir, version_data, ual_rdm_files=None):
         deposit_agreement_file = False
         redata_deposit_review_file = False
         trello_file = False
         for dir in read_version_dirs:
             if dir not in self.exclude_dirs:
                 if dir == "UAL_RDM":
-                    ual_rdm_path = version_dir + "/" + dir
-                    ual_dir = os.listdir(ual_rdm_path)
-                    for ual_file in ual_dir:
+                    if ual_rdm_files is None:
+                        ual_rdm_path = version_dir + "/" + dir
+                        ual_rdm_files = os.listdir(ual_rdm_path)
+                    for ual_file in ual_rdm_files:
                         if ("Deposit Agreement".lower() in ual_file.lower()
                                 or "Deposit_Agreement".lower() in ual_file.lower()):
                             deposit_agreement_file = True
@@ -692,25 +1312,34 @@ class Article:
         return version_data
 
     """
-    Get size of files of the given directory path, excluding skipped articles UAL_RDM
-    :param dir_path string  path of dir where file size require to calculate.
-    :param include_only string include in the total only paths that contain this string. If ommitted, includes all paths.
+    Get size of the UAL_RDM folders under the given directory path, excluding skipped articles UAL_RDM.
+    The sizes are read from the curation index, whose scan walks the UAL_RDM folders.
+    :param dir_path string  path of the curation storage, of an author dir or of a version dir.
     :return size integer
     """
-    def get_file_size_of_given_path(self, dir_path, include_only=""):
+    def get_ual_rdm_size_of_given_path(self, dir_path):
+        curation_path = os.path.relpath(dir_path, self.curation_storage_location)
+        curation_path_parts = [] if curation_path == os.curdir else curation_path.split(os.sep)
+        return self.__get_ual_rdm_size_from_curation_index(curation_path_parts)
+
+    """
+    Get size of UAL_RDM folders in curation storage from the curation index, excluding skipped articles UAL_RDM
+    :param curation_path_parts list  author dir and version dir to include. If empty, all folders are included.
+    :return size integer
+    """
+    def __get_ual_rdm_size_from_curation_index(self, curation_path_parts):
         size = 0
-        for path, dirs, files in os.walk(dir_path):
-            if include_only in path:
-                article_id, article_version = get_article_id_and_version_from_path(path)
+        author_dirs = curation_path_parts[:1] if curation_path_parts else self.curation_index.get_author_dirs()
+        for author_dir in author_dirs:
+            article_id = author_dir.split('_')[-1]
+            versions = curation_path_parts[1:] if len(curation_path_parts) > 1 else self.curation_index.get_versions(author_dir)
+            for article_version in versions:
+                version = self.curation_index.get_version(author_dir, article_version)
+                if version is None:
+                    continue
                 if article_id in self.skipped_article_versions.keys() and article_version in self.skipped_article_versions[article_id]:
-                    size += 0
-                else:
-                    for f in files:
-                        fp = os.path.join(path, f)
-                        try:
-                            size += os.path.getsize(fp)
-                        except Exception:
-                            pass
+                    continue
+                size += version['ual_rdm_tree_size']
 
         return size
 
@@ -774,7 +1403,7 @@ class Article:
 
                     if (file_exists is True):
                         # checking md5 values to check if existing file is same or not.
-                        existing_file_hash = self.__get_single_file_hash(file_path)
+                        existing_file_hash = self.__get_staged_file_hash(file_path)
                         if (existing_file_hash != compare_hash):
                             delete_folder = True
                             self.logs.write_log_in_file('error', f"{file_path} hash does not match.", True)
@@ -822,6 +1451,33 @@ class Article:
                     break
         return hash.hexdigest()
 
+    """
+    Return the hash of a file in a staged package from the file hash cache if the file is unchanged since its hash was
+    recorded, otherwise read the file to calculate its hash and record it. The file is always read with --full-rehash.
+    :param filepath string
+    :return string
+    """
+    def __get_staged_file_hash(self, filepath):
+        if self.file_hash_cache is None:
+            return self.__get_single_file_hash(filepath)
+        stat = os.stat(filepath)
+        if not self.full_rehash:
+            cached_hash = self.file_hash_cache.get(filepath, stat)
+            if cached_hash is not None:
+                return cached_hash
+        file_hash = self.__get_single_file_hash(filepath)
+        self.file_hash_cache.set(filepath, file_hash, stat)
+        return file_hash
+
+    """
+    Record the hash of a file written to a package, checked against the hash given by Figshare, in the file hash cache.
+    :param filepath string
+    :param file_hash string
+    """
+    def __record_file_hash(self, filepath, file_hash):
+        if self.file_hash_cache is not None:
+            self.file_hash_cache.set(filepath, file_hash)
+
     """
     Save json data for each article in related directory
     :param version_data dictionary
@@ -887,32 +1543,23 @@ class Article:
 
         ingest_staging_storage = self.ingest_staging_storage
         complete_folder_name = os.path.join(ingest_staging_storage, folder_name, version_no, "UAL_RDM")
-        dirs = os.listdir(curation_storage_location)
-        for dir in dirs:
-            if (dir not in self.exclude_dirs):
-                dir_array = dir.split("_")
-                # check author name with article id directory exists like 'John_Smith_546187'
-                if (str(version_data['id']) in dir_array):
-                    article_dir_in_curation = curation_storage_location + dir
-                    # read author dir
-                    read_dirs = os.listdir(article_dir_in_curation)
-                    for dir in read_dirs:
-                        if dir not in self.exclude_dirs:
-                            if (dir == version_no):
-                                curation_dir_name = os.path.join(article_dir_in_curation, dir, "UAL_RDM")
-                                # check preservation dir is reachable
-                                self.check_access_of_directories(ingest_staging_storage, "preservation")
-                                try:
-                                    check_path_exists = os.path.exists(complete_folder_name)
-                                    if (check_path_exists is False):
-                                        os.makedirs(complete_folder_name, exist_ok=True)
-                                    # copying files to preservation version folder
-                                    shutil.copytree(curation_dir_name, complete_folder_name, dirs_exist_ok=True, ignore_dangling_symlinks=False)
-                                    self.logs.write_log_in_file("info", "Copied curation files to preservation folder.", True)
-                                    result = True
-                                except Exception as e:
-                                    self.logs.write_log_in_file('error', f"{e} - {complete_folder_name}.", True)
-                                    result = False
+        # check author name with article id directory exists like 'John_Smith_546187'
+        for author_dir in self.curation_index.get_author_dirs(version_data['id']):
+            if self.curation_index.get_version(author_dir, version_no) is not None:
+                curation_dir_name = os.path.join(curation_storage_location, author_dir, version_no, "UAL_RDM")
+                # check preservation dir is reachable
+                self.check_access_of_directories(ingest_staging_storage, "preservation")
+                try:
+                    check_path_exists = os.path.exists(complete_folder_name)
+                    if (check_path_exists is False):
+                        os.makedirs(complete_folder_name, exist_ok=True)
+                    # copying files to preservation version folder
+                    shutil.copytree(curation_dir_name, complete_folder_name, dirs_exist_ok=True, ignore_dangling_symlinks=False)
+                    self.logs.write_log_in_file("info", "Copied curation files to preservation folder.", True)
+                    result = True
+                except Exception as e:
+                    self.logs.write_log_in_file('error', f"{e} - {complete_folder_name}.", True)
+                    result = False
         if not result:
             self.logs.write_log_in_file("info", "No files copied to preservation folder.", True)
         return result
@@ -921,10 +1568,22 @@ class Article:
     Find matched articles from the fetched data and curation dir
     """
     def find_matched_articles(self, articles):
-        article_data = {}
         self.no_matched = 0
         self.no_unmatched = 0
-        i = 0
+        self.checked_versions_count = 0
+        article_data = self.match_article_versions(articles)
+        self.log_matched_articles()
+
+        return article_data
+
+    """
+    Check the curation folders of the given article versions. Counts of matched and unmatched versions are added to the
+    counts of the previous calls, see log_matched_articles.
+    :param articles dict article versions keyed by article id.
+    :return dict matched article versions keyed by article id.
+    """
+    def match_article_versions(self, articles):
+        article_data = {}
         for article in articles:
             if (articles[article] is not None):
                 article_versions_list = articles[article]
@@ -934,7 +1593,8 @@ class Article:
                     if (version_data is not None and len(version_data) > 0):
                         data = self.__check_curation_dir(version_data)
                         version_no = format_version(data["version"])
-                        i += 1
+                        self.checked_versions_count += 1
+                        i = self.checked_versions_count
                         if (data["matched"] is True):
                             total_file_size = version_data['size']
                             self.total_all_articles_file_size += total_file_size
@@ -946,6 +1606,12 @@ class Article:
                         else:
                             self.article_non_match_info[i] = f"article {data['id']} {version_no}"
 
+        return article_data
+
+    """
+    Log the matched and unmatched article versions found by match_article_versions.
+    """
+    def log_matched_articles(self):
         matched_articles = []
         if (self.article_match_info):
             self.logs.write_log_in_file('info', "Curation folder found for below articles", True)
@@ -990,8 +1656,6 @@ class Article:
             self.logs.write_log_in_file("warning", "There were unmatched articles or article versions."
                                         + f"Check {self.curation_storage_location} for each of the unmatched items.", True)
 
-        return article_data
-
     """
     Check files are copyable or not
     """
@@ -1002,12 +1666,7 @@ class Article:
             self.logs.write_log_in_file("error", f"{version_data['id']} version {version_data['version']} - UAL_RDM directory doesn't have required "
                                         + "files in curation storage. Folder will be deleted.", True)
             copy_files = False
-            if version_data['id'] not in self.skipped_items_counts_dict['articles_with_fetch_error']:
-                self.skipped_items_counts_dict['articles_with_processing_error'].add(version_data['id'])
-            self.skipped_items_counts_dict['articles_versions_with_processing_error'] += 1
-            if str(version_data['id']) not in self.skipped_article_versions.keys():
-                self.skipped_article_versions[str(version_data['id'])] = set()
-            self.skipped_article_versions[str(version_data['id'])].add(format_version(version_data['version']))
+            self.__add_processing_error(version_data)
 
         else:
             self.logs.write_log_in_file("info", "Curation files exist. Continuing execution.", True)
@@ -1016,9 +1675,24 @@ class Article:
         return copy_files
 
     """
-    Final process for matched articles. Returns True if succeeded.
+    Record a matched article version that failed processing, so that it is counted and left out of the size of the
+    curation folders.
+    :param version_data dict
     """
-    def __final_process(self, check_files, copy_files, check_dir, version_data, folder_name, version_no, value_pre_process):
+    def __add_processing_error(self, version_data):
+        with self.counts_lock:
+            if version_data['id'] not in self.skipped_items_counts_dict['articles_with_fetch_error']:
+                self.skipped_items_counts_dict['articles_with_processing_error'].add(version_data['id'])
+            self.skipped_items_counts_dict['articles_versions_with_processing_error'] += 1
+            if str(version_data['id']) not in self.skipped_article_versions.keys():
+                self.skipped_article_versions[str(version_data['id'])] = set()
+            self.skipped_article_versions[str(version_data['id'])].add(format_version(version_data['version']))
+
+    """
+    Final process for matched articles, up to bagging: download files, copy curation files and save metadata.
+    Returns a tuple of the success so far and whether the package goes on to bagging.
+    """
+    def __prepare_version_package(self, check_files, copy_files, check_dir, version_data, folder_name, version_no):
         success = True
         if copy_files and not check_files:
             # check and create empty directories for each version
@@ -1057,72 +1731,48 @@ class Article:
                 # save json in metadata folder for each version
                 self.logs.write_log_in_file("info", "Saving json in metadata folder for each version.", True)
                 success = success & self.__save_json_in_metadata(version_data, folder_name)
-
-                # only run the postprocessor if all above steps succeeded and dart-runner is available
-                if self.check_dart:
-                    if success:
-                        value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process)
-                        if (value_post_process != 0):
-                            self.logs.write_log_in_file("error",
-                                                        f"{version_data['id']} version {version_data['version']} - Post-processing script failed.",
-                                                        True)
-                            success = False
-                        else:
-                            success = True
-                    else:
-                        self.logs.write_log_in_file("info",
-                                                    f"No further processing for {version_data['id']} version "
-                                                    + f"{version_data['version']} due to errors.",
-                                                    True)
-                        success = False
-                else:
-                    success = False
-                    self.logs.write_log_in_file("error",
-                                                f"dart-runner not available. No bagging for {version_data['id']} version {version_data['version']}",
-                                                True)
-                    if self.system_config['continue-on-error'] == "False":
-                        self.logs.write_log_in_file("info", "Aborting execution.", True, True)
-
+                return success, True
             else:
                 # if download process has any errors then delete complete folder
                 self.logs.write_log_in_file("info", "Download process had an error so complete folder is being deleted.", True)
                 self.delete_folder(check_dir)
-                if version_data['id'] not in self.skipped_items_counts_dict['articles_with_fetch_error']:
-                    self.skipped_items_counts_dict['articles_with_processing_error'].add(version_data['id'])
-                self.skipped_items_counts_dict['articles_versions_with_processing_error'] += 1
-                if str(version_data['id']) not in self.skipped_article_versions.keys():
-                    self.skipped_article_versions[str(version_data['id'])] = set()
-                self.skipped_article_versions[str(version_data['id'])].add(format_version(version_data['version']))
-                success = False
+                self.__add_processing_error(version_data)
+                return False, False
+        elif check_files or copy_files:
+            return success, True
         else:
-            if check_files or copy_files:
-                if self.check_dart:
-                    if success:
-                        # call post process script function for each matched item.
-                        value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process)
-                        if (value_post_process != 0):
-                            self.logs.write_log_in_file("error",
-                                                        f"{version_data['id']} version {version_data['version']} - Post-processing script failed.",
-                                                        True)
-                            success = False
-                        else:
-                            success = True
-                    else:
-                        self.logs.write_log_in_file("info",
-                                                    f"No further processing for {version_data['id']} version "
-                                                    + f"{version_data['version']} due to errors.",
-                                                    True)
-                        success = False
-                else:
-                    success = False
+            self.logs.write_log_in_file("error", "Unexpected condition in final processing. No further actions taken.", True)
+            return False, False
+
+    """
+    Final process for matched articles: bag the package with the post-processing script. Returns True if succeeded.
+    :param success bool result of __prepare_version_package. The package is not bagged if False.
+    """
+    def __bag_version_package(self, success, check_dir, version_data, value_pre_process):
+        if self.check_dart:
+            if success:
+                # call post process script function for each matched item.
+                value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process)
+                if (value_post_process != 0):
                     self.logs.write_log_in_file("error",
-                                                f"dart-runner not available. No bagging for {version_data['id']} version {version_data['version']}",
+                                                f"{version_data['id']} version {version_data['version']} - Post-processing script failed.",
                                                 True)
-                    if self.system_config['continue-on-error'] == "False":
-                        self.logs.write_log_in_file("info", "Aborting execution.", True, True)
+                    success = False
+                else:
+                    success = True
             else:
-                self.logs.write_log_in_file("error", "Unexpected condition in final processing. No further actions taken.", True)
+                self.logs.write_log_in_file("info",
+                                            f"No further processing for {version_data['id']} version "
+                                            + f"{version_data['version']} due to errors.",
+                                            True)
                 success = False
+        else:
+            success = False
+            self.logs.write_log_in_file("error",
+                                        f"dart-runner not available. No bagging for {version_data['id']} version {version_data['version']}",
+                                        True)
+            if self.system_config['continue-on-error'] == "False":
+                self.logs.write_log_in_file("info", "Aborting execution.", True, True)
         return success
 
     """
@@ -1145,7 +1795,6 @@ class Article:
     Process all articles after fetching from API. Returns the number of successfully processed articles.
     """
     def process_articles(self, articles):
-        processed_count = 0
         curation_storage_location = self.__initial_process()
         self.logs.write_log_in_file("info", "------- Processing articles -------", True)
         self.logs.write_log_in_file("info", "Finding matched articles.", True)
@@ -1159,11 +1808,11 @@ class Article:
             curation_folder_size = 0
             for folder in self.matched_curation_folder_list:
                 path = os.path.join(curation_storage_location, folder)
-                curation_folder_size += self.get_file_size_of_given_path(path, "UAL_RDM")
+                curation_folder_size += self.get_ual_rdm_size_of_given_path(path)
         elif len(self.matched_curation_folder_list) == 0 and len(article_data) != 0:
             curation_folder_size = 0
         else:
-            curation_folder_size = self.get_file_size_of_given_path(curation_storage_location, "UAL_RDM")
+            curation_folder_size = self.get_ual_rdm_size_of_given_path(curation_storage_location)
 
         required_space = curation_folder_size + self.total_all_articles_file_size
 
@@ -1174,113 +1823,275 @@ class Article:
         # check required space after curation process, it will stop process if there isn't sufficient space.
         self.check_required_space(required_space)
 
-        for article in article_data:
-            article_versions_list = article_data[article]
-            for version_data in article_versions_list:
-                folder_name = None
-                if version_data is not None or len(version_data) > 0:
-                    version_no = format_version(version_data["version"])
-
-                    # Checking local staging storage if a folder exists for package
-                    # Reuse folder name if folder exists
-                    version_staging_local_storage_list = \
-                        check_local_path(version_data["id"], version_data['version'],
-                                         self.system_config['ingest_staging_storage'])
-                    if len(version_staging_local_storage_list) > 1:
-                        self.logs.write_log_in_file("warning",
-                                                    f"Multiple copies of article {version_data['id']} version {version_data['version']} "
-                                                    + "found in preservation staging local storage",
-                                                    True)
-                    if compare_hash(version_data['version_md5'], version_staging_local_storage_list):
-                        self.logs.write_log_in_file("info", f"Article {version_data['id']} version {version_data['version']} "
-                                                    + "already staged for preservation.",
-                                                    True)
-                        folder_name = get_folder_name_in_local_storage(self.system_config['ingest_staging_storage'],
-                                                                       version_data['id'], version_data['version'], version_data['version_md5'])
-                    if folder_name is None:
-                        first_depositor_last_name = version_data['authors'][0]['last_name'].replace('-', '').replace(' ', '')
-                        formatted_depositor_full_name = slugify(first_depositor_last_name, separator="_", lowercase=False)
-                        folder_name = self.bag_name_prefix + "_" + str(version_data["id"]) + "-" + version_no + "-"
-                        folder_name += formatted_depositor_full_name + "-" + version_data['version_md5'] + "_bag1of1_" + str(self.bag_creation_date)
-
-                    if (version_data["matched"] is True):
-                        self.logs.write_log_in_file("info", f"------- Processing article {article} version {version_data['version']}.", True)
-
-                        # call pre process script function for each matched item.
-                        if self.system_config['dry-run'] == 'False':
-                            value_pre_process = self.pre_process_script_function()
-                        else:
-                            value_pre_process = 0
-                            self.logs.write_log_in_file("info", "*Dry Run* Skipping pre processing.", True)
-
-                        if (value_pre_process == 0):
-                            self.logs.write_log_in_file("info", "Pre-processing script finished successfully.", True)
-                            # check main folder exists in preservation storage.
-                            ingest_staging_storage = self.ingest_staging_storage
-                            check_dir = os.path.join(ingest_staging_storage, folder_name)
-                            check_files = True
-                            copy_files = True
-                            self.logs.write_log_in_file("info", f"Checking if {check_dir} exists.", True)
-                            if (os.path.exists(check_dir) is True):
-                                get_dirs = os.listdir(check_dir)
-                                if (len(get_dirs) > 0):
-                                    self.logs.write_log_in_file("info", "Exists and is not empty, checking contents.", True)
-                                    check_files = self.__check_file_hash(version_data['files'], version_data, folder_name)
-                                else:
-                                    self.logs.write_log_in_file("info", "Exists and is empty", True)
-                                    check_files = False
-
-                                    if self.system_config['dry-run'] == 'False':
-                                        # delete folder if validation fails
-                                        self.delete_folder(check_dir)
-                                        # call post process script function for each matched item. Code 5 corresponds to step 5 of S4.4 in the spec.
-                                        value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process, 5)
-                                        if (value_post_process != 0):
-                                            self.logs.write_log_in_file("error", f"{version_data['id']} version {version_data['version']} - "
-                                                                        + "Post-processing script error found.", True)
-                                    else:
-                                        self.logs.write_log_in_file("info", "*Dry Run* File download and post-processing with "
-                                                                    + f"{self.system_config['post_process_script_command']} skipped.", True)
-
-                                    break
+        if self.system_config['dry-run'] == 'False':
+            self.prefetch_article_version_files([version_data for article in article_data for version_data in article_data[article]
+                                                 if version_data is not None and version_data.get('matched') is True])
+
+        processed_count = self.__process_matched_articles(article_data, curation_storage_location)
+        self.client.clear_prefetched()
+        return self.get_processing_counts(processed_count)
+
+    """
+    Fetch and process articles one page at a time. Matching, space check, downloading and bagging of the versions of a page
+    are done as soon as the page is fetched, instead of after fetching all articles. Only the versions of one page are kept
+    in memory. Returns the same counts as process_articles.
+    """
+    def process_articles_streaming(self):
+        processed_count = 0
+        curation_storage_location = self.__initial_process()
+        self.logs.write_log_in_file("info", "------- Fetching and processing articles page by page -------", True)
+        self.no_matched = 0
+        self.checked_versions_count = 0
+        for page_article_data in self.iter_article_pages():
+            article_data = self.match_article_versions(page_article_data)
+            matched_versions = [version_data for article in article_data for version_data in article_data[article]]
+            if len(matched_versions) == 0:
+                continue
+
+            self.__check_required_space_for_versions(matched_versions, curation_storage_location)
+            if self.system_config['dry-run'] == 'False':
+                self.prefetch_article_version_files(matched_versions)
+            processed_count += self.__process_matched_articles(article_data, curation_storage_location)
+            self.client.clear_prefetched()
+
+        self.logs.write_log_in_file("info", "Total size of articles processed: "
+                                    + f"{self.total_all_articles_file_size} bytes", True)
+        self.log_matched_articles()
+        return self.get_processing_counts(processed_count)
+
+    """
+    Fetch and process articles page by page in a pipeline of stages: fetch pages, match versions with curation folders,
+    download files and bag packages. The stages are connected by bounded queues and run in their own threads, so that
+    files of the next article are downloaded while the previous one is bagged. Returns the same counts as process_articles.
+    """
+    def process_articles_pipelined(self):
+        processed_count = 0
+        curation_storage_location = self.__initial_process()
+        self.logs.write_log_in_file("info", "------- Fetching and processing articles in a pipeline -------", True)
+        self.no_matched = 0
+        self.checked_versions_count = 0
+
+        def match_page(page_article_data):
+            article_data = self.match_article_versions(page_article_data)
+            matched_versions = [version_data for article in article_data for version_data in article_data[article]]
+            if len(matched_versions) == 0:
+                return []
+            self.__check_required_space_for_versions(matched_versions, curation_storage_location)
+            if self.system_config['dry-run'] == 'False':
+                self.prefetch_article_version_files(matched_versions)
+            return [(article, article_data[article]) for article in article_data if len(article_data[article]) > 0]
+
+        def download_article(article_versions):
+            return self.__stage_article_versions(article_versions[0], article_versions[1], curation_storage_location)
+
+        def bag_version(staged_version):
+            nonlocal processed_count
+            if self.__finish_version(staged_version):
+                with self.counts_lock:
+                    processed_count += 1
+            return []
+
+        # Matching and the summary counts it keeps are not thread safe, so pages are fetched and matched by one worker each
+        pipeline = Pipeline([Stage('fetch', lambda _: self.iter_article_pages()),
+                             Stage('match', match_page, 1, self.pipeline_queue_size),
+                             Stage('download', download_article, self.pipeline_download_workers, self.pipeline_queue_size),
+                             Stage('bag', bag_version, self.pipeline_bag_workers, self.pipeline_queue_size)],
+                            self.logs, self.pipeline_status_interval)
+        try:
+            pipeline.run([None])
+        finally:
+            self.client.clear_prefetched()
+
+        self.logs.write_log_in_file("info", "Total size of articles processed: "
+                                    + f"{self.total_all_articles_file_size} bytes", True)
+        self.log_matched_articles()
+        return self.get_processing_counts(processed_count)
+
+    """
+    Check there is enough space in preservation storage for the given matched article versions and their
+    curation folders. Stops the script if there is not.
+    :param matched_versions list of version data.
+    :param curation_storage_location string
+    """
+    def __check_required_space_for_versions(self, matched_versions, curation_storage_location):
+        articles_file_size = sum(version_data['size'] for version_data in matched_versions)
+        curation_folder_size = 0
+        for version_data in matched_versions:
+            path = os.path.join(curation_storage_location, version_data['author_dir'], format_version(version_data['version']))
+            curation_folder_size += self.get_ual_rdm_size_of_given_path(path)
+        required_space = curation_folder_size + articles_file_size
+        self.logs.write_log_in_file("info", f"Total space required for the matched articles of this page: {required_space} bytes", True)
+        self.check_required_space(required_space)
+
+    """
+    Counts returned by process_articles, process_articles_streaming and process_articles_pipelined.
+    :param processed_count int number of successfully processed article versions.
+    """
+    def get_processing_counts(self, processed_count):
+        return processed_count, self.skipped_items_counts_dict['ap_trust_preserved_versions'], \
+            self.skipped_items_counts_dict['wasabi_preserved_versions'], len(self.skipped_items_counts_dict['articles_with_processing_error']), \
+            self.skipped_items_counts_dict['articles_versions_with_processing_error']
+
+    """
+    Process matched article versions: create the preservation package folder, download files, copy curation files and
+    run post-processing for each version. Returns the number of successfully processed versions.
+    With more than one worker, articles are processed in parallel. The versions of an article are always processed
+    in order by the same worker.
+    :param article_data dict matched article versions keyed by article id.
+    :param curation_storage_location string
+    """
+    def __process_matched_articles(self, article_data, curation_storage_location):
+        processed_count = 0
+        if self.workers <= 1:
+            for article in article_data:
+                processed_count += self.__process_article_versions(article, article_data[article], curation_storage_location)
+            return processed_count
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [executor.submit(self.__process_article_versions, article, article_data[article], curation_storage_location)
+                       for article in article_data if len(article_data[article]) > 0]
+            # An error in any worker (e.g. an aborted execution) is raised as soon as it happens
+            for future in as_completed(futures):
+                processed_count += future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return processed_count
+
+    """
+    Process the matched versions of one article, see __process_matched_articles.
+    Returns the number of successfully processed versions.
+    """
+    def __process_article_versions(self, article, article_versions_list, curation_storage_location):
+        processed_count = 0
+        for staged_version in self.__stage_article_versions(article, article_versions_list, curation_storage_location):
+            if self.__finish_version(staged_version):
+                processed_count += 1
+        return processed_count
+
+    """
+    Bag a version staged by __stage_article_versions. Returns True if the version was processed successfully.
+    :param staged_version dict
+    """
+    def __finish_version(self, staged_version):
+        if staged_version['bag']:
+            return self.__bag_version_package(staged_version['success'], staged_version['check_dir'], staged_version['version_data'],
+                                              staged_version['value_pre_process'])
+        return staged_version['success']
+
+    """
+    Stage the matched versions of an article for bagging: create the preservation package folder, download files and
+    copy curation files. Versions are staged one after the other, and each version is yielded once staged as a dict
+    to be passed to __finish_version.
+    :param article article id.
+    :param article_versions_list list of matched version data of the article.
+    :param curation_storage_location string
+    """
+    def __stage_article_versions(self, article, article_versions_list, curation_storage_location):
+        for version_data in article_versions_list:
+            folder_name = None
+            if version_data is not None or len(version_data) > 0:
+                version_no = format_version(version_data["version"])
+
+                # Checking local staging storage if a folder exists for package
+                # Reuse folder name if folder exists
+                version_staging_local_storage_list = \
+                    check_local_path(version_data["id"], version_data['version'],
+                                     self.system_config['ingest_staging_storage'])
+                if len(version_staging_local_storage_list) > 1:
+                    self.logs.write_log_in_file("warning",
+                                                f"Multiple copies of article {version_data['id']} version {version_data['version']} "
+                                                + "found in preservation staging local storage",
+                                                True)
+                if compare_hash(version_data['version_md5'], version_staging_local_storage_list):
+                    self.logs.write_log_in_file("info", f"Article {version_data['id']} version {version_data['version']} "
+                                                + "already staged for preservation.",
+                                                True)
+                    folder_name = get_folder_name_in_local_storage(self.system_config['ingest_staging_storage'],
+                                                                   version_data['id'], version_data['version'], version_data['version_md5'])
+                if folder_name is None:
+                    first_depositor_last_name = version_data['authors'][0]['last_name'].replace('-', '').replace(' ', '')
+                    formatted_depositor_full_name = slugify(first_depositor_last_name, separator="_", lowercase=False)
+                    folder_name = self.bag_name_prefix + "_" + str(version_data["id"]) + "-" + version_no + "-"
+                    folder_name += formatted_depositor_full_name + "-" + version_data['version_md5'] + "_bag1of1_" + str(self.bag_creation_date)
+
+                if (version_data["matched"] is True):
+                    self.logs.write_log_in_file("info", f"------- Processing article {article} version {version_data['version']}.", True)
+
+                    # call pre process script function for each matched item.
+                    if self.system_config['dry-run'] == 'False':
+                        value_pre_process = self.pre_process_script_function()
+                    else:
+                        value_pre_process = 0
+                        self.logs.write_log_in_file("info", "*Dry Run* Skipping pre processing.", True)
+
+                    if (value_pre_process == 0):
+                        self.logs.write_log_in_file("info", "Pre-processing script finished successfully.", True)
+                        # check main folder exists in preservation storage.
+                        ingest_staging_storage = self.ingest_staging_storage
+                        check_dir = os.path.join(ingest_staging_storage, folder_name)
+                        check_files = True
+                        copy_files = True
+                        self.logs.write_log_in_file("info", f"Checking if {check_dir} exists.", True)
+                        if (os.path.exists(check_dir) is True):
+                            get_dirs = os.listdir(check_dir)
+                            if (len(get_dirs) > 0):
+                                self.logs.write_log_in_file("info", "Exists and is not empty, checking contents.", True)
+                                check_files = self.__check_file_hash(version_data['files'], version_data, folder_name)
                             else:
-                                value_post_process = 0
+                                self.logs.write_log_in_file("info", "Exists and is empty", True)
+                                check_files = False
+
                                 if self.system_config['dry-run'] == 'False':
-                                    self.logs.write_log_in_file("info", "Does not exist. Folder will be created", True)
+                                    # delete folder if validation fails
+                                    self.delete_folder(check_dir)
+                                    # call post process script function for each matched item. Code 5 corresponds to step 5 of S4.4 in the spec.
+                                    value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process, 5)
+                                    if (value_post_process != 0):
+                                        self.logs.write_log_in_file("error", f"{version_data['id']} version {version_data['version']} - "
+                                                                    + "Post-processing script error found.", True)
                                 else:
-                                    self.logs.write_log_in_file("info", "*Dru Run* Does not exist. Folder will not be created", True)
-
-                            # end check main folder exists in preservation storage.
-                            # check required files exist in curation UAL_RDM folder
-                            self.logs.write_log_in_file("info", "Checking required files exist in associated curation "
-                                                        + f"folder {curation_storage_location}.", True)
-                            copy_files = self.__can_copy_files(version_data)
+                                    self.logs.write_log_in_file("info", "*Dry Run* File download and post-processing with "
+                                                                + f"{self.system_config['post_process_script_command']} skipped.", True)
 
+                                break
+                        else:
+                            value_post_process = 0
                             if self.system_config['dry-run'] == 'False':
-                                if self.__final_process(check_files, copy_files, check_dir, version_data, folder_name, version_no, value_pre_process):
-                                    processed_count += 1
+                                self.logs.write_log_in_file("info", "Does not exist. Folder will be created", True)
                             else:
-                                processed_count += 1
-                                self.logs.write_log_in_file("info", "*Dry Run* File download and post-processing with "
-                                                            + f"{self.system_config['post_process_script_command']} skipped.", True)
+                                self.logs.write_log_in_file("info", "*Dru Run* Does not exist. Folder will not be created", True)
+
+                        # end check main folder exists in preservation storage.
+                        # check required files exist in curation UAL_RDM folder
+                        self.logs.write_log_in_file("info", "Checking required files exist in associated curation "
+                                                    + f"folder {curation_storage_location}.", True)
+                        copy_files = self.__can_copy_files(version_data)
+
+                        if self.system_config['dry-run'] == 'False':
+                            success, bag = self.__prepare_version_package(check_files, copy_files, check_dir, version_data, folder_name,
+                                                                          version_no)
+                            yield {'version_data': version_data, 'check_dir': check_dir, 'value_pre_process': value_pre_process,
+                                   'success': success, 'bag': bag}
                         else:
-                            self.logs.write_log_in_file("error", "Pre-processing script failed. Running post-processing script.", True)
-                            # call post process script function for each matched item.
-                            if self.check_dart:
-                                value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process)
-                                if (value_post_process != 0):
-                                    self.logs.write_log_in_file("error", f"{version_data['id']} version {version_data['version']} - "
-                                                                + "Post-processing script failed.", True)
-                            else:
-                                self.logs.write_log_in_file("error",
-                                                            f"dart-runner not available. No bagging for {version_data['id']} "
-                                                            + f"version {version_data['version']}",
-                                                            True)
-                                if self.system_config['continue-on-error'] == "False":
-                                    self.logs.write_log_in_file("info", "Aborting execution.", True, True)
-        return processed_count, self.skipped_items_counts_dict['ap_trust_preserved_versions'], \
-            self.skipped_items_counts_dict['wasabi_preserved_versions'], len(self.skipped_items_counts_dict['articles_with_processing_error']), \
-            self.skipped_items_counts_dict['articles_versions_with_processing_error']
+                            self.logs.write_log_in_file("info", "*Dry Run* File download and post-processing with "
+                                                        + f"{self.system_config['post_process_script_command']} skipped.", True)
+                            yield {'version_data': version_data, 'success': True, 'bag': False}
+                    else:
+                        self.logs.write_log_in_file("error", "Pre-processing script failed. Running post-processing script.", True)
+                        # call post process script function for each matched item.
+                        if self.check_dart:
+                            value_post_process = self.processor.post_process_script_function("Article", check_dir, value_pre_process)
+                            if (value_post_process != 0):
+                                self.logs.write_log_in_file("error", f"{version_data['id']} version {version_data['version']} - "
+                                                            + "Post-processing script failed.", True)
+                        else:
+                            self.logs.write_log_in_file("error",
+                                                        f"dart-runner not available. No bagging for {version_data['id']} "
+                                                        + f"version {version_data['version']}",
+                                                        True)
+                            if self.system_config['continue-on-error'] == "False":
+                                self.logs.write_log_in_file("info", "Aborting execution.", True, True)
 
     """
     Preservation and Curation directory access check while processing.
@@ -1341,6 +2152,21 @@ class Article:
         else:
             return 0
 
+    """
+    Remove the files of the local file store that are not used by any package in preservation staging storage any more,
+    and the partial downloads not resumed for partial_download_max_age_days.
+    """
+    def clean_download_storage(self):
+        if self.content_store is not None:
+            removed, freed = self.content_store.collect_garbage()
+            if removed > 0:
+                self.logs.write_log_in_file("info", f"Removed {removed} unused files ({freed} bytes) from local file store.", True)
+        if self.partial_download_max_age_days > 0:
+            removed, freed = remove_stale_partials(self.partial_download_dir, self.partial_download_max_age_days)
+            if removed > 0:
+                self.logs.write_log_in_file("info", f"Removed {removed} partial downloads ({freed} bytes) not resumed for "
+                                            + f"{self.partial_download_max_age_days} days.", True)
+
     """
     Delete folder
     """
@@ -0,0 +1,276 @@
+import json
+import asyncio
+import threading
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter, Retry
+from requests.structures import CaseInsensitiveDict
+from figshare.HTTPCache import HTTPCache
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Status codes of transient errors, for which a request is worth sending again
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class PrefetchedResponse:
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers=None) -> None:
+        """
+        Response read by the asyncio client, with the parts of requests.Response used by ReBACH
+
+        :param url: Request url
+        :param status_code: HTTP status code
+        :param content: Response body
+        :param headers: Response headers
+        """
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """
+        Raise requests.HTTPError for a 4xx or 5xx status code, like requests.Response.raise_for_status
+        """
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(f"{self.status_code} {kind} Error for url: {self.url}", response=self)
+
+
+class FigshareClient:
+
+    def __init__(self, token: str = '', retries: int = 3, timeout: int = 10, pool_size: int = 10, cache: HTTPCache = None) -> None:
+        """
+        HTTP client for the Figshare API shared by all threads. Connections are kept alive in a pool of
+        `pool_size` connections per host, requests get a default timeout, and connections that could not be
+        established are retried by the transport adapter. Responses with an error status are returned as they are,
+        as the callers retry them with their own retry loops. Each thread gets its own
+        requests.Session, but all sessions share the same adapter and so the same connection pool.
+
+        Responses can be fetched ahead of time with prefetch, from a thread pool or from an asyncio event loop. The
+        next get of a prefetched url with the same authentication returns the stored response instead of sending the
+        request again, so prefetching works as a cache in front of the synchronous callers. The asyncio event loop
+        runs in its own thread and, with its aiohttp session, is kept for all prefetches until close.
+
+        If a cache is given, requests made with `cached` revalidate the cached response with a conditional request
+        and a 304 Not Modified response is answered with the cached body.
+
+        :param token: Figshare API token, sent with authenticated requests
+        :param retries: Number of times the adapter retries to connect
+        :param timeout: Default connect and read timeout in seconds
+        :param pool_size: Number of connections kept alive per host
+        :param cache: On-disk cache for the responses of requests made with `cached`. No caching if None.
+        """
+        self.token = token
+        self.timeout = timeout if timeout and timeout > 0 else None
+        # Only failed connections are retried here: retrying error statuses or read errors as well would multiply
+        # the requests and waits of the callers' retry loops
+        retry_strategy = Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=1,
+                               allowed_methods=['GET', 'HEAD'], raise_on_status=False)
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry_strategy)
+        self._local = threading.local()
+        self._prefetched = {}
+        self._prefetched_lock = threading.Lock()
+        self.cache = cache
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._async_session = None
+
+    def get_session(self) -> requests.Session:
+        """
+        Return the session of the calling thread, creating it on first use
+
+        :return: Session using the shared adapter
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str, authenticated: bool = False, cached: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a GET request, or return the prefetched response for the url
+
+        :param url: Request url
+        :param authenticated: Send the API token in the Authorization header
+        :param cached: Use the on-disk cache for the response. Only for urls without params whose responses do not change often.
+        :param kwargs: Passed on to requests.Session.get. The default timeout is used if no timeout is given.
+        :return: Response
+        """
+        if not kwargs.get('stream'):
+            with self._prefetched_lock:
+                response = self._prefetched.pop((get_request_url(url, kwargs.get('params')), authenticated), None)
+            if response is not None:
+                return response
+        kwargs.setdefault('timeout', self.timeout)
+        if authenticated:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, Authorization='token ' + self.token)
+        cached_body = None
+        if cached and self.cache is not None:
+            conditional_headers, cached_body = self.cache.get_conditional_headers(url)
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **(conditional_headers or {}))
+        response = self.get_session().get(url, **kwargs)
+        if cached and self.cache is not None:
+            return self._update_cache(url, response.status_code, response.headers, response.content, cached_body) or response
+        return response
+
+    def prefetch(self, urls: list, authenticated: bool = False, concurrency: int = 1, use_async: bool = False,
+                 cached: bool = False) -> list:
+        """
+        Fetch urls concurrently and keep the successful responses for the next get of each url.
+        Nothing is fetched if concurrency is 1 or less.
+
+        :param urls: Urls to fetch. An item can also be a (url, params) tuple.
+        :param authenticated: Send the API token in the Authorization header. Only a get with the same value
+                              returns the prefetched responses.
+        :param concurrency: Maximum number of requests sent at the same time
+        :param use_async: Send the requests from an asyncio event loop instead of a thread pool. Falls back to
+                          threads if aiohttp is not installed.
+        :param cached: Use the on-disk cache for the responses, see get
+        :return: Response for each url in the same order, None if the request failed
+        """
+        request_urls = [get_request_url(*url) if isinstance(url, tuple) else url for url in urls]
+        if concurrency <= 1 or len(request_urls) == 0:
+            return [None] * len(request_urls)
+        if use_async and aiohttp is not None:
+            responses = asyncio.run_coroutine_threadsafe(self._fetch_all_async(request_urls, authenticated, concurrency, cached),
+                                                         self._get_event_loop()).result()
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                responses = list(executor.map(lambda request_url: self._fetch(request_url, authenticated, cached), request_urls))
+        with self._prefetched_lock:
+            for request_url, response in zip(request_urls, responses):
+                if response is not None and response.status_code == 200:
+                    self._prefetched[(request_url, authenticated)] = response
+        return responses
+
+    def _fetch(self, url: str, authenticated: bool, cached: bool):
+        try:
+            return self.get(url, authenticated, cached)
+        except requests.exceptions.RequestException:
+            return None
+
+    def _get_event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Return the event loop of the asynchronous prefetches, starting it in its own thread on first use
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name='figshare-async', daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    async def _fetch_all_async(self, urls: list, authenticated: bool, concurrency: int, cached: bool) -> list:
+        if self._async_session is None:
+            # Created in the event loop, and reused by the following prefetches so that connections are kept alive
+            timeout = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+            self._async_session = aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=concurrency))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                headers = {'Authorization': 'token ' + self.token} if authenticated else {}
+                cached_body = None
+                if cached and self.cache is not None:
+                    conditional_headers, cached_body = self.cache.get_conditional_headers(url)
+                    headers.update(conditional_headers or {})
+                try:
+                    async with self._async_session.get(url, headers=headers) as response:
+                        body = await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    return None
+                if cached and self.cache is not None:
+                    cached_response = self._update_cache(url, response.status, response.headers, body, cached_body)
+                    if cached_response is not None:
+                        return cached_response
+                return PrefetchedResponse(url, response.status, body, response.headers)
+
+        return await asyncio.gather(*(fetch(url) for url in urls))
+
+    def _update_cache(self, url: str, status_code: int, headers, body: bytes, cached_body: bytes):
+        """
+        Store a fresh response in the cache, or answer a 304 Not Modified response with the cached body
+
+        :return: Response with the cached body if the cached response is still valid, otherwise None
+        """
+        if status_code == 304 and cached_body is not None:
+            self.cache.touch(url)
+            return PrefetchedResponse(url, 200, cached_body, headers)
+        if status_code == 200:
+            self.cache.put(url, headers.get('ETag'), headers.get('Last-Modified'), body)
+        return None
+
+    def clear_prefetched(self) -> None:
+        """
+        Discard the prefetched responses that were not used
+        """
+        with self._prefetched_lock:
+            self._prefetched.clear()
+
+    def close(self) -> None:
+        self.adapter.close()
+        with self._loop_lock:
+            if self._loop is not None:
+                if self._async_session is not None:
+                    asyncio.run_coroutine_threadsafe(self._async_session.close(), self._loop).result()
+                    self._async_session = None
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
+                self._loop.close()
+                self._loop = None
+
+
+def get_request_url(url: str, params: dict = None) -> str:
+    """
+    Return the url with the query string built from params, as it is sent by requests
+
+    :param url: Request url
+    :param params: Query parameters
+    :return: Full request url
+    """
+    if not params:
+        return url
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+def get_retry_after(response) -> float:
+    """
+    Return the time to wait before sending a request again, as given by the Retry-After header of the response
+
+    :param response: Response with status code 429 or 503
+    :return: Number of seconds, or None if the header is missing or not valid
+    """
+    retry_after = response.headers.get('Retry-After') if response.headers is not None else None
+    if not retry_after:
+        return None
+    if retry_after.strip().isdigit():
+        return float(retry_after)
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def async_harvest_available() -> bool:
+    return aiohttp is not None
@@ -1,14 +1,13 @@
 import json
 import shutil
 import os
-import requests
 import hashlib
 from datetime import datetime
 from figshare.Article import Article
 from figshare.Integration import Integration
 from figshare.Utils import standardize_api_result, sorter_api_result, get_preserved_version_hash_and_size, format_version, metadata_to_hash
 from figshare.Utils import compare_hash, check_wasabi, check_local_path, get_folder_name_in_local_storage, upload_to_remote, stringify_metadata
-from figshare.Utils import inspect_dart
+from figshare.Utils import inspect_dart, get_figshare_client
 
 
 class Collection:
@@ -32,13 +31,21 @@ class Collection:
         self.retries = int(figshare_config["retries"]) if figshare_config["retries"] is not None else 3
         self.retry_wait = int(figshare_config["retries_wait"]) if figshare_config["retries_wait"] is not None else 10
         self.institution = int(figshare_config["institution"])
+        self.client = get_figshare_client(figshare_config, self.system_config)
         self.logs = log
         self.errors = []
+        # True if the list of collections could not be fetched completely
+        self.listing_fetch_failed = False
+        # IDs of collections that could not be fetched or processed in this run, see get_failed_ids
+        self.failed_collection_ids = set()
         self.article_obj = Article(config, log, ids)
         self.ingest_staging_storage = self.system_config["ingest_staging_storage"]
         if self.ingest_staging_storage[-1] != "/":
             self.ingest_staging_storage = self.ingest_staging_storage + "/"
         self.input_collection_ids = ids
+        self.modified_since = ''
+        if self.article_obj.harvest_state is not None and not self.input_collection_ids:
+            self.modified_since = self.article_obj.harvest_state.get_modified_since('collections')
         self.already_preserved_counts_dict = {'already_preserved_collection_ids': set(), 'locally_preserved_versions': 0,
                                               'already_preserved_versions': 0, 'wasabi_preserved_versions': 0,
                                               'ap_trust_preserved_versions': 0
@@ -53,6 +60,8 @@ class Collection:
     Static variables implemented for pagination. page, page_size, no_of_pages.
     On successful response from above mentioned API, __get_collection_versions
     will be called with collection param.
+    In incremental harvest, the collections that the last harvest could not fetch
+    or process are fetched directly from the collections API first.
     """
     def get_collections(self):
         collections_api_url = self.get_collection_api_url()
@@ -60,6 +69,27 @@ class Collection:
         success = False
         collection_data = {}
         page = 1
+        listing_ids = self.input_collection_ids
+        # Collections fetched directly are left out of the list of collections
+        fetched_ids = set()
+        if self.input_collection_ids:
+            collection_data, listing_ids = self.get_collections_by_id(collection_data, self.input_collection_ids)
+            if len(listing_ids) == 0:
+                self.article_obj.client.clear_prefetched()
+                return collection_data
+            self.logs.write_log_in_file("info", f"Looking for IDs {listing_ids} in the list of collections.", True)
+        elif self.modified_since and len(self.article_obj.harvest_state.get_failed_ids('collections')) > 0:
+            retry_ids = self.article_obj.harvest_state.get_failed_ids('collections')
+            self.logs.write_log_in_file("info", f"Fetching again collections {retry_ids} that the last harvest could not fetch or process.",
+                                        True)
+            collection_data, unresolved_ids = self.get_collections_by_id(collection_data, retry_ids)
+            if len(unresolved_ids) > 0:
+                self.logs.write_log_in_file("warning", f"Collections {unresolved_ids} could not be fetched again. The next run tries "
+                                            + "again, and the next full harvest looks for them in the list.", True)
+            self.failed_collection_ids.update(unresolved_ids)
+            fetched_ids = set(retry_ids) - set(unresolved_ids)
+        if self.modified_since:
+            self.logs.write_log_in_file("info", f"Incremental harvest. Fetching collections modified since {self.modified_since}.", True)
         while not success and retries <= int(self.retries):
             try:
                 # pagination implemented.
@@ -69,8 +99,9 @@ class Collection:
                 while (not page_empty):
                     self.logs.write_log_in_file("info", f"Getting page {page} of collections. Total amount of pages not available.", True)
                     params = {'page': page, 'page_size': page_size, 'institution': self.institution}
-                    get_response = requests.get(collections_api_url, params=params,
-                                                timeout=self.retry_wait)
+                    if self.modified_since:
+                        params['modified_since'] = self.modified_since
+                    get_response = self.client.get(collections_api_url, params=params)
                     if (get_response.status_code == 200):
                         collections = get_response.json()
                         if (len(collections) == 0):
@@ -78,13 +109,12 @@ class Collection:
                             self.logs.write_log_in_file("info", "Page of collections is empty.", True)
                             break
 
-                        if (self.input_collection_ids):
-                            filtered_data = [item for item in collections if item['id'] in self.input_collection_ids]
-                            filtered_json = json.dumps(filtered_data)
-                            filtered_collections = json.loads(filtered_json)
+                        if (listing_ids):
+                            filtered_collections = [item for item in collections if item['id'] in listing_ids]
                             collection_data = self.collections_loop(filtered_collections, page_size, page, collection_data)
                         else:
-                            collection_data = self.collections_loop(collections, page_size, page, collection_data)
+                            collection_data = self.collections_loop(self.filter_listed_collections(collections, fetched_ids),
+                                                                    page_size, page, collection_data)
 
                         success = True
                     else:
@@ -92,6 +122,7 @@ class Collection:
                         retries = self.article_obj.retries_if_error(
                             f"API is not reachable. Retry {retries}", get_response.status_code, retries)
                         if (retries > self.retries):
+                            self.listing_fetch_failed = True
                             break
                     page += 1
 
@@ -99,11 +130,84 @@ class Collection:
                 success = False
                 retries = self.article_obj.retries_if_error(e, 500, retries)
                 if (retries > self.retries):
+                    self.listing_fetch_failed = True
                     break
 
         return collection_data
 
+    """
+    Fetch the given collection IDs directly from the collections API and fetch their versions and articles.
+    :param collection_data dict
+    :param collection_ids list
+    :return collection_data dict, and list of IDs that could not be fetched, as they are not public or the API did not
+    answer. IDs of collections of other institutions are not returned.
+    """
+    def get_collections_by_id(self, collection_data, collection_ids):
+        collections = []
+        unresolved_ids = []
+        collections_api_url = self.get_collection_api_url()
+        self.article_obj.prefetch([f"{collections_api_url}/{collection_id}" for collection_id in collection_ids])
+        for collection_id in collection_ids:
+            self.logs.write_log_in_file("info", f"Getting collection {collection_id}.", True)
+            collection, resolved = self.get_collection_by_id(collection_id)
+            if collection is not None:
+                collections.append(collection)
+            elif not resolved:
+                unresolved_ids.append(collection_id)
+        return self.collections_loop(collections, len(collections), 1, collection_data), unresolved_ids
+
+    """
+    Fetch a collection from the collections API.
+    :param collection_id int
+    :return collection dict or None, and boolean telling if the collection was resolved. The collection is None and
+    resolved if it belongs to another institution. It is None and not resolved if the API does not have it or did not answer.
+    """
+    def get_collection_by_id(self, collection_id):
+        retries = 1
+        while retries <= int(self.retries):
+            try:
+                get_response = self.client.get(f"{self.get_collection_api_url()}/{collection_id}")
+                if (get_response.status_code == 200):
+                    collection = get_response.json()
+                    if collection.get('institution_id', self.institution) != self.institution:
+                        self.logs.write_log_in_file("warning", f"{collection_id} - Collection of institution "
+                                                    + f"{collection['institution_id']}. It will be skipped.", True)
+                        return None, True
+                    return collection, True
+                elif (get_response.status_code == 404):
+                    self.logs.write_log_in_file("info", f"{collection_id} - Not found in the collections API.", True)
+                    return None, False
+                retries = self.article_obj.retries_if_error(f"{collection_id} API not reachable. Retry {retries}",
+                                                            get_response.status_code, retries)
+            except Exception as e:
+                retries = self.article_obj.retries_if_error(f"{e}. Retry {retries}", 500, retries)
+        return None, False
+
+    """
+    Collections of a page of the list of collections to fetch. In incremental harvest, only collections modified since the
+    watermark are kept.
+    :param collections list of collections from the collections API.
+    :param fetched_ids set of IDs of collections already fetched directly, which are left out.
+    :return list of collections
+    """
+    def filter_listed_collections(self, collections, fetched_ids):
+        collections = [collection for collection in collections if collection['id'] not in fetched_ids]
+        if self.modified_since:
+            # Collections listed without modified date are kept
+            collections = [collection for collection in collections
+                           if (collection.get('modified_date') or self.modified_since) >= self.modified_since]
+        return collections
+
+    """
+    IDs of the collections that could not be fetched or processed in this run. They are fetched again by ID in the next
+    incremental harvest.
+    :return set of collection IDs
+    """
+    def get_failed_ids(self):
+        return self.failed_collection_ids
+
     def collections_loop(self, collections, page_size, page, collection_data):
+        self.prefetch_collection_versions(collections)
         no_of_col = 0
         for collection in collections:
             no_of_col = no_of_col + 1
@@ -112,8 +216,28 @@ class Collection:
             coll_articles = self.__get_collection_articles(collection)
             collection_data[collection['id']] = {"versions": coll_versions, "articles": coll_articles}
 
+        self.article_obj.client.clear_prefetched()
         return collection_data
 
+    """
+    Fetch concurrently the versions list, the version metadata and the first page of articles of the given collections.
+    The shared client returns the responses to __get_collection_versions, __get_collection_metadata_by_version and
+    __get_collection_articles, which still process the collections one at a time. See Article.prefetch_article_versions.
+    :param collections list of collections from the collections API.
+    """
+    def prefetch_collection_versions(self, collections):
+        collections = [collection for collection in collections if collection]
+        versions_responses = self.article_obj.prefetch([collection['url'] + "/versions" for collection in collections]
+                                                       + [(self.get_article_api_url(collection), {'page': 1, 'page_size': 100})
+                                                          for collection in collections])
+        metadata_urls = []
+        for versions_response in versions_responses[:len(collections)]:
+            try:
+                metadata_urls += [version['url'] for version in versions_response.json()]
+            except (AttributeError, ValueError):
+                continue
+        self.article_obj.prefetch(metadata_urls, cached=True)
+
     """
     This function will send request to fetch collection versions.
     :param collection object.
@@ -130,7 +254,7 @@ class Collection:
                 if (collection):
                     public_url = collection['url']
                     version_url = public_url + "/versions"
-                    get_response = requests.get(version_url, timeout=self.retry_wait)
+                    get_response = self.client.get(version_url)
                     if (get_response.status_code == 200):
                         versions = get_response.json()
                         metadata = []
@@ -143,7 +267,7 @@ class Collection:
                             return metadata
                         else:
                             self.logs.write_log_in_file("info", f"{collection['id']} - Entity not found. It will be skipped during processing.")
-                            break
+                            return None
                     else:
                         retries = self.article_obj.retries_if_error(
                             f"Public verion URL is not reachable. Retry {retries}", get_response.status_code, retries)
@@ -155,6 +279,8 @@ class Collection:
                 retries = self.article_obj.retries_if_error(e, 500, retries)
                 if (retries > self.retries):
                     break
+        if collection:
+            self.failed_collection_ids.add(collection['id'])
 
     """
     Fetch collection metadata by version url.
@@ -171,7 +297,7 @@ class Collection:
             try:
                 if (version):
                     public_url = version['url']
-                    get_response = requests.get(public_url, timeout=self.retry_wait)
+                    get_response = self.client.get(public_url, cached=True)
                     if (get_response.status_code == 200):
                         version_data = get_response.json()
                         version_metadata = version_data
@@ -189,6 +315,8 @@ class Collection:
                 retries = self.article_obj.retries_if_error(f"{e}. Retry {retries}", get_response.status_code, retries)
                 if (retries > self.retries):
                     break
+        if version:
+            self.failed_collection_ids.add(collection_id)
 
     def __get_collection_articles(self, collection):
         """
@@ -208,7 +336,7 @@ class Collection:
                 while (not page_empty):
                     self.logs.write_log_in_file("info", f"Fetching page {page} of collection articles. Collection ID: {collection['id']}.", True)
                     params = {'page': page, 'page_size': page_size}
-                    get_response = requests.get(coll_articles_api, params=params, timeout=self.retry_wait)
+                    get_response = self.client.get(coll_articles_api, params=params)
                     if (get_response.status_code == 200):
                         articles_list_res = get_response.json()
                         if (len(articles_list_res) == 0):
@@ -234,6 +362,8 @@ class Collection:
                 retries = self.article_obj.retries_if_error(e, 500, retries)
                 if (retries > self.retries):
                     break
+        if not page_empty:
+            self.failed_collection_ids.add(collection['id'])
 
         return articles_list
 
@@ -282,7 +412,7 @@ class Collection:
 
                 # Checking archival storage (remote) for existence of package
                 version_final_storage_preserved_list = \
-                    get_preserved_version_hash_and_size(version['id'], version['version'])
+                    get_preserved_version_hash_and_size(version['id'], version['version'], self.system_config)
                 if len(version_final_storage_preserved_list) > 1:
                     self.logs.write_log_in_file("warning",
                                                 f"Multiple copies of collection {version['id']} version {version['version']} "
@@ -306,7 +436,9 @@ class Collection:
 
                 # Checking alternative archival staging storage (remote) for existence of package
                 if self.system_config['check-remote-staging'] == 'True' or upload_item:
-                    version_staging_storage_preserved_list = check_wasabi(version['id'], version['version'])
+                    # For targeted runs only look up this version instead of listing the whole bucket
+                    version_staging_storage_preserved_list = check_wasabi(version['id'], version['version'],
+                                                                          self.bag_name_prefix if self.input_collection_ids else '')
                     if len(version_staging_storage_preserved_list) > 1:
                         self.logs.write_log_in_file("warning",
                                                     f"Multiple copies of collection {version['id']} version {version['version']} "
@@ -376,12 +508,14 @@ class Collection:
                         value_post_process = self.processor.post_process_script_function("Collection", collection_preservation_path)
                         if (value_post_process != 0):
                             self.logs.write_log_in_file("error", f"collection {collection} - post-processing script failed.", True)
+                            self.failed_collection_ids.add(collection)
                         else:
                             processed_count += 1
                     else:
                         self.logs.write_log_in_file("error",
                                                     f"dart-runner not available. No bagging for collection {collection}",
                                                     True)
+                        self.failed_collection_ids.add(collection)
                         if self.system_config['continue-on-error'] == "False":
                             self.logs.write_log_in_file("info", "Aborting execution.", True, True)
                 else:
@@ -428,7 +562,7 @@ class Collection:
             try:
                 collection_api_url = self.get_collection_api_url()
                 collection_api_url = collection_api_url + '/' + str(collection_id)
-                get_response = requests.get(collection_api_url, timeout=self.retry_wait)
+                get_response = self.client.get(collection_api_url)
                 if (get_response.status_code == 200):
                     collection = get_response.json()
                     coll_versions = self.__get_collection_versions(collection)
@@ -0,0 +1,90 @@
+import os
+
+
+class ContentStore:
+
+    def __init__(self, store_dir: str) -> None:
+        """
+        Store of downloaded files on the ingest staging file system, keyed by MD5 hash and size. Files are hard linked
+        between the store and the packages, so a file downloaded for one article version can be put in the package of
+        another version without downloading it again, and without taking more space.
+
+        The number of links of an entry counts its users: an entry with a single link is not used by any package
+        any more and is removed by collect_garbage.
+
+        :param store_dir: Directory of the store, on the same file system as the packages. Created on first use.
+        """
+        self.store_dir = store_dir
+
+    def get_entry_path(self, md5: str, size: int) -> str:
+        """
+        Return the path of the entry of a file in the store
+
+        :param md5: MD5 hash of the file
+        :param size: Size of the file in bytes
+        """
+        return os.path.join(self.store_dir, md5[:2], f"{md5}_{size}")
+
+    def link(self, md5: str, size: int, file_path: str) -> bool:
+        """
+        Put a file from the store at the given path, replacing any file there
+
+        :param md5: MD5 hash of the file
+        :param size: Size of the file in bytes
+        :param file_path: Path of the file in the package
+        :return: True if the file is in the store and was linked, False otherwise
+        """
+        entry_path = self.get_entry_path(md5, size)
+        try:
+            if os.path.getsize(entry_path) != size:
+                return False
+            if os.path.lexists(file_path):
+                os.remove(file_path)
+            os.link(entry_path, file_path)
+        except OSError:
+            return False
+        return True
+
+    def add(self, md5: str, size: int, file_path: str) -> bool:
+        """
+        Add a downloaded file to the store. The hash of the file must have been checked.
+
+        :param md5: MD5 hash of the file
+        :param size: Size of the file in bytes
+        :param file_path: Path of the file in the package
+        :return: True if the file is in the store, False if it could not be added, e.g. because the file system
+                 does not support hard links
+        """
+        entry_path = self.get_entry_path(md5, size)
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            os.link(file_path, entry_path)
+        except FileExistsError:
+            return True
+        except OSError:
+            return False
+        return True
+
+    def collect_garbage(self) -> tuple:
+        """
+        Remove the entries not used by any package, i.e. the entries without other links
+
+        :return: Tuple of the number of entries removed and their total size in bytes
+        """
+        removed = 0
+        freed = 0
+        if not os.path.isdir(self.store_dir):
+            return removed, freed
+        for prefix in os.scandir(self.store_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_nlink <= 1:
+                        os.remove(entry.path)
+                        removed += 1
+                        freed += stat.st_size
+                except OSError:
+                    continue
+        return removed, freed
@@ -0,0 +1,254 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def get_directory_file_sizes(root: str, max_workers: int = 1, executor: ThreadPoolExecutor = None) -> dict:
+    """
+    Walk a directory tree and total the size of the files directly in each directory. Directories are
+    read with os.scandir by a pool of threads, so that the stat latency of network storage overlaps.
+    Like os.walk, symbolic links to directories are not followed.
+
+    :param root: Path to the top of the tree
+    :param max_workers: Number of directories read at the same time. The tree is walked in the calling thread if 1 or less.
+    :param executor: Pool of threads reading the directories, shared by several walks. Replaces max_workers if given.
+    :return: dict mapping the path of each directory in the tree to the total size in bytes of its files
+    """
+    def scan_dir(path):
+        size = 0
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            size += entry.stat().st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return path, size, subdirs
+
+    sizes = {}
+    if executor is None:
+        if max_workers <= 1:
+            pending = [root]
+            while pending:
+                path, size, subdirs = scan_dir(pending.pop())
+                sizes[path] = size
+                pending.extend(subdirs)
+            return sizes
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return get_directory_file_sizes(root, executor=executor)
+
+    pending = {executor.submit(scan_dir, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, size, subdirs = future.result()
+            sizes[path] = size
+            pending.update(executor.submit(scan_dir, subdir) for subdir in subdirs)
+    return sizes
+
+
+class CurationIndex:
+
+    def __init__(self, curation_storage_location: str, exclude_dirs: list = None, snapshot_file: str = '',
+                 full_scan: bool = False, scan_workers: int = 1, save_snapshot: bool = True) -> None:
+        """
+        Index of the curation storage built with a single scan. Maps article ids to author directories
+        (e.g. 'John_Smith_546187'), author directories to version directories, and version directories to
+        their contents and UAL_RDM files. The scan happens on first use.
+
+        If a snapshot file is given, the index is saved to it after each scan and the next scan only reads
+        the author, version and UAL_RDM directories whose modification time changed. Files rewritten in place,
+        or changed in subdirectories of UAL_RDM, do not change the modification time of these directories, so
+        their sizes are only read again by a full scan.
+
+        :param curation_storage_location: Path to curation storage
+        :param exclude_dirs: Names of directories and files to ignore
+        :param snapshot_file: Path to the JSON file holding the snapshot of the previous scan. No snapshot is kept if empty.
+        :param full_scan: Ignore the snapshot and scan all directories
+        :param scan_workers: Number of author directories scanned at the same time, and of directories under
+                             UAL_RDM read at the same time
+        :param save_snapshot: Save the index to the snapshot file after each scan, e.g. not in dry runs
+        """
+        self.curation_storage_location = curation_storage_location
+        self.exclude_dirs = exclude_dirs if exclude_dirs is not None else []
+        self.snapshot_file = snapshot_file
+        self.save_snapshot = save_snapshot
+        self.full_scan = full_scan
+        self.scan_workers = max(1, scan_workers)
+        self.rescanned_versions = 0
+        self._rescanned_lock = threading.Lock()
+        self._article_dirs = None
+        self._author_dirs = None
+
+    def scan(self) -> None:
+        """
+        Scan the curation storage and (re)build the index
+        """
+        snapshot = {} if self.full_scan else self._load_snapshot()
+        previous_authors = snapshot.get('authors', {})
+        article_dirs = {}
+        author_dirs = {}
+        root_mtime_ns = 0
+        self.rescanned_versions = 0
+        if os.path.exists(self.curation_storage_location) and os.access(self.curation_storage_location, os.R_OK):
+            root_mtime_ns = os.stat(self.curation_storage_location).st_mtime_ns
+            if snapshot.get('mtime_ns') == root_mtime_ns:
+                author_names = list(previous_authors.keys())
+            else:
+                author_names = [entry.name for entry in os.scandir(self.curation_storage_location)
+                                if entry.name not in self.exclude_dirs and entry.is_dir()]
+            # UAL_RDM directories are walked by their own pool, as the author directories wait for the walks
+            with ThreadPoolExecutor(max_workers=self.scan_workers) as executor, ThreadPoolExecutor(max_workers=self.scan_workers) as walker:
+                futures = [(author_name, executor.submit(self._scan_author_dir, os.path.join(self.curation_storage_location, author_name),
+                                                         previous_authors.get(author_name), walker))
+                           for author_name in author_names]
+                for author_name, future in futures:
+                    try:
+                        author_dirs[author_name] = future.result()
+                    except FileNotFoundError:
+                        continue
+                    # check author name with article id directory exists like 'John_Smith_546187'
+                    for name_part in set(author_name.split('_')):
+                        article_dirs.setdefault(name_part, []).append(author_name)
+        self._article_dirs = article_dirs
+        self._author_dirs = author_dirs
+        self._save_snapshot({'curation_storage_location': self.curation_storage_location, 'mtime_ns': root_mtime_ns,
+                             'authors': author_dirs})
+
+    def _scan_author_dir(self, author_path: str, previous: dict = None, walker: ThreadPoolExecutor = None) -> dict:
+        """
+        Scan an author directory. The list of version directories is reused from the previous scan if the
+        author directory did not change.
+
+        :param author_path: Path to author directory
+        :param previous: Entry of the author directory in the previous scan, if any
+        :param walker: Pool of threads reading the directories under UAL_RDM, see get_directory_file_sizes
+        :return: dict with the modification time of the directory ('mtime_ns') and its version directories keyed by
+                 name ('versions'). See _scan_version_dir for values.
+        """
+        mtime_ns = os.stat(author_path).st_mtime_ns
+        previous_versions = previous['versions'] if previous else {}
+        if previous and previous['mtime_ns'] == mtime_ns:
+            version_names = list(previous_versions.keys())
+        else:
+            version_names = [entry.name for entry in os.scandir(author_path) if entry.name not in self.exclude_dirs and entry.is_dir()]
+
+        versions = {}
+        for version_name in version_names:
+            versions[version_name] = self._scan_version_dir(os.path.join(author_path, version_name), previous_versions.get(version_name),
+                                                            walker)
+        return {'mtime_ns': mtime_ns, 'versions': versions}
+
+    def _scan_version_dir(self, version_path: str, previous: dict = None, walker: ThreadPoolExecutor = None) -> dict:
+        """
+        Scan a version directory and its UAL_RDM directory. The entry of the previous scan is reused if neither
+        the version directory nor its UAL_RDM directory changed.
+
+        :param version_path: Path to version directory
+        :param previous: Entry of the version directory in the previous scan, if any
+        :param walker: Pool of threads reading the directories under UAL_RDM, see get_directory_file_sizes
+        :return: dict with the names of the entries of the version directory ('entries'), the names and sizes
+                 of the entries of its UAL_RDM directory ('ual_rdm', None if there is no UAL_RDM directory),
+                 the size of all files under UAL_RDM ('ual_rdm_tree_size') and modification times.
+        """
+        mtime_ns = os.stat(version_path).st_mtime_ns
+        ual_rdm_path = os.path.join(version_path, 'UAL_RDM')
+        ual_rdm_mtime_ns = os.stat(ual_rdm_path).st_mtime_ns if os.path.isdir(ual_rdm_path) else 0
+        if previous and previous['mtime_ns'] == mtime_ns and previous['ual_rdm_mtime_ns'] == ual_rdm_mtime_ns:
+            return previous
+
+        with self._rescanned_lock:
+            self.rescanned_versions += 1
+        entries = [entry.name for entry in os.scandir(version_path)]
+        ual_rdm = None
+        ual_rdm_tree_size = 0
+        if ual_rdm_mtime_ns != 0:
+            ual_rdm = [(ual_entry.name, ual_entry.stat().st_size) for ual_entry in os.scandir(ual_rdm_path)]
+            ual_rdm_tree_size = sum(get_directory_file_sizes(ual_rdm_path, executor=walker).values())
+        return {'mtime_ns': mtime_ns, 'ual_rdm_mtime_ns': ual_rdm_mtime_ns, 'entries': entries, 'ual_rdm': ual_rdm,
+                'ual_rdm_tree_size': ual_rdm_tree_size}
+
+    def _load_snapshot(self) -> dict:
+        """
+        Load the snapshot of the previous scan
+
+        :return: Snapshot dict, or an empty dict if there is no usable snapshot
+        """
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return {}
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if snapshot.get('curation_storage_location') != self.curation_storage_location:
+            return {}
+        return snapshot
+
+    def _save_snapshot(self, snapshot: dict) -> None:
+        if not self.snapshot_file or not self.save_snapshot:
+            return
+        temp_file = self.snapshot_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_file, self.snapshot_file)
+
+    def _ensure_scanned(self) -> None:
+        if self._author_dirs is None:
+            self.scan()
+
+    def get_author_dirs(self, article_id=None) -> list:
+        """
+        Return the author directories of an article
+
+        :param article_id: Article id. If omitted, all author directories are returned.
+        :return: Names of the author directories whose name contains the article id, in scan order
+        """
+        self._ensure_scanned()
+        if article_id is None:
+            return list(self._author_dirs.keys())
+        return list(self._article_dirs.get(str(article_id), []))
+
+    def get_versions(self, author_dir: str) -> list:
+        """
+        Return the version directories of an author directory
+
+        :param author_dir: Name of the author directory
+        :return: Names of the version directories, e.g. ['v01', 'v02']
+        """
+        self._ensure_scanned()
+        return list(self._author_dirs.get(author_dir, {}).get('versions', {}).keys())
+
+    def get_version(self, author_dir: str, version_no: str) -> dict:
+        """
+        Return the index entry of a version directory
+
+        :param author_dir: Name of the author directory
+        :param version_no: Name of the version directory, e.g. 'v01'
+        :return: dict with 'entries', 'ual_rdm' and 'ual_rdm_tree_size' keys (see _scan_version_dir), or None if not found
+        """
+        self._ensure_scanned()
+        return self._author_dirs.get(author_dir, {}).get('versions', {}).get(version_no)
+
+    def get_ual_rdm_size(self, article_id, version_no: str) -> int:
+        """
+        Return the size of the UAL_RDM directory of an article version
+
+        :param article_id: Article id
+        :param version_no: Name of the version directory, e.g. 'v01'
+        :return: Size in bytes of the entries of the first UAL_RDM directory found for the article version.
+                 Zero if no UAL_RDM directory is found.
+        """
+        for author_dir in self.get_author_dirs(article_id):
+            version = self.get_version(author_dir, version_no)
+            if version is not None and version['ual_rdm'] is not None:
+                return sum(size for name, size in version['ual_rdm'])
+        return 0
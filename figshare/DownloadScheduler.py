@@ -0,0 +1,118 @@
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class DownloadScheduler:
+
+    def __init__(self, max_downloads: int = 8, max_downloads_per_host: int = 4, bandwidth_limit: int = 0) -> None:
+        """
+        Scheduler of the file downloads of all article versions processed by this run. Limits the number of
+        downloads running at the same time, in total and for each host, and optionally the total download rate.
+
+        Free download slots are given fairly: among the waiting downloads that can start, the one whose owner (e.g.
+        an article version) has the fewest downloads running goes first, then the one whose owner has started the
+        fewest downloads, then the one that has waited the longest. An article version with many files therefore
+        cannot keep the other article versions waiting.
+
+        :param max_downloads: Maximum number of downloads running at the same time
+        :param max_downloads_per_host: Maximum number of downloads from the same host running at the same time
+        :param bandwidth_limit: Maximum total download rate in bytes per second. No limit if 0.
+        """
+        self.max_downloads = max(1, max_downloads)
+        self.max_downloads_per_host = max(1, max_downloads_per_host)
+        self.bandwidth_limit = max(0, bandwidth_limit)
+        self.bytes_downloaded = 0
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._order = itertools.count()
+        self._running = 0
+        self._running_per_host = {}
+        self._running_per_owner = {}
+        self._started_per_owner = {}
+        # Token bucket holding up to one second of the bandwidth limit
+        self._tokens = float(self.bandwidth_limit)
+        self._tokens_updated = time.monotonic()
+        self._tokens_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str, owner: str = ''):
+        """
+        Wait for a download slot for a url and hold it while the body of the with statement runs
+
+        :param url: Url to download. The host limit applies to its host.
+        :param owner: Key shared by related downloads, e.g. the article version, used for fair scheduling
+        """
+        host = urlsplit(url).netloc
+        ticket = (next(self._order), owner, host)
+        with self._condition:
+            self._waiting.append(ticket)
+            while self._next_ticket() != ticket:
+                self._condition.wait()
+            self._waiting.remove(ticket)
+            self._running += 1
+            self._running_per_host[host] = self._running_per_host.get(host, 0) + 1
+            self._running_per_owner[owner] = self._running_per_owner.get(owner, 0) + 1
+            self._started_per_owner[owner] = self._started_per_owner.get(owner, 0) + 1
+            # Another waiting download may be able to start as well, e.g. from a different host
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._running_per_host[host] -= 1
+                self._running_per_owner[owner] -= 1
+                if self._running_per_owner[owner] == 0:
+                    del self._running_per_owner[owner]
+                    if not any(ticket[1] == owner for ticket in self._waiting):
+                        del self._started_per_owner[owner]
+                self._condition.notify_all()
+
+    def _next_ticket(self):
+        """
+        Return the waiting download to start next, or None if no waiting download can start
+        """
+        if self._running >= self.max_downloads:
+            return None
+        startable = [ticket for ticket in self._waiting if self._running_per_host.get(ticket[2], 0) < self.max_downloads_per_host]
+        if len(startable) == 0:
+            return None
+        return min(startable, key=lambda ticket: (self._running_per_owner.get(ticket[1], 0), self._started_per_owner.get(ticket[1], 0),
+                                                  ticket[0]))
+
+    def throttle(self, size: int) -> None:
+        """
+        Wait until size bytes can be downloaded without going over the bandwidth limit
+
+        :param size: Number of bytes about to be downloaded, or just downloaded
+        """
+        with self._tokens_lock:
+            self.bytes_downloaded += size
+        if self.bandwidth_limit == 0:
+            return
+        while True:
+            with self._tokens_lock:
+                now = time.monotonic()
+                self._tokens = min(float(self.bandwidth_limit), self._tokens + (now - self._tokens_updated) * self.bandwidth_limit)
+                self._tokens_updated = now
+                # Chunks bigger than the bucket are let through once the bucket is full, and leave it in debt
+                if self._tokens >= min(size, self.bandwidth_limit):
+                    self._tokens -= size
+                    return
+                wait = (min(size, self.bandwidth_limit) - self._tokens) / self.bandwidth_limit
+            time.sleep(wait)
+
+    def iter_content(self, response, chunk_size: int = 8192):
+        """
+        Iterate over the body of a streamed response, keeping to the bandwidth limit
+
+        :param response: requests.Response of a request made with stream=True
+        :param chunk_size: Number of bytes read at a time
+        :return: Generator of body chunks
+        """
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            self.throttle(len(chunk))
+            yield chunk
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import threading
+
+
+class FileHashCache:
+
+    def __init__(self, cache_file: str) -> None:
+        """
+        On-disk cache of the MD5 hashes of staged files, keyed by device, inode, size and modification time in
+        nanoseconds. A file whose inode, size and modification time are unchanged since its hash was recorded is
+        assumed unchanged, so its hash is read from the cache after a stat call instead of by reading the file.
+
+        Hard links share their inode, so a hash recorded for a file also applies to its links, e.g. in the content store.
+
+        :param cache_file: Path to the SQLite file holding the cache
+        """
+        self.cache_file = cache_file
+        # Files are hashed from several threads when articles are processed in parallel
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS files (device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, "
+                                 + "md5 TEXT, PRIMARY KEY (device, inode))")
+        self._connection.commit()
+
+    def get(self, file_path: str, stat: os.stat_result = None) -> str:
+        """
+        Returns the recorded hash of a file if the file is unchanged since the hash was recorded
+
+        :param file_path: Path of the file
+        :param stat: Result of os.stat on the file, if already known
+        :return: MD5 hash, or None if the file is not in the cache or changed
+        """
+        if stat is None:
+            stat = os.stat(file_path)
+        with self._lock:
+            row = self._connection.execute("SELECT md5 FROM files WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+                                           (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, file_path: str, md5: str, stat: os.stat_result = None) -> bool:
+        """
+        Records the hash of a file
+
+        :param file_path: Path of the file
+        :param md5: MD5 hash of the file
+        :param stat: Result of os.stat on the file taken before it was hashed. The hash is not recorded if the file
+                     changed since.
+        :return: True if the hash was recorded
+        """
+        current = os.stat(file_path)
+        if stat is not None and (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns) != \
+                (current.st_dev, current.st_ino, current.st_size, current.st_mtime_ns):
+            return False
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                     (current.st_dev, current.st_ino, current.st_size, current.st_mtime_ns, md5))
+            self._connection.commit()
+        return True
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,102 @@
+import time
+import sqlite3
+import threading
+
+
+class HTTPCache:
+
+    def __init__(self, cache_file: str, max_size: int = 512 * 1024 * 1024) -> None:
+        """
+        On-disk cache of HTTP response bodies keyed by url, with the ETag and Last-Modified validators needed
+        to revalidate them with conditional requests. When the cache grows over max_size bytes, the least
+        recently used responses are evicted. The cache can be used from several threads.
+
+        :param cache_file: Path to the SQLite file holding the cache
+        :param max_size: Maximum total size in bytes of the cached bodies
+        """
+        self.cache_file = cache_file
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                                 + "body BLOB, size INTEGER, last_used REAL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._connection.commit()
+
+    def get(self, url: str) -> tuple:
+        """
+        Returns the cached response of a url
+
+        :param url: Request url
+        :return: Tuple of ETag, Last-Modified and body, or None if the url is not cached
+        """
+        with self._lock:
+            return self._connection.execute("SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)).fetchone()
+
+    def get_conditional_headers(self, url: str) -> tuple:
+        """
+        Returns the headers to revalidate the cached response of a url
+
+        :param url: Request url
+        :return: Tuple of headers dict and cached body. Both are None if the url is not cached.
+        """
+        cached = self.get(url)
+        if cached is None:
+            return None, None
+        etag, last_modified, body = cached
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers, body
+
+    def put(self, url: str, etag: str, last_modified: str, body: bytes) -> None:
+        """
+        Stores the response of a url. Responses without validators are not stored, as they cannot be revalidated.
+
+        :param url: Request url
+        :param etag: Value of the ETag response header
+        :param last_modified: Value of the Last-Modified response header
+        :param body: Response body
+        """
+        if not etag and not last_modified:
+            return
+        if len(body) > self.max_size:
+            return
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                     (url, etag, last_modified, body, len(body), time.time()))
+            self._evict()
+            self._connection.commit()
+
+    def touch(self, url: str) -> None:
+        """
+        Marks the cached response of a url as used
+
+        :param url: Request url
+        """
+        with self._lock:
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        for url, size in self._connection.execute("SELECT url, size FROM responses ORDER BY last_used").fetchall():
+            self._connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+    def get_size(self) -> int:
+        """
+        Returns the total size in bytes of the cached bodies
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,91 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class HarvestState:
+
+    def __init__(self, state_file: str, full_harvest_interval_days: int = 7, full_harvest: bool = False) -> None:
+        """
+        Watermarks of the incremental harvest. For each item type ('articles', 'collections'), the state keeps the start
+        time of the last successful harvest and of the last successful full harvest. An incremental harvest only fetches
+        the items modified since the last successful harvest. A full harvest is done if there is no watermark yet, if it
+        is requested, or if the last full harvest is older than full_harvest_interval_days.
+
+        The state also keeps the IDs of the items that the last successful harvest could not fetch or process. An
+        incremental harvest fetches them again by ID, as they are not listed again unless they are modified.
+
+        :param state_file: Path to the JSON file holding the watermarks
+        :param full_harvest_interval_days: Number of days between full harvests. Zero disables periodic full harvests.
+        :param full_harvest: Do a full harvest in this run
+        """
+        self.state_file = state_file
+        self.full_harvest_interval_days = full_harvest_interval_days
+        self.full_harvest = full_harvest
+        self.started = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        self._state = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_full(self, item_type: str) -> bool:
+        """
+        Returns whether all items of the given type are harvested in this run
+
+        :param item_type: 'articles' or 'collections'
+        """
+        item_state = self._state.get(item_type, {})
+        if self.full_harvest or not item_state.get('last_harvest') or not item_state.get('last_full_harvest'):
+            return True
+        if self.full_harvest_interval_days > 0:
+            last_full_harvest = datetime.strptime(item_state['last_full_harvest'], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+            return datetime.now(timezone.utc) - last_full_harvest >= timedelta(days=self.full_harvest_interval_days)
+        return False
+
+    def get_modified_since(self, item_type: str) -> str:
+        """
+        Returns the time from which modified items of the given type are harvested in this run
+
+        :param item_type: 'articles' or 'collections'
+        :return: Timestamp formatted as YYYY-MM-DDTHH:MM:SSZ, or empty string if all items are harvested
+        """
+        if self.is_full(item_type):
+            return ''
+        return self._state[item_type]['last_harvest']
+
+    def get_failed_ids(self, item_type: str) -> list:
+        """
+        Returns the IDs of the items of the given type to fetch again by ID in this run
+
+        :param item_type: 'articles' or 'collections'
+        :return: IDs the last successful harvest could not fetch or process, or empty list if all items are harvested
+        """
+        if self.is_full(item_type):
+            return []
+        return self._state[item_type].get('failed_ids', [])
+
+    def commit(self, failed_ids: dict = None) -> None:
+        """
+        Records this run as the last successful harvest of all item types. Changes made while the run was going on
+        are harvested again by the next run, as the watermark is the start time of this run.
+
+        :param failed_ids: IDs of the items that could not be fetched or processed in this run, keyed by item type
+        """
+        for item_type in ['articles', 'collections']:
+            item_state = self._state.setdefault(item_type, {})
+            if self.is_full(item_type):
+                item_state['last_full_harvest'] = self.started
+            item_state['last_harvest'] = self.started
+            item_state['failed_ids'] = sorted((failed_ids or {}).get(item_type, []))
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(temp_file, self.state_file)
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from pathlib import Path
 from redata.commons import logger
 from bagger.bag import Bagger, Status
@@ -22,6 +23,8 @@ class Integration:
         self._rebachlogger = log
         self.duplicate_bag_in_preservation_storage_count = 0
         self.bag_preserved_count = 0
+        # Packages can be bagged from several threads
+        self._counts_lock = threading.Lock()
 
     """
     Post-processing script command function.
@@ -113,7 +116,8 @@ class Integration:
                 self._rebachlogger.write_log_in_file("info", f"Exit code: {status}.", True)
                 if (status == 0):
                     self._rebachlogger.write_log_in_file("info", f"Preservation package '{preservation_package_name}' processed successfully", True)
-                    self.bag_preserved_count += 1
+                    with self._counts_lock:
+                        self.bag_preserved_count += 1
                 elif (status == 3):
                     # code 3 is special since we don't want to cause the calling code to interpret duplicates as an error since it will happen a lot
                     if upload_to_remote():
@@ -122,7 +126,8 @@ class Integration:
                     else:
                         self._rebachlogger.write_log_in_file("warning", f"'{preservation_package_name}' already exists in "
                                                              + "archival staging or archival storage.", True)
-                    self.duplicate_bag_in_preservation_storage_count += 1
+                    with self._counts_lock:
+                        self.duplicate_bag_in_preservation_storage_count += 1
                     status = 0
                 return status
         else:
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# Number of bytes received between two updates of the journal
+JOURNAL_INTERVAL = 64 * 1024 * 1024
+
+
+class PartialDownload:
+
+    def __init__(self, partial_dir: str, key: str) -> None:
+        """
+        File being downloaded to '<key>.part' in partial_dir, with a journal '<key>.json' of the number of bytes
+        received and the MD5 hash of these bytes. The partial file and its journal are kept when a download fails,
+        so that a later attempt or run can resume the download where it stopped.
+
+        The state of the MD5 computation cannot be saved, so the received bytes are read once again on resume to
+        rebuild it. The hash in the journal checks that the partial file was not changed in between.
+
+        A file can also be downloaded in segments written at their position in the partial file, see resume_segments.
+        The journal then lists the segments received.
+
+        :param partial_dir: Directory holding the partial files. Created if missing.
+        :param key: Name of the download, unique for a file with given content, e.g. file id and MD5 hash
+        """
+        os.makedirs(partial_dir, exist_ok=True)
+        self.part_file = os.path.join(partial_dir, key + '.part')
+        self.journal_file = os.path.join(partial_dir, key + '.json')
+        self.bytes_received = 0
+        self.saved_bytes = 0
+        self.hash = hashlib.md5()
+        # True if the data of more than one request was put together in the partial file
+        self.resumed = False
+        self.size = 0
+        self.segment_size = 0
+        self.segments_done = set()
+        self._segments_lock = threading.Lock()
+
+    def resume(self) -> int:
+        """
+        Load the journal of a previous attempt and check the partial file against it
+
+        :return: Number of bytes to resume the download from. Zero if the download starts over.
+        """
+        try:
+            with open(self.journal_file, 'r') as f:
+                journal = json.load(f)
+            bytes_received = int(journal['bytes_received'])
+            if bytes_received <= 0 or os.path.getsize(self.part_file) < bytes_received:
+                raise ValueError('Partial file is shorter than the journal')
+            prefix_hash = hashlib.md5()
+            with open(self.part_file, 'rb') as f:
+                remaining = bytes_received
+                while remaining > 0:
+                    chunk = f.read(min(1024 * 1024, remaining))
+                    if not chunk:
+                        break
+                    prefix_hash.update(chunk)
+                    remaining -= len(chunk)
+            if prefix_hash.hexdigest() != journal['md5']:
+                raise ValueError('Partial file does not match the journal')
+        except (OSError, ValueError, KeyError):
+            self.restart()
+            return 0
+
+        # Bytes written after the last journal update are downloaded again
+        with open(self.part_file, 'r+b') as f:
+            f.truncate(bytes_received)
+        self.bytes_received = bytes_received
+        self.saved_bytes = bytes_received
+        self.hash = prefix_hash
+        self.resumed = True
+        return bytes_received
+
+    def resume_segments(self, size: int, segment_size: int) -> set:
+        """
+        Load the journal of a previous segmented download. If there is none, or it is for other segments, the
+        partial file is created with the size of the whole file.
+
+        :param size: Size of the file in bytes
+        :param segment_size: Size of the segments in bytes
+        :return: Start offsets of the segments already received
+        """
+        try:
+            with open(self.journal_file, 'r') as f:
+                journal = json.load(f)
+            if journal.get('size') != size or journal.get('segment_size') != segment_size or os.path.getsize(self.part_file) != size:
+                raise ValueError('Partial file does not match the segments')
+            self.segments_done = set(int(start) for start in journal['segments'])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.restart()
+            with open(self.part_file, 'wb') as f:
+                f.truncate(size)
+                # Allocate the space of the file up front where the platform supports it
+                if hasattr(os, 'posix_fallocate'):
+                    try:
+                        os.posix_fallocate(f.fileno(), 0, size)
+                    except OSError:
+                        pass
+        self.size = size
+        self.segment_size = segment_size
+        self.resumed = len(self.segments_done) > 0
+        return set(self.segments_done)
+
+    def save_segment(self, start: int) -> None:
+        """
+        Record a segment as received in the journal. The segment must have been flushed to the partial file.
+
+        :param start: Start offset of the segment
+        """
+        with self._segments_lock:
+            self.segments_done.add(start)
+            temp_file = self.journal_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump({'size': self.size, 'segment_size': self.segment_size, 'segments': sorted(self.segments_done)}, f)
+            os.replace(temp_file, self.journal_file)
+
+    def open(self):
+        """
+        Open the partial file to add the next bytes received
+
+        :return: File object
+        """
+        return open(self.part_file, 'ab' if self.bytes_received > 0 else 'wb')
+
+    def update(self, chunk: bytes) -> None:
+        """
+        Account for a chunk written to the partial file
+
+        :param chunk: Bytes written
+        """
+        self.bytes_received += len(chunk)
+        self.hash.update(chunk)
+
+    def save(self) -> None:
+        """
+        Update the journal. The bytes received must have been flushed to the partial file.
+        """
+        temp_file = self.journal_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'bytes_received': self.bytes_received, 'md5': self.hash.hexdigest()}, f)
+        os.replace(temp_file, self.journal_file)
+        self.saved_bytes = self.bytes_received
+
+    def restart(self) -> None:
+        """
+        Discard the bytes received and start the download over
+        """
+        self.discard()
+        self.bytes_received = 0
+        self.saved_bytes = 0
+        self.hash = hashlib.md5()
+        self.resumed = False
+        self.segments_done = set()
+
+    def complete(self, file_path: str) -> None:
+        """
+        Move the downloaded file to its final path and remove the journal
+
+        :param file_path: Final path of the file
+        """
+        os.replace(self.part_file, file_path)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def discard(self) -> None:
+        """
+        Remove the partial file and its journal
+        """
+        for path in [self.part_file, self.journal_file]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def remove_stale_partials(partial_dir: str, max_age_days: float) -> tuple:
+    """
+    Remove the partial files and journals of downloads not resumed for max_age_days, e.g. downloads of files that
+    changed on Figshare or of article versions that are not processed again
+
+    :param partial_dir: Directory holding the partial files
+    :param max_age_days: Age in days of the last write to the partial file or its journal after which a download is removed
+    :return: Tuple of the number of downloads removed and the total size in bytes of their files
+    """
+    removed = 0
+    freed = 0
+    if not os.path.isdir(partial_dir):
+        return removed, freed
+    downloads = {}
+    for entry in os.scandir(partial_dir):
+        # Keys are the file names without the .part, .json or .json.tmp extension
+        key = entry.name.split('.', 1)[0]
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        paths, last_modified, size = downloads.get(key, ([], 0, 0))
+        downloads[key] = (paths + [entry.path], max(last_modified, stat.st_mtime), size + stat.st_size)
+    oldest = time.time() - max_age_days * 24 * 60 * 60
+    for paths, last_modified, size in downloads.values():
+        if last_modified >= oldest:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        removed += 1
+        freed += size
+    return removed, freed
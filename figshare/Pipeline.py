@@ -0,0 +1,167 @@
+import time
+import queue
+import threading
+
+# Put in the queue of a stage after the last item, once per worker of the stage
+_END = object()
+
+
+class Stage:
+
+    def __init__(self, name: str, function, workers: int = 1, queue_size: int = 0) -> None:
+        """
+        Step of a Pipeline. Each item taken from the input queue of the stage is passed to function, and the items
+        returned by function are put in the input queue of the next stage.
+
+        :param name: Name of the stage, used in status messages
+        :param function: Called with an item, returns an iterable (e.g. a list or a generator) of items for the next stage
+        :param workers: Number of threads calling the function
+        :param queue_size: Maximum number of items waiting in the input queue of the stage. Unbounded if 0.
+        """
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_time = 0.0
+        self.max_queue_depth = 0
+        self._finished_workers = 0
+        self._lock = threading.Lock()
+
+    def record_queue_depth(self) -> None:
+        depth = self.queue.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def get_status(self, elapsed: float) -> str:
+        """
+        Return the counts, throughput and queue depth of the stage
+
+        :param elapsed: Seconds since the pipeline started
+        """
+        with self._lock:
+            throughput = self.items_in / elapsed if elapsed > 0 else 0
+            utilization = self.busy_time / (elapsed * self.workers) if elapsed > 0 else 0
+            return f"{self.name}: {self.items_in} in, {self.items_out} out, {throughput:.2f} items/s, " \
+                + f"{utilization:.0%} busy ({self.workers} workers), queue {self.queue.qsize()} (max {self.max_queue_depth}" \
+                + (f" of {self.queue_size})" if self.queue_size else ")")
+
+
+class Pipeline:
+
+    def __init__(self, stages: list, log=None, status_interval: float = 0) -> None:
+        """
+        Chain of stages connected by queues. Each stage has its own worker threads, so the stages work on different
+        items at the same time. A full queue blocks the stage putting items in it, which bounds the number of items
+        waiting between stages.
+
+        If a stage function raises an exception (including SystemExit, e.g. when the log aborts the execution), the
+        stages stop processing new items and run raises the first exception once all threads have finished.
+
+        :param stages: List of Stage, in processing order
+        :param log: Log used for status messages. No status messages if None.
+        :param status_interval: Seconds between status messages while the pipeline runs. Only a final status message if 0.
+        """
+        self.stages = stages
+        self.log = log
+        self.status_interval = status_interval
+        self.started = 0.0
+        self._error = None
+        self._stopped = threading.Event()
+        self._error_lock = threading.Lock()
+
+    def run(self, items) -> None:
+        """
+        Pass items through the stages and wait until all items are processed
+
+        :param items: Iterable of items for the first stage
+        """
+        self.started = time.monotonic()
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=self._work, args=(index,), name=f"{stage.name}-{worker}", daemon=True)
+                           for worker in range(stage.workers))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(self.status_interval or None)
+                if thread.is_alive():
+                    self.log_status()
+        self.log_status()
+        if self._error is not None:
+            raise self._error
+
+    def get_status(self) -> list:
+        """
+        Return the status of each stage, see Stage.get_status
+        """
+        elapsed = time.monotonic() - self.started
+        return [stage.get_status(elapsed) for stage in self.stages]
+
+    def log_status(self) -> None:
+        if self.log is None:
+            return
+        self.log.write_log_in_file("info", "Pipeline status: " + " | ".join(self.get_status()), True)
+
+    def _feed(self, items) -> None:
+        try:
+            for item in items:
+                if self._stopped.is_set():
+                    break
+                self._put(0, item)
+        except BaseException as e:
+            self._stop(e)
+        finally:
+            self._end(0)
+
+    def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        while True:
+            item = stage.queue.get()
+            if item is _END:
+                break
+            with stage._lock:
+                stage.items_in += 1
+            # Items are drained without processing once the pipeline is stopped, so that no stage blocks on a full queue
+            if self._stopped.is_set():
+                continue
+            start = time.monotonic()
+            waited = 0.0
+            try:
+                for result in stage.function(item) or []:
+                    put_start = time.monotonic()
+                    self._put(index + 1, result)
+                    waited += time.monotonic() - put_start
+                    with stage._lock:
+                        stage.items_out += 1
+                    if self._stopped.is_set():
+                        break
+            except BaseException as e:
+                self._stop(e)
+            with stage._lock:
+                stage.busy_time += time.monotonic() - start - waited
+
+        with stage._lock:
+            stage._finished_workers += 1
+            last_worker = stage._finished_workers == stage.workers
+        if last_worker:
+            self._end(index + 1)
+
+    def _put(self, index: int, item) -> None:
+        if index < len(self.stages):
+            self.stages[index].queue.put(item)
+            self.stages[index].record_queue_depth()
+
+    def _end(self, index: int) -> None:
+        if index < len(self.stages):
+            for _ in range(self.stages[index].workers):
+                self.stages[index].queue.put(_END)
+
+    def _stop(self, error: BaseException) -> None:
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._stopped.set()
@@ -0,0 +1,94 @@
+import os
+import re
+import hashlib
+import tarfile
+
+# Path in the bag of a file of the DATA folder of the package, with or without the package folder
+_DATA_PATH_RE = re.compile(r'^data/(?:[^/]+/)?v\d{2,}/DATA/(.+)$')
+
+
+def find_previous_bag(archival_staging_storage: str, article_id: int, version: int) -> str:
+    """
+    Find the bag made for the latest earlier version of an article in archival staging storage
+
+    :param archival_staging_storage: Directory where DART writes the bags
+    :param article_id: Article id
+    :param version: Version number of the new version
+    :return: Path to the bag tar file, or None if there is none. The most recent bag is returned if there are
+             several bags of the same version.
+    """
+    if not archival_staging_storage or not os.path.isdir(archival_staging_storage):
+        return None
+    bag_name_re = re.compile(rf"_{int(article_id)}-v(\d+)-.*\.tar$")
+    previous_bag = None
+    for entry in os.scandir(archival_staging_storage):
+        match = bag_name_re.search(entry.name)
+        if match is not None and int(match.group(1)) < int(version) and entry.is_file():
+            key = (int(match.group(1)), entry.stat().st_mtime)
+            if previous_bag is None or key > previous_bag[0]:
+                previous_bag = (key, entry.path)
+    return previous_bag[1] if previous_bag is not None else None
+
+
+class PreviousBag:
+
+    def __init__(self, bag_path: str) -> None:
+        """
+        Bag tar file made by DART for an earlier version of an article. Lists the files of the DATA folder of the
+        package from the MD5 manifest of the bag, and extracts them. Use in a with statement to close the tar file.
+
+        :param bag_path: Path to the bag tar file
+        """
+        self.bag_path = bag_path
+        self._tar = None
+        self._data_members = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get_data_files(self) -> dict:
+        """
+        Return the files of the DATA folder of the package in the bag
+
+        :return: dict mapping the path of each file relative to the DATA folder to its MD5 hash
+        :raises tarfile.TarError, OSError, KeyError: If the bag cannot be read or has no MD5 manifest
+        """
+        if self._data_members is None:
+            self._tar = tarfile.open(self.bag_path, 'r:')
+            members = {member.name: member for member in self._tar.getmembers()}
+            manifest_name = next(name for name in members if name.count('/') == 1 and name.endswith('/manifest-md5.txt'))
+            root = manifest_name.split('/')[0]
+            manifest = self._tar.extractfile(members[manifest_name]).read().decode('utf-8')
+            self._data_members = {}
+            for line in manifest.splitlines():
+                md5, _, path = line.strip().partition(' ')
+                # BagIt manifests percent-encode line breaks and percent signs in paths
+                path = path.strip().replace('%0D', '\r').replace('%0A', '\n').replace('%25', '%')
+                match = _DATA_PATH_RE.match(path)
+                if match is not None and f"{root}/{path}" in members:
+                    self._data_members[match.group(1)] = (md5.lower(), members[f"{root}/{path}"])
+        return {path: md5 for path, (md5, member) in self._data_members.items()}
+
+    def extract(self, path: str, file_path: str) -> str:
+        """
+        Extract a file of the DATA folder of the package
+
+        :param path: Path of the file relative to the DATA folder, see get_data_files
+        :param file_path: Path to write the file to
+        :return: MD5 hash of the extracted file
+        """
+        md5 = hashlib.md5()
+        source = self._tar.extractfile(self._data_members[path][1])
+        with open(file_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                f.write(chunk)
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
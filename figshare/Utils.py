@@ -1,13 +1,38 @@
-import requests
 import json
 import os
 import re
 import tempfile
+import threading
 import configparser
 from typing import Any
-from time import sleep
 from subprocess import Popen, PIPE
 from bagger.wasabi import Wasabi
+from figshare.APTrust import APTrustIndex
+from figshare.Curation import CurationIndex
+from figshare.Client import FigshareClient
+from figshare.DownloadScheduler import DownloadScheduler
+from figshare.FileHashCache import FileHashCache
+from figshare.HTTPCache import HTTPCache
+from figshare.HarvestState import HarvestState
+from figshare.VersionState import VersionStateStore
+
+# Index of packages preserved in archival storage. Built once per run by get_preserved_packages_index
+_preserved_packages_index = None
+_preserved_packages_index_lock = threading.Lock()
+# Index of packages in remote staging storage. Built once per run by get_remote_staging_index
+_remote_staging_index = None
+# Guards building, refreshing and reading the remote staging index, as articles are processed in several threads
+_remote_staging_index_lock = threading.Lock()
+# HTTP client shared by all Figshare API calls. Created once per run by get_figshare_client
+_figshare_client = None
+# Watermarks of the incremental harvest. Loaded once per run by get_harvest_state
+_harvest_state = None
+# Last known state of article versions. Opened once per run by get_version_state_store
+_version_state_store = None
+# Scheduler shared by all file downloads. Created once per run by get_download_scheduler
+_download_scheduler = None
+# Hashes of staged files. Opened once per run by get_file_hash_cache
+_file_hash_cache = None
 
 
 def inspect_dart() -> Any:
@@ -277,7 +302,83 @@ def get_folder_name_in_local_storage(path: str, article_id: int, version_no: int
     return None
 
 
-def get_preserved_version_hash_and_size(article_id: int, version_no: Any) -> list:
+def get_preserved_packages_index(rebuild: bool = False, system_config=None) -> dict:
+    """
+    Builds an index of the packages preserved in archival storage (AP Trust).
+    The first time this function is called during a run, the on-disk index of AP Trust objects is synced with AP Trust,
+    fetching only the objects updated since the previous sync. Subsequent calls return the cached index.
+
+    :param rebuild: Discard the on-disk index and fetch all AP Trust objects again
+    :type rebuild: bool
+
+    :param  system_config:  system section of the configuration, to keep the on-disk index in the state location
+                            unless `index_file` is set in the `aptrust_api` section of the bagger configuration
+    :type: dict
+
+    :return: Returns a dict keyed by a tuple of item id (str) and formatted version (str). Each value is a list of tuples
+            containing md5 hash and size of a preserved package.
+    :rtype: dict
+    """
+
+    global _preserved_packages_index
+    # Built by the first caller, other threads wait for it instead of syncing the index again
+    with _preserved_packages_index_lock:
+        if _preserved_packages_index is not None and not rebuild:
+            return _preserved_packages_index
+
+        config = configparser.ConfigParser()
+        config.read('bagger/config/default.toml')
+        aptrust_config = config['aptrust_api']
+        index_file = aptrust_config.get('index_file', '').replace('\"', '')
+        if index_file == '':
+            index_file = get_state_file_path(system_config, 'aptrust_index.sqlite') if system_config is not None else ''
+        if index_file == '':
+            index_file = 'aptrust_index.sqlite'
+        aptrust_index = APTrustIndex(index_file,
+                                     aptrust_config['url'].replace('\"', ''),
+                                     aptrust_config['user'].replace('\"', ''),
+                                     aptrust_config['token'].replace('\"', ''),
+                                     int(aptrust_config['items_per_page'].replace('\"', '')),
+                                     aptrust_config['alt_identifier_starts_with'].replace('\"', ''),
+                                     int(aptrust_config['retries']),
+                                     int(aptrust_config['retries_wait']))
+        try:
+            aptrust_index.sync(rebuild)
+            preserved_packages_index = {}
+            for package_name, package_size in aptrust_index.get_packages():
+                add_package_to_index(preserved_packages_index, package_name, package_size)
+        finally:
+            aptrust_index.close()
+
+        _preserved_packages_index = preserved_packages_index
+        return _preserved_packages_index
+
+
+def add_package_to_index(packages_index: dict, package_name: str, package_size: Any) -> None:
+    """
+    Adds a package to an index of preserved packages keyed by item id and version.
+    Packages whose names do not follow the package name format are ignored.
+
+    :param packages_index: Index of preserved packages to update
+    :type packages_index: dict
+
+    :param package_name: Filename of package in the format
+    [bag_name_prefix]_[article_id]-[version]-[first_author_lastname]-[metadata_hash]_bagXofY_[YYYYMMDD].
+    :type package_name: str
+
+    :param package_size: Size of the package
+    :type package_size: Any
+    """
+
+    package_name = package_name.rsplit('/', 1)[-1]
+    item_id = extract_item_id_only(package_name)
+    version_no = extract_version_only(package_name)
+    if item_id == '' or version_no == '':
+        return
+    packages_index.setdefault((item_id, version_no), []).append((extract_metadata_hash_only(package_name), package_size))
+
+
+def get_preserved_version_hash_and_size(article_id: int, version_no: Any, system_config=None) -> list:
     """
     Extracts md5 hash and size from preserved article version metadata.
     If version is already preserved, it returns a tuple containing
@@ -290,65 +391,17 @@ def get_preserved_version_hash_and_size(article_id: int, version_no: Any) -> lis
     :param version_no: version number of item. Could be formatted str as in v01 or int as in 1
     :type version_no: Any
 
+    :param  system_config:  system section of the configuration, see get_preserved_packages_index
+    :type: dict
+
     :return: Returns a list of tuples. Each tuple contains md5 hash of the article version and
-            its size if article version package exists in Wasabi else it returns empty list.
+            its size if article version package exists in AP Trust else it returns empty list.
             It returns an empty list there is no preserved copy of article version.
     :rtype: list
     """
 
-    preserved_pkg_hash = ''
-    preserved_pkg_size = 0
-    version_preserved_list = []
-    config = configparser.ConfigParser()
-    config.read('bagger/config/default.toml')
-    aptrust_config = config['aptrust_api']
-    base_url = aptrust_config['url'].replace('\"', '')
-    user = aptrust_config['user'].replace('\"', '')
-    key = aptrust_config['token'].replace('\"', '')
-    item_type = "objects"
-    items_per_page = int(aptrust_config['items_per_page'])
-    alt_id = aptrust_config['alt_identifier_starts_with'].replace('\"', '')
-    retries = int(aptrust_config['retries'])
-    retries_wait = int(aptrust_config['retries_wait'])
-    headers = {'X-Pharos-API-User': user,
-               'X-Pharos-API-Key': key}
-    success = False
-
-    if base_url[-1] != '/':
-        base_url = base_url + '/'
-
     version_no = format_version(version_no)
-
-    tries = 1
-
-    while tries <= retries and not success:
-        try:
-            page_empty = False
-            page = 1
-            while not page_empty:
-                endpoint = f'{base_url}{item_type}?page={page}&per_page={items_per_page}&alt_identifier__starts_with={alt_id}'
-                get_preserved_pkgs = requests.get(endpoint, headers=headers, timeout=retries_wait)
-                if get_preserved_pkgs.status_code == 200:
-                    success = True
-                    preserved_packages = get_preserved_pkgs.json()['results']
-                    if preserved_packages is None:
-                        page_empty = True
-                    else:
-                        for package in preserved_packages:
-                            if str(article_id) in package['bag_name'] and version_no in package['bag_name']:
-                                preserved_pkg_hash = extract_metadata_hash_only(package['bag_name'])
-                                preserved_pkg_size = package['payload_size']
-                                version_preserved_list.append((preserved_pkg_hash, preserved_pkg_size))
-                        else:
-                            page += 1
-        except requests.exceptions.RequestException as e:
-            tries += 1
-            print(f"Request to AP Trust failed: {e}. Retrying {tries}/{retries}...")
-            if tries > retries:
-                print("Max retries reached. Raising exception.")
-                raise
-            sleep(retries_wait)
-    return version_preserved_list
+    return list(get_preserved_packages_index(system_config=system_config).get((str(article_id), version_no), []))
 
 
 def compare_hash(article_version_hash: str, preserved_pkg_hash_list: list) -> bool:
@@ -375,7 +428,248 @@ def compare_hash(article_version_hash: str, preserved_pkg_hash_list: list) -> bo
     return False
 
 
-def check_wasabi(article_id: int, version_no: int) -> list:
+def get_figshare_client(figshare_config, system_config=None) -> FigshareClient:
+    """
+    Gets the HTTP client shared by all Figshare API calls of this run, creating it on first use.
+    The client caches responses on disk in the state location, unless --no-http-cache is given.
+
+    :param  figshare_config:  figshare_api section of the configuration
+    :type: dict
+
+    :param  system_config:  system section of the configuration
+    :type: dict
+
+    :return: Shared Figshare client
+    :rtype: FigshareClient
+    """
+    global _figshare_client
+    if _figshare_client is None:
+        retries = int(figshare_config.get("retries") or 3)
+        timeout = int(figshare_config.get("retries_wait") or 10)
+        max_workers = int(figshare_config.get("max_workers") or 1)
+        # Up to max_downloads_per_host files are downloaded from the same host at the same time, see get_download_scheduler
+        max_downloads_per_host = int(figshare_config.get("max_downloads_per_host") or 4)
+        pool_size = max(int(figshare_config.get("pool_size") or 10), max_workers, max_downloads_per_host)
+        cache = None
+        cache_file = get_state_file_path(system_config, 'http_cache.sqlite') if system_config is not None else ''
+        if cache_file != '' and system_config.get('no-http-cache', 'False') != 'True':
+            cache = HTTPCache(cache_file, int(figshare_config.get("http_cache_size") or 512) * 1024 * 1024)
+        _figshare_client = FigshareClient(figshare_config.get("token", ''), retries, timeout, pool_size, cache)
+    return _figshare_client
+
+
+def get_download_scheduler(figshare_config) -> DownloadScheduler:
+    """
+    Gets the scheduler shared by all file downloads of this run, creating it on first use.
+
+    :param  figshare_config:  figshare_api section of the configuration
+    :type: dict
+
+    :return: Shared download scheduler
+    :rtype: DownloadScheduler
+    """
+    global _download_scheduler
+    if _download_scheduler is None:
+        max_downloads = int(figshare_config.get("max_downloads") or 8)
+        max_downloads_per_host = int(figshare_config.get("max_downloads_per_host") or 4)
+        bandwidth_limit = int(float(figshare_config.get("download_bandwidth_limit") or 0) * 1024 * 1024)
+        _download_scheduler = DownloadScheduler(max_downloads, max_downloads_per_host, bandwidth_limit)
+    return _download_scheduler
+
+
+def get_harvest_state(system_config):
+    """
+    Gets the watermarks of the incremental harvest, loading them on first use.
+
+    :param  system_config:  system section of the configuration
+    :type: dict
+
+    :return: Harvest state, or None if the incremental harvest is not enabled or there is no state location
+    :rtype: HarvestState
+    """
+    global _harvest_state
+    if _harvest_state is None and system_config.get('incremental-harvest', 'False') == 'True':
+        state_file = get_state_file_path(system_config, 'harvest_state.json')
+        if state_file != '':
+            _harvest_state = HarvestState(state_file, int(system_config.get('full_harvest_interval_days') or 7),
+                                          system_config.get('full-harvest', 'False') == 'True')
+    return _harvest_state
+
+
+def get_version_state_store(system_config):
+    """
+    Gets the store of the last known state of article versions, opening it on first use.
+
+    :param  system_config:  system section of the configuration
+    :type: dict
+
+    :return: Version state store, or None if there is no state location
+    :rtype: VersionStateStore
+    """
+    global _version_state_store
+    if _version_state_store is None:
+        state_file = get_state_file_path(system_config, 'version_state.sqlite')
+        if state_file != '':
+            _version_state_store = VersionStateStore(state_file)
+    return _version_state_store
+
+
+def get_file_hash_cache(system_config):
+    """
+    Gets the cache of the hashes of staged files, opening it on first use.
+
+    :param  system_config:  system section of the configuration
+    :type: dict
+
+    :return: File hash cache, or None if there is no state location
+    :rtype: FileHashCache
+    """
+    global _file_hash_cache
+    if _file_hash_cache is None:
+        state_file = get_state_file_path(system_config, 'file_hashes.sqlite')
+        if state_file != '':
+            _file_hash_cache = FileHashCache(state_file)
+    return _file_hash_cache
+
+
+def get_remote_staging_wasabi() -> Wasabi:
+    """
+    Creates a Wasabi object for the remote staging storage configured in bagger configuration
+
+    :return: Wasabi object
+    :rtype: Wasabi
+    """
+    config = configparser.ConfigParser()
+    config.read('bagger/config/default.toml')
+    wasabi_config = config['Wasabi']
+    return Wasabi(wasabi_config['access_key'].replace('\"', ''),
+                  wasabi_config['secret_key'].replace('\"', ''),
+                  wasabi_config['host'].replace('\"', ''),
+                  wasabi_config['bucket'].replace('\"', ''),
+                  wasabi_config['host_bucket'].replace('\"', ''),
+                  True,
+                  wasabi_config.get('backend', 's3cmd').replace('\"', ''),
+                  int(wasabi_config.get('max_pool_connections', '10'))
+                  )
+
+
+def get_remote_staging_index(wasabi: Wasabi = None) -> tuple[dict, str]:
+    """
+    Builds an index of the packages in remote staging storage (Wasabi).
+    The bucket is listed only the first time this function is called during a run, subsequent calls return the cached index.
+    If listing the bucket fails, the error is returned and the bucket is listed again on the next call.
+
+    :param wasabi: Wasabi object used to list the bucket. Defaults to the remote staging storage in bagger configuration
+    :type wasabi: Wasabi
+
+    :return: Returns a tuple containing the index and listing errors. The index is a dict keyed by a tuple of item id (str)
+            and formatted version (str). Each value is a dict of package filenames and sizes.
+    :rtype: tuple
+    """
+
+    global _remote_staging_index
+    with _remote_staging_index_lock:
+        if _remote_staging_index is not None:
+            return _remote_staging_index, ''
+
+        if wasabi is None:
+            wasabi = get_remote_staging_wasabi()
+        preserved_packages, bucket_error = wasabi.list_objects()
+        if bucket_error:
+            return {}, bucket_error
+
+        remote_staging_index = {}
+        for package_name, package_size in preserved_packages:
+            add_remote_package_to_index(remote_staging_index, package_name, package_size)
+
+        _remote_staging_index = remote_staging_index
+        return _remote_staging_index, ''
+
+
+def add_remote_package_to_index(packages_index: dict, package_name: str, package_size: Any) -> None:
+    """
+    Adds a package to an index of remote staging storage packages keyed by item id and version.
+    Packages whose names do not follow the package name format are ignored.
+
+    :param packages_index: Index of remote staging storage packages to update
+    :type packages_index: dict
+
+    :param package_name: Filename of package in remote staging storage
+    :type package_name: str
+
+    :param package_size: Size of the package
+    :type package_size: Any
+    """
+
+    item_id = extract_item_id_only(package_name)
+    version_no = extract_version_only(package_name)
+    if item_id == '' or version_no == '':
+        return
+    packages_index.setdefault((item_id, version_no), {})[package_name] = package_size
+
+
+def refresh_remote_staging_index(package_name: str, wasabi: Wasabi = None) -> None:
+    """
+    Updates the remote staging storage index after a package has been uploaded.
+    Only files whose names start with the package name are listed. If listing fails, the whole index is
+    invalidated so the bucket is listed again on the next lookup.
+
+    :param package_name: Filename of the uploaded package
+    :type package_name: str
+
+    :param wasabi: Wasabi object used to list the bucket. Defaults to the remote staging storage in bagger configuration
+    :type wasabi: Wasabi
+    """
+
+    global _remote_staging_index
+    with _remote_staging_index_lock:
+        if _remote_staging_index is None:
+            return
+
+        if wasabi is None:
+            wasabi = get_remote_staging_wasabi()
+        package_list, package_error = wasabi.list_objects(package_name)
+        if package_error:
+            _remote_staging_index = None
+            return
+
+        version_packages = _remote_staging_index.get((extract_item_id_only(package_name), extract_version_only(package_name)), {})
+        for name in [name for name in version_packages if name.startswith(package_name)]:
+            del version_packages[name]
+        for name, size in package_list:
+            add_remote_package_to_index(_remote_staging_index, name, size)
+
+
+def find_remote_staging_packages(package_name_prefix: str, wasabi: Wasabi = None) -> tuple[dict, str]:
+    """
+    Finds the packages in remote staging storage (Wasabi) whose names start with a prefix such as
+    [bag_name_prefix]_[article_id]-[version]-.
+    If the remote staging index has not been built and the in-process S3 client is available, only the files starting
+    with the prefix are listed. Otherwise the lookup is made in the remote staging index.
+
+    :param package_name_prefix: Prefix of the package names, including at least the item id and version
+    :type package_name_prefix: str
+
+    :param wasabi: Wasabi object used to list the bucket. Defaults to the remote staging storage in bagger configuration
+    :type wasabi: Wasabi
+
+    :return: Returns a tuple containing a dict of package filenames and sizes, and listing errors
+    :rtype: tuple
+    """
+
+    if wasabi is None:
+        wasabi = get_remote_staging_wasabi()
+    if _remote_staging_index is None and wasabi.native:
+        package_list, package_error = wasabi.list_objects(package_name_prefix)
+        return dict(package_list), package_error
+
+    remote_staging_index, bucket_error = get_remote_staging_index(wasabi)
+    with _remote_staging_index_lock:
+        version_packages = remote_staging_index.get((extract_item_id_only(package_name_prefix), extract_version_only(package_name_prefix)), {})
+        return {name: size for name, size in version_packages.items() if name.startswith(package_name_prefix)}, bucket_error
+
+
+def check_wasabi(article_id: int, version_no: int, bag_name_prefix: str = '') -> list:
     """
     Checks Wasabi preservation bucket if current article version has been bagged into Wasabi
 
@@ -385,44 +679,24 @@ def check_wasabi(article_id: int, version_no: int) -> list:
     :param version_no: Version number of current article been prepared for bagging
     :type version_no: int
 
+    :param bag_name_prefix: Prefix of bag names. If given, only the packages of this article version are looked up
+                            (see find_remote_staging_packages) instead of listing the whole bucket.
+    :type bag_name_prefix: str
+
     :return: Returns a list of tuples. Each tuple contains md5 hash of the article version and
             its size if article version package exists in Wasabi else it returns empty list.
             It returns an empty list there is no preserved copy of article version.
     :rtype: list
     """
 
-    preserved_article_hash = ''
-    preserved_article_size = 0
-    version_preserved_list = []
-    config = configparser.ConfigParser()
-    config.read('bagger/config/default.toml')
-    wasabi_config = config['Wasabi']
-    wasabi_host = wasabi_config['host'].replace('\"', '')
-    wasabi_bucket = 's3://' + wasabi_config['bucket'].replace('\"', '')
-    wasabi_host_bucket = wasabi_config['host_bucket'].replace('\"', '')
-    wasabi_access_key = wasabi_config['access_key'].replace('\"', '')
-    wasabi_secret_key = wasabi_config['secret_key'].replace('\"', '')
-
-    wasabi = Wasabi(wasabi_access_key,
-                    wasabi_secret_key,
-                    wasabi_host,
-                    wasabi_bucket,
-                    wasabi_host_bucket,
-                    True
-                    )
-
-    preservation_bucket, bucket_error = wasabi.list_bucket(wasabi_bucket)
-
-    preserved_packages = get_filenames_and_sizes_from_ls(preservation_bucket)
-
     version_no = format_version(version_no)
-
-    for package in preserved_packages:
-        if package[0].__contains__(str(article_id)) and package[0].__contains__(version_no):
-            preserved_article_hash = extract_metadata_hash_only(package[0])
-            preserved_article_size = package[1]
-            version_preserved_list.append((preserved_article_hash, preserved_article_size))
-    return version_preserved_list
+    if bag_name_prefix:
+        version_packages, _ = find_remote_staging_packages(f'{bag_name_prefix}_{article_id}-{version_no}-')
+    else:
+        remote_staging_index, _ = get_remote_staging_index()
+        with _remote_staging_index_lock:
+            version_packages = dict(remote_staging_index.get((str(article_id), version_no), {}))
+    return [(extract_metadata_hash_only(package_name), package_size) for package_name, package_size in version_packages.items()]
 
 
 def check_local_path(article_id: int, version_no: Any, path="") -> list:
@@ -483,6 +757,27 @@ def get_archival_staging_storage() -> str:
     return default_config['archival_staging_storage'].replace('\"', '')
 
 
+def get_state_file_path(config, filename: str) -> str:
+    """
+    Gets the path of a file in the state location, where ReBACH keeps information between runs.
+    The state location is created if it does not exist.
+
+    :param  config:  Configuration to get the state location
+    :type: dict
+
+    :param  filename:  Name of the file
+    :type: str
+
+    :return: Path of the file, or empty string if no state location is configured
+    :rtype: str
+    """
+    state_location = config.get('state_location', '')
+    if state_location is None or state_location == '':
+        return ''
+    os.makedirs(state_location, exist_ok=True)
+    return os.path.join(state_location, filename)
+
+
 def upload_to_remote() -> bool:
     """
     Checks if packages are uploaded to a remote storage
@@ -502,28 +797,12 @@ def upload_to_remote() -> bool:
         return True
 
 
-def get_filenames_and_sizes_from_ls(ls: str) -> list:
-    """
-    Extracts names of files and their sizes from ls command. It returns
-    a list of tuples. Each tuple contains filename and size
-
-    :param  ls:  Result from ls command
-    :type: str
-
-    :return: list of tuples
-    :rtype: list
-    """
-    lines = ls.splitlines()
-    return [(line.rsplit('/', 1)[-1], line.split()[-2]) for line in lines if
-            line.rsplit('/', 1)[-1] != '']
-
-
-def calculate_ual_rdm_size(config, article_id: int, version: str):
+def calculate_ual_rdm_size(curation_index: CurationIndex, article_id: int, version: str):
     """
     Calculates the size of version UAL_RDM folder
 
-    :param  config:  Configuration to get curation storage
-    :type: dict
+    :param  curation_index: Index of curation storage
+    :type: CurationIndex
 
     :param  article_id: Article ID
     :type: int
@@ -535,38 +814,7 @@ def calculate_ual_rdm_size(config, article_id: int, version: str):
              folders in the path to UAL_RDM is missing
     :rtype: int
     """
-    article_dir = ""
-    article_version_dir = ""
-    article_version_ual_rdm = ""
-    version_ual_rdm_size = 0
-    curation_storage = config['curation_storage_location']
-    if os.path.exists(curation_storage) and os.access(curation_storage, os.R_OK):
-        curation_storage_items = os.scandir(curation_storage)
-        for item in curation_storage_items:
-            if item.is_dir() and item.name.__contains__(str(article_id)):
-                article_dir = os.path.join(curation_storage, item.name)
-                break
-        if not os.path.exists(article_dir):
-            return 0
-        for item in os.scandir(article_dir):
-            if item.is_dir() and item.name.__contains__(version):
-                article_version_dir = os.path.join(article_dir, item.name)
-                break
-
-        if not os.path.exists(article_version_dir):
-            return 0
-        for item in os.scandir(article_version_dir):
-            if item.is_dir() and item.name.__contains__('UAL_RDM'):
-                article_version_ual_rdm = os.path.join(article_version_dir, item.name)
-                break
-
-        if not os.path.exists(article_version_ual_rdm):
-            return 0
-        for item in os.scandir(article_version_ual_rdm):
-            file_size = os.path.getsize(os.path.join(article_version_ual_rdm, item.name))
-            version_ual_rdm_size += file_size
-
-    return version_ual_rdm_size
+    return curation_index.get_ual_rdm_size(article_id, version)
 
 
 def calculate_json_file_size(version_data: dict) -> int:
@@ -597,14 +845,14 @@ def calculate_json_file_size(version_data: dict) -> int:
     return json_file_size
 
 
-def calculate_payload_size(config: dict, version_data: dict) -> int:
+def calculate_payload_size(version_data: dict, curation_index: CurationIndex) -> int:
     """
     Pre-calculates payload size for package that will be created
 
-    :param  config:  Configuration to get curation storage
-    :type: dict
     :param  version_data: Version response from figshare
     :type: dict
+    :param  curation_index: Index of curation storage
+    :type: CurationIndex
 
     :return: Size of payload in bytes. Returns zero bytes if UAL_RDM is not found
     :rtype: int
@@ -616,7 +864,7 @@ def calculate_payload_size(config: dict, version_data: dict) -> int:
     version = f"v{str(version_no).zfill(2)}"
     if int(version_no) > 9:
         version = f"v{str(version_no)}"
-    version_ual_rdm_size = calculate_ual_rdm_size(config, article_id, version)
+    version_ual_rdm_size = calculate_ual_rdm_size(curation_index, article_id, version)
     if version_ual_rdm_size == 0:
         return 0
     json_file_size = calculate_json_file_size(version_data)
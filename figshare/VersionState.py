@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+PRESERVED = 'preserved'
+
+
+class VersionStateStore:
+
+    def __init__(self, state_file: str) -> None:
+        """
+        On-disk store of the last known state of each article version: the metadata hash, the modified date of
+        the article when the state was recorded, and the outcome of the last run that checked the version. The store
+        can be used from several threads, e.g. the stages of --pipeline.
+
+        :param state_file: Path to the SQLite file holding the store
+        """
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.state_file, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS versions (article_id INTEGER, version INTEGER, md5 TEXT, "
+                                 + "modified_date TEXT, outcome TEXT, updated_at TEXT, PRIMARY KEY (article_id, version))")
+        self._connection.commit()
+
+    def get(self, article_id: int, version: int) -> tuple:
+        """
+        Returns the state of an article version
+
+        :param article_id: Article id
+        :param version: Version number
+        :return: Tuple of metadata hash, modified date and outcome, or None if the version is not in the store
+        """
+        with self._lock:
+            return self._connection.execute("SELECT md5, modified_date, outcome FROM versions WHERE article_id = ? AND version = ?",
+                                            (int(article_id), int(version))).fetchone()
+
+    def set(self, article_id: int, version: int, md5: str, modified_date: str, outcome: str) -> None:
+        """
+        Records the state of an article version
+
+        :param article_id: Article id
+        :param version: Version number
+        :param md5: Metadata hash of the version
+        :param modified_date: Modified date of the article in the Figshare API
+        :param outcome: Outcome of the run for the version, e.g. PRESERVED
+        """
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?)",
+                                     (int(article_id), int(version), md5, modified_date, outcome,
+                                      datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')))
+            self._connection.commit()
+
+    def is_preserved_and_unchanged(self, article_id: int, version: int, modified_date: str) -> bool:
+        """
+        Returns whether an article version was found preserved by a previous run and the article has not been
+        modified since
+
+        :param article_id: Article id
+        :param version: Version number
+        :param modified_date: Current modified date of the article in the Figshare API
+        """
+        if not modified_date:
+            return False
+        state = self.get(article_id, version)
+        return state is not None and state[2] == PRESERVED and state[1] == modified_date
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
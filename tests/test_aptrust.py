@@ -0,0 +1,85 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from figshare.APTrust import APTrustIndex
+
+objects = []
+requested = []
+
+
+class PharosHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the Pharos member API objects endpoint
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        requested.append(query)
+        results = [o for o in objects if o['updated_at'] >= query.get('updated_at__gteq', '')]
+        page = int(query['page'])
+        per_page = int(query['per_page'])
+        results = results[(page - 1) * per_page:page * per_page]
+        body = json.dumps({'results': results or None}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pharos():
+    objects.clear()
+    requested.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PharosHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/member-api/v3'
+    server.shutdown()
+
+
+def add_object(object_id, bag_name, updated_at):
+    objects.append({'id': object_id, 'bag_name': bag_name, 'payload_size': object_id * 10, 'updated_at': updated_at})
+
+
+def test_sync_is_incremental(pharos, tmp_path):
+    for i in range(1, 6):
+        add_object(i, f'azu_{i}-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709', f'2025-07-0{i}T00:00:00Z')
+
+    index = APTrustIndex(str(tmp_path / 'aptrust.sqlite'), pharos, 'user', 'token', items_per_page=2)
+    assert index.sync() == 5
+    assert index.get_watermark() == '2025-07-05T00:00:00Z'
+    index.close()
+
+    add_object(6, 'azu_6-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709', '2025-07-06T00:00:00Z')
+    requested.clear()
+
+    index = APTrustIndex(str(tmp_path / 'aptrust.sqlite'), pharos, 'user', 'token', items_per_page=2)
+    # Only the object at the watermark and the new object are fetched again
+    assert index.sync() == 2
+    assert all(query['updated_at__gteq'] == '2025-07-05T00:00:00Z' for query in requested)
+    assert len(index.get_packages()) == 6
+
+    assert index.sync(rebuild=True) == 6
+    assert len(index.get_packages()) == 6
+    index.close()
+
+
+def test_sync_removes_deleted_objects(pharos, tmp_path):
+    add_object(1, 'azu_1-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709', '2025-07-01T00:00:00Z')
+    add_object(2, 'azu_2-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709', '2025-07-02T00:00:00Z')
+    index = APTrustIndex(str(tmp_path / 'aptrust.sqlite'), pharos, 'user', 'token')
+    index.sync()
+    assert len(index.get_packages()) == 2
+
+    objects[0].update(state='D', updated_at='2025-07-03T00:00:00Z')
+    # The deleted object and the object at the watermark
+    assert index.sync() == 2
+    assert index.get_packages() == [('azu_2-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709', 20)]
+    index.close()
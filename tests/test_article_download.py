@@ -0,0 +1,198 @@
+import os
+import re
+import hashlib
+
+import requests
+
+from figshare.Article import Article
+from figshare.DownloadScheduler import DownloadScheduler
+from figshare.PartialDownload import PartialDownload
+
+DATA = bytes(range(256)) * 40
+
+
+class StubLog:
+
+    def __init__(self):
+        self.messages = []
+
+    def write_log_in_file(self, type, message, show_in_terminal=False, stop_script=False):
+        self.messages.append((type, message))
+
+
+class StubResponse:
+
+    def __init__(self, status_code, body=b'', fail_after=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.fail_after = fail_after
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+    def iter_content(self, chunk_size=8192):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError('Connection broken')
+            yield self.body[start:start + chunk_size]
+
+
+class StubClient:
+    """
+    Stand-in for the Figshare client serving DATA, with or without byte ranges. The first requests are answered with
+    the given error statuses, if any.
+    """
+    def __init__(self, data=DATA, ranges=True, fail_first_after=None, fail_range=None, error_statuses=()):
+        self.data = data
+        self.ranges = ranges
+        self.fail_first_after = fail_first_after
+        self.fail_range = fail_range
+        self.error_statuses = list(error_statuses)
+        self.ranges_requested = []
+
+    def get(self, url, authenticated=False, headers=None, **kwargs):
+        range_header = (headers or {}).get('Range')
+        if self.error_statuses:
+            self.ranges_requested.append(range_header)
+            return StubResponse(self.error_statuses.pop(0), headers={'Retry-After': '0'})
+        fail_after, self.fail_first_after = self.fail_first_after, None
+        if range_header is not None and range_header == self.fail_range:
+            fail_after, self.fail_range = 0, None
+        self.ranges_requested.append(range_header)
+        if range_header is None or not self.ranges:
+            return StubResponse(200, self.data, fail_after)
+        start, end = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header).groups()
+        start = int(start)
+        end = int(end) if end else len(self.data) - 1
+        if start >= len(self.data):
+            return StubResponse(416)
+        return StubResponse(206, self.data[start:end + 1], fail_after)
+
+
+def make_article(tmp_path, client):
+    article = Article.__new__(Article)
+    article.logs = StubLog()
+    article.client = client
+    article.download_scheduler = DownloadScheduler()
+    article.partial_download_dir = str(tmp_path / 'partial')
+    article.retries = 2
+    article.verify_downloads = False
+    article.content_store = None
+    article.file_hash_cache = None
+    article.segmented_download_threshold = 0
+    article.segment_size = 1024
+    article.segment_workers = 2
+    return article
+
+
+def download(article, tmp_path, data=DATA):
+    file = {'id': 1, 'name': 'file.bin', 'size': len(data), 'supplied_md5': hashlib.md5(data).hexdigest(), 'computed_md5': '',
+            'download_url': 'https://ndownloader.figshare.com/files/1'}
+    downloaded = article._Article__download_file(file, {'id': 123, 'version': 1}, str(tmp_path / 'DATA'))
+    file_path = tmp_path / 'DATA' / '1_file.bin'
+    return downloaded, file_path.read_bytes() if file_path.exists() else None
+
+
+def save_partial(tmp_path, data):
+    partial = PartialDownload(str(tmp_path / 'partial'), f"1_{hashlib.md5(DATA).hexdigest()}")
+    with partial.open() as f:
+        f.write(data)
+    partial.update(data)
+    partial.save()
+
+
+def test_interrupted_download_is_resumed(tmp_path):
+    client = StubClient(fail_first_after=8192)
+    assert download(make_article(tmp_path, client), tmp_path) == (True, DATA)
+    assert client.ranges_requested == [None, 'bytes=8192-']
+    assert os.listdir(tmp_path / 'partial') == []
+
+
+def test_download_completed_before_interruption_is_not_requested_again(tmp_path):
+    save_partial(tmp_path, DATA)
+    client = StubClient()
+    assert download(make_article(tmp_path, client), tmp_path) == (True, DATA)
+    # The server answers 416 Range Not Satisfiable for the bytes after the end of the file
+    assert client.ranges_requested == [f'bytes={len(DATA)}-']
+
+
+def test_download_restarts_when_range_is_not_accepted(tmp_path):
+    save_partial(tmp_path, DATA[:4096])
+    client = StubClient(ranges=False)
+    article = make_article(tmp_path, client)
+    assert download(article, tmp_path) == (True, DATA)
+    assert client.ranges_requested == ['bytes=4096-']
+    assert any('cannot be resumed' in message for type, message in article.logs.messages)
+
+
+def test_download_restarts_when_resumed_hash_does_not_match(tmp_path):
+    # The journal matches the partial file, but the bytes received before differ from the file on Figshare
+    save_partial(tmp_path, bytes(4096))
+    client = StubClient()
+    article = make_article(tmp_path, client)
+    assert download(article, tmp_path) == (True, DATA)
+    assert client.ranges_requested == ['bytes=4096-', None]
+    assert any("Hash didn't match after resuming" in message for type, message in article.logs.messages)
+
+
+def test_segmented_download(tmp_path):
+    client = StubClient()
+    article = make_article(tmp_path, client)
+    article.segmented_download_threshold = 4096
+    assert download(article, tmp_path) == (True, DATA)
+    assert sorted(client.ranges_requested) == sorted(f'bytes={start}-{min(start + 1024, len(DATA)) - 1}' for start in range(0, len(DATA), 1024))
+    assert os.listdir(tmp_path / 'partial') == []
+
+
+def test_segmented_download_resumes_received_segments(tmp_path):
+    client = StubClient(fail_range='bytes=2048-3071')
+    article = make_article(tmp_path, client)
+    article.segmented_download_threshold = 4096
+    article.retries = 0
+    assert download(article, tmp_path) == (False, None)
+    received = set(client.ranges_requested) - {'bytes=2048-3071'}
+    client.ranges_requested.clear()
+    # Segments received by the failed attempt are not requested again
+    assert download(article, tmp_path) == (True, DATA)
+    assert 'bytes=2048-3071' in client.ranges_requested
+    assert received.isdisjoint(client.ranges_requested)
+
+
+def test_segmented_download_falls_back_to_single_stream(tmp_path):
+    client = StubClient(ranges=False)
+    article = make_article(tmp_path, client)
+    article.segmented_download_threshold = 4096
+    article.segment_workers = 1
+    assert download(article, tmp_path) == (True, DATA)
+    assert client.ranges_requested == ['bytes=0-1023', None]
+    assert any('did not accept byte ranges' in message for type, message in article.logs.messages)
+
+
+def test_download_retries_transient_error_status(tmp_path):
+    client = StubClient(error_statuses=[503, 429])
+    assert download(make_article(tmp_path, client), tmp_path) == (True, DATA)
+    assert client.ranges_requested == [None, None, None]
+
+
+def test_download_fails_after_retrying_error_status(tmp_path):
+    client = StubClient(error_statuses=[503] * 3)
+    article = make_article(tmp_path, client)
+    assert download(article, tmp_path) == (False, None)
+    assert len(client.ranges_requested) == 3
+    assert any('Status code 503' in message for type, message in article.logs.messages)
+
+
+def test_segmented_download_retries_transient_error_status(tmp_path):
+    client = StubClient(error_statuses=[502])
+    article = make_article(tmp_path, client)
+    article.segmented_download_threshold = 4096
+    assert download(article, tmp_path) == (True, DATA)
+    assert client.ranges_requested[:2] == ['bytes=0-1023', 'bytes=0-1023']
@@ -0,0 +1,133 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from figshare.Client import FigshareClient, async_harvest_available
+from figshare.HTTPCache import HTTPCache
+
+requested = []
+
+
+class FigshareHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the Figshare API, returning the request path and Authorization header
+    """
+    def do_GET(self):
+        requested.append(self.path)
+        if self.path.startswith('/versions/') and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'path': self.path, 'authorization': self.headers.get('Authorization')}).encode()
+        self.send_response({'/missing': 404, '/unavailable': 503}.get(self.path, 200))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path.startswith('/versions/'):
+            self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def figshare():
+    requested.clear()
+    ThreadingHTTPServer.request_queue_size = 64
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FigshareHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_prefetched_responses_are_used_once(figshare, use_async):
+    if use_async and not async_harvest_available():
+        pytest.skip('aiohttp is not installed')
+    client = FigshareClient('secret', retries=0, timeout=5)
+    urls = [f'{figshare}/articles/{i}/versions' for i in range(10)]
+    responses = client.prefetch(urls + [(f'{figshare}/articles', {'page': 2, 'page_size': 100})], authenticated=True,
+                                concurrency=4, use_async=use_async)
+    assert [response.json()['path'] for response in responses[:10]] == [f'/articles/{i}/versions' for i in range(10)]
+    assert all(response.json()['authorization'] == 'token secret' for response in responses)
+    assert len(requested) == 11
+
+    assert client.get(urls[3], authenticated=True).json()['path'] == '/articles/3/versions'
+    page = client.get(f'{figshare}/articles', authenticated=True, params={'page': 2, 'page_size': 100})
+    assert page.status_code == 200
+    assert page.headers['content-type'] == 'application/json'
+    page.raise_for_status()
+    assert len(requested) == 11
+    # A prefetched response is only returned once, and only to a request with the same authentication
+    client.get(urls[3], authenticated=True)
+    client.get(urls[5])
+    assert len(requested) == 13
+
+    client.clear_prefetched()
+    client.get(urls[4], authenticated=True)
+    assert len(requested) == 14
+    client.close()
+
+
+def test_async_prefetches_share_session(figshare):
+    if not async_harvest_available():
+        pytest.skip('aiohttp is not installed')
+    client = FigshareClient(retries=0, timeout=5)
+    client.prefetch([f'{figshare}/articles/1/versions'], concurrency=2, use_async=True)
+    session = client._async_session
+    responses = client.prefetch([f'{figshare}/articles/2/versions', f'{figshare}/missing'], concurrency=2, use_async=True)
+    assert client._async_session is session and not session.closed
+    with pytest.raises(requests.exceptions.HTTPError):
+        responses[1].raise_for_status()
+    client.close()
+    assert session.closed
+
+
+def test_error_status_is_not_retried_by_adapter(figshare):
+    # Callers retry error statuses with their own retry loops
+    client = FigshareClient(retries=3)
+    assert client.get(f'{figshare}/unavailable').status_code == 503
+    assert requested == ['/unavailable']
+
+
+def test_no_prefetch_without_concurrency(figshare):
+    client = FigshareClient()
+    assert client.prefetch([f'{figshare}/articles/1/versions'], concurrency=1) == [None]
+    assert requested == []
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_conditional_requests_are_served_from_cache(figshare, tmp_path, use_async):
+    if use_async and not async_harvest_available():
+        pytest.skip('aiohttp is not installed')
+    client = FigshareClient(cache=HTTPCache(str(tmp_path / 'cache.sqlite')))
+    url = f'{figshare}/versions/1'
+    assert client.get(url, cached=True).json()['path'] == '/versions/1'
+
+    client = FigshareClient(cache=HTTPCache(str(tmp_path / 'cache.sqlite')))
+    response = client.prefetch([url], concurrency=2, use_async=use_async, cached=True)[0]
+    assert response.status_code == 200
+    assert response.json()['path'] == '/versions/1'
+    assert client.get(url, cached=True).json()['path'] == '/versions/1'
+    assert len(requested) == 2
+    # Not prefetched, revalidated and answered with 304
+    assert client.get(url, cached=True).json()['path'] == '/versions/1'
+    assert len(requested) == 3
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), max_size=10)
+    cache.put('a', '"a"', None, b'12345')
+    cache.put('b', None, 'Mon, 01 Jan 2024 00:00:00 GMT', b'12345')
+    cache.touch('a')
+    cache.put('c', '"c"', None, b'12345')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    # Responses without validators are not cached
+    cache.put('d', None, None, b'1')
+    assert cache.get('d') is None
@@ -0,0 +1,27 @@
+import os
+import hashlib
+
+from figshare.ContentStore import ContentStore
+
+
+def test_link_and_collect_garbage(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+    data = b'data file'
+    md5 = hashlib.md5(data).hexdigest()
+    v1_file = tmp_path / 'v01' / 'DATA' / '1_file.txt'
+    v2_file = tmp_path / 'v02' / 'DATA' / '1_file.txt'
+    os.makedirs(v1_file.parent)
+    os.makedirs(v2_file.parent)
+
+    assert not store.link(md5, len(data), str(v2_file))
+    v1_file.write_bytes(data)
+    assert store.add(md5, len(data), str(v1_file))
+    assert store.link(md5, len(data), str(v2_file))
+    assert v2_file.read_bytes() == data
+    assert os.stat(store.get_entry_path(md5, len(data))).st_nlink == 3
+
+    os.remove(v1_file)
+    assert store.collect_garbage() == (0, 0)
+    os.remove(v2_file)
+    assert store.collect_garbage() == (1, len(data))
+    assert not os.path.exists(store.get_entry_path(md5, len(data)))
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from figshare.Curation import CurationIndex, get_directory_file_sizes
+
+
+def make_version(root, author, version, files):
+    ual_rdm = os.path.join(root, author, version, 'UAL_RDM')
+    os.makedirs(ual_rdm)
+    for name, content in files.items():
+        with open(os.path.join(ual_rdm, name), 'w') as f:
+            f.write(content)
+
+
+def test_snapshot_rescans_changed_versions_only(tmp_path):
+    root = str(tmp_path / 'curation')
+    snapshot = str(tmp_path / 'snapshot.json')
+    make_version(root, 'John_Smith_1234567', 'v01', {'a.txt': 'abc'})
+    make_version(root, 'John_Smith_1234567', 'v02', {'a.txt': 'abcd'})
+
+    index = CurationIndex(root, snapshot_file=snapshot)
+    assert index.get_ual_rdm_size('1234567', 'v02') == 4
+    assert index.rescanned_versions == 2
+
+    make_version(root, 'Jane_Doe_7654321', 'v01', {'b.txt': 'ab'})
+    index = CurationIndex(root, snapshot_file=snapshot)
+    assert index.get_author_dirs('7654321') == ['Jane_Doe_7654321']
+    assert index.get_ual_rdm_size('1234567', 'v01') == 3
+    assert index.rescanned_versions == 1
+
+    index = CurationIndex(root, snapshot_file=snapshot, full_scan=True)
+    index.scan()
+    assert index.rescanned_versions == 3
+
+
+def test_snapshot_reuses_ual_rdm_sizes(tmp_path):
+    root = str(tmp_path / 'curation')
+    snapshot = str(tmp_path / 'snapshot.json')
+    make_version(root, 'John_Smith_1234567', 'v01', {'a.txt': 'abc'})
+    ual_rdm = os.path.join(root, 'John_Smith_1234567', 'v01', 'UAL_RDM')
+    os.makedirs(os.path.join(ual_rdm, 'sub'))
+    index = CurationIndex(root, snapshot_file=snapshot, save_snapshot=False)
+    index.scan()
+    assert not os.path.exists(snapshot)
+    CurationIndex(root, snapshot_file=snapshot).scan()
+
+    # Rewritten in place and changed in a subdirectory, without changing the modification time of UAL_RDM
+    mtime_ns = os.stat(ual_rdm).st_mtime_ns
+    with open(os.path.join(ual_rdm, 'a.txt'), 'w') as f:
+        f.write('abcdef')
+    with open(os.path.join(ual_rdm, 'sub', 'b.txt'), 'w') as f:
+        f.write('gh')
+    os.utime(ual_rdm, ns=(mtime_ns, mtime_ns))
+
+    index = CurationIndex(root, snapshot_file=snapshot)
+    assert index.get_version('John_Smith_1234567', 'v01')['ual_rdm_tree_size'] == 3
+    assert index.rescanned_versions == 0
+
+    index = CurationIndex(root, snapshot_file=snapshot, full_scan=True)
+    assert index.get_ual_rdm_size('1234567', 'v01') == 6 + os.stat(os.path.join(ual_rdm, 'sub')).st_size
+    assert index.get_version('John_Smith_1234567', 'v01')['ual_rdm_tree_size'] == 8
+
+
+def test_get_directory_file_sizes(tmp_path):
+    root = str(tmp_path / 'curation')
+    make_version(root, 'John_Smith_1234567', 'v01', {'a.txt': 'abc', 'b.txt': 'de'})
+    os.makedirs(os.path.join(root, 'John_Smith_1234567', 'v01', 'UAL_RDM', 'sub'))
+    with open(os.path.join(root, 'John_Smith_1234567', 'v01', 'UAL_RDM', 'sub', 'c.txt'), 'w') as f:
+        f.write('fghi')
+
+    serial = get_directory_file_sizes(root)
+    parallel = get_directory_file_sizes(root, max_workers=4)
+    assert serial == parallel
+    with ThreadPoolExecutor(max_workers=2) as walker:
+        assert get_directory_file_sizes(root, executor=walker) == serial
+    assert serial[os.path.join(root, 'John_Smith_1234567', 'v01', 'UAL_RDM')] == 5
+    assert sum(serial.values()) == 9
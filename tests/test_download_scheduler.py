@@ -0,0 +1,41 @@
+import time
+import threading
+
+from figshare.DownloadScheduler import DownloadScheduler
+
+
+def test_slots_are_limited_and_fair():
+    scheduler = DownloadScheduler(max_downloads=2, max_downloads_per_host=1)
+    started = []
+    lock = threading.Lock()
+
+    def download(url, owner):
+        with scheduler.slot(url, owner):
+            with lock:
+                started.append(owner)
+                assert scheduler._running <= 2
+                assert all(count <= 1 for count in scheduler._running_per_host.values())
+            time.sleep(0.05)
+
+    # The big version queues its files first, the small version still gets the next free slot on its host
+    threads = [threading.Thread(target=download, args=('https://a.example/' + str(i), 'big')) for i in range(4)]
+    threads.append(threading.Thread(target=download, args=('https://a.example/small', 'small')))
+    threads.append(threading.Thread(target=download, args=('https://b.example/other', 'other')))
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+
+    assert sorted(started) == ['big'] * 4 + ['other', 'small']
+    assert started.index('small') <= 2
+
+
+def test_bandwidth_limit():
+    scheduler = DownloadScheduler(bandwidth_limit=100000)
+    start = time.monotonic()
+    for _ in range(30):
+        scheduler.throttle(10000)
+    # The first second of data is in the bucket, the rest is limited to 100000 bytes per second
+    assert time.monotonic() - start >= 1.5
+    assert scheduler.bytes_downloaded == 300000
@@ -0,0 +1,32 @@
+import os
+import hashlib
+
+from figshare.FileHashCache import FileHashCache
+
+
+def test_hash_reused_until_file_changes(tmp_path):
+    cache = FileHashCache(str(tmp_path / 'file_hashes.sqlite'))
+    data_file = tmp_path / '1_file.txt'
+    data_file.write_bytes(b'data file')
+    md5 = hashlib.md5(b'data file').hexdigest()
+
+    assert cache.get(str(data_file)) is None
+    stat = os.stat(data_file)
+    assert cache.set(str(data_file), md5, stat)
+    assert cache.get(str(data_file)) == md5
+
+    # A hard link shares the inode of the file
+    linked_file = tmp_path / 'linked.txt'
+    os.link(data_file, linked_file)
+    assert cache.get(str(linked_file)) == md5
+
+    data_file.write_bytes(b'changed file')
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.get(str(data_file)) is None
+    # The hash is not recorded if the file changed after the given stat
+    assert not cache.set(str(data_file), md5, stat)
+    cache.close()
+
+    cache = FileHashCache(str(tmp_path / 'file_hashes.sqlite'))
+    assert cache.get(str(data_file)) is None
+    cache.close()
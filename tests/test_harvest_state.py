@@ -0,0 +1,43 @@
+import json
+
+from figshare.HarvestState import HarvestState
+
+
+def test_incremental_after_full_harvest(tmp_path):
+    state_file = str(tmp_path / 'harvest_state.json')
+    state = HarvestState(state_file)
+    assert state.is_full('articles')
+    assert state.get_modified_since('articles') == ''
+    state.commit()
+
+    state = HarvestState(state_file)
+    previous_start = json.load(open(state_file))['articles']['last_harvest']
+    assert not state.is_full('articles')
+    assert state.get_modified_since('collections') == previous_start
+
+    assert HarvestState(state_file, full_harvest=True).get_modified_since('articles') == ''
+
+
+def test_periodic_full_harvest(tmp_path):
+    state_file = str(tmp_path / 'harvest_state.json')
+    with open(state_file, 'w') as f:
+        json.dump({'articles': {'last_harvest': '2025-07-09T00:00:00Z', 'last_full_harvest': '2025-07-01T00:00:00Z'}}, f)
+
+    assert HarvestState(state_file, full_harvest_interval_days=7).is_full('articles')
+    state = HarvestState(state_file, full_harvest_interval_days=0)
+    assert state.get_modified_since('articles') == '2025-07-09T00:00:00Z'
+    # Collections have never been harvested
+    assert state.is_full('collections')
+
+
+def test_failed_ids_are_kept_until_next_run(tmp_path):
+    state_file = str(tmp_path / 'harvest_state.json')
+    HarvestState(state_file).commit({'articles': {3, 1}})
+
+    state = HarvestState(state_file)
+    assert state.get_failed_ids('articles') == [1, 3]
+    assert state.get_failed_ids('collections') == []
+    # A full harvest fetches the failed items with the others
+    assert HarvestState(state_file, full_harvest=True).get_failed_ids('articles') == []
+    state.commit()
+    assert HarvestState(state_file).get_failed_ids('articles') == []
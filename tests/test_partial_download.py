@@ -0,0 +1,73 @@
+import os
+import time
+import hashlib
+
+from figshare.PartialDownload import PartialDownload, remove_stale_partials
+
+
+def write(partial, data):
+    with partial.open() as f:
+        f.write(data)
+    partial.update(data)
+
+
+def test_resume_from_journal(tmp_path):
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    assert partial.resume() == 0
+    write(partial, b'first part ')
+    partial.save()
+    # Bytes written after the last journal update are dropped on resume
+    write(partial, b'unsaved')
+
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    assert partial.resume() == len(b'first part ')
+    write(partial, b'second part')
+    assert partial.hash.hexdigest() == hashlib.md5(b'first part second part').hexdigest()
+
+    partial.complete(str(tmp_path / 'file.bin'))
+    assert (tmp_path / 'file.bin').read_bytes() == b'first part second part'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['file.bin']
+
+
+def test_changed_partial_file_starts_over(tmp_path):
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    write(partial, b'first part')
+    partial.save()
+    with open(partial.part_file, 'r+b') as f:
+        f.write(b'X')
+
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    assert partial.resume() == 0
+    assert not partial.resumed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_resume_segments(tmp_path):
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    assert partial.resume_segments(10, 4) == set()
+    assert (tmp_path / '1_abc.part').stat().st_size == 10
+    partial.save_segment(4)
+
+    partial = PartialDownload(str(tmp_path), '1_abc')
+    assert partial.resume_segments(10, 4) == {4}
+    assert partial.resumed
+    # Segments of another size cannot be reused
+    assert PartialDownload(str(tmp_path), '1_abc').resume_segments(10, 5) == set()
+
+
+def test_remove_stale_partials(tmp_path):
+    partial_dir = str(tmp_path / 'partial')
+    stale = PartialDownload(partial_dir, '1_a')
+    write(stale, b'0123456789')
+    stale.save()
+    recent = PartialDownload(partial_dir, '2_b')
+    write(recent, b'01')
+    recent.save()
+
+    old = time.time() - 8 * 24 * 60 * 60
+    for path in [stale.part_file, stale.journal_file]:
+        os.utime(path, (old, old))
+    stale_size = os.path.getsize(stale.part_file) + os.path.getsize(stale.journal_file)
+    assert remove_stale_partials(partial_dir, 7) == (1, stale_size)
+    assert not os.path.exists(stale.part_file) and not os.path.exists(stale.journal_file)
+    assert os.path.exists(recent.part_file) and os.path.exists(recent.journal_file)
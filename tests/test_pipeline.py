@@ -0,0 +1,46 @@
+import time
+import threading
+
+import pytest
+
+from figshare.Pipeline import Pipeline, Stage
+
+
+def test_stages_overlap_and_process_all_items():
+    results = []
+    lock = threading.Lock()
+    bagging = threading.Event()
+    overlapped = []
+
+    def download(item):
+        # The next item is downloaded while the previous one is bagged
+        if item > 0:
+            overlapped.append(bagging.wait(1))
+        yield item * 10
+
+    def bag(item):
+        bagging.set()
+        time.sleep(0.05)
+        with lock:
+            results.append(item)
+        return []
+
+    stages = [Stage('split', lambda items: items), Stage('download', download, 1, 1), Stage('bag', bag, 2, 1)]
+    Pipeline(stages).run([[0, 1, 2, 3]])
+
+    assert sorted(results) == [0, 10, 20, 30]
+    assert all(overlapped)
+    assert [(stage.items_in, stage.items_out) for stage in stages] == [(1, 4), (4, 4), (4, 0)]
+    assert stages[1].max_queue_depth <= 1
+
+
+def test_error_stops_pipeline():
+    def fail(item):
+        if item == 2:
+            raise SystemExit()
+        return [item]
+
+    stages = [Stage('fail', fail, 1, 1), Stage('collect', lambda item: [], 1, 1)]
+    with pytest.raises(SystemExit):
+        Pipeline(stages).run(range(100))
+    assert stages[1].items_in < 100
@@ -0,0 +1,38 @@
+import io
+import os
+import hashlib
+import tarfile
+
+from figshare.PreviousBag import PreviousBag, find_previous_bag
+
+
+def _make_bag(path, bag_name, files):
+    manifest = ''
+    with tarfile.open(path, 'w') as tar:
+        for name, data in files.items():
+            member_path = f"data/{bag_name}/v01/DATA/{name}"
+            manifest += f"{hashlib.md5(data).hexdigest()} {member_path}\n"
+            info = tarfile.TarInfo(f"{bag_name}/{member_path}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo(f"{bag_name}/manifest-md5.txt")
+        info.size = len(manifest.encode('utf-8'))
+        tar.addfile(info, io.BytesIO(manifest.encode('utf-8')))
+
+
+def test_find_and_extract_previous_bag(tmp_path):
+    bag_name = 'azu_123-v01-Smith-abc_bag1of1_20240101'
+    files = {'1_file.txt': b'data file', 'folder/2_other file.csv': b'a,b\n1,2\n'}
+    _make_bag(str(tmp_path / f"{bag_name}.tar"), bag_name, files)
+    (tmp_path / 'azu_1234-v01-Smith-abc_bag1of1_20240101.tar').write_bytes(b'')
+
+    assert find_previous_bag(str(tmp_path), 123, 1) is None
+    bag_path = find_previous_bag(str(tmp_path), 123, 2)
+    assert bag_path == str(tmp_path / f"{bag_name}.tar")
+
+    with PreviousBag(bag_path) as previous_bag:
+        assert previous_bag.get_data_files() == {name: hashlib.md5(data).hexdigest() for name, data in files.items()}
+        out_file = tmp_path / 'out.csv'
+        assert previous_bag.extract('folder/2_other file.csv', str(out_file)) == hashlib.md5(files['folder/2_other file.csv']).hexdigest()
+        assert out_file.read_bytes() == files['folder/2_other file.csv']
+    assert os.path.exists(bag_path)
@@ -0,0 +1,35 @@
+from figshare.Pipeline import Pipeline, Stage
+from figshare.VersionState import VersionStateStore, PRESERVED
+
+
+def test_preserved_and_unchanged(tmp_path):
+    store = VersionStateStore(str(tmp_path / 'version_state.sqlite'))
+    store.set(1234567, 2, '6de0ea5d4b2317d016c6db397bbebe86', '2025-07-09T10:00:00Z', PRESERVED)
+    assert store.is_preserved_and_unchanged(1234567, 2, '2025-07-09T10:00:00Z')
+    assert not store.is_preserved_and_unchanged(1234567, 2, '2025-07-10T10:00:00Z')
+    assert not store.is_preserved_and_unchanged(1234567, 1, '2025-07-09T10:00:00Z')
+    assert not store.is_preserved_and_unchanged(1234567, 2, '')
+    store.close()
+
+    store = VersionStateStore(str(tmp_path / 'version_state.sqlite'))
+    assert store.get(1234567, 2) == ('6de0ea5d4b2317d016c6db397bbebe86', '2025-07-09T10:00:00Z', PRESERVED)
+    store.close()
+
+
+def test_store_used_by_fetch_stage(tmp_path):
+    # With --pipeline, versions are looked up and recorded in the fetch stage thread, not in the thread that opened the store
+    store = VersionStateStore(str(tmp_path / 'version_state.sqlite'))
+    store.set(1234567, 1, '6de0ea5d4b2317d016c6db397bbebe86', '2025-07-09T10:00:00Z', PRESERVED)
+
+    def fetch(_):
+        for version in [1, 2]:
+            if not store.is_preserved_and_unchanged(1234567, version, '2025-07-09T10:00:00Z'):
+                store.set(1234567, version, '8c2a4b6f3e1d0a9b7c5e3f1a2b4c6d8e', '2025-07-09T10:00:00Z', PRESERVED)
+                yield version
+
+    stages = [Stage('fetch', fetch), Stage('collect', lambda version: [version])]
+    Pipeline(stages).run([None])
+
+    assert stages[1].items_out == 1
+    assert store.is_preserved_and_unchanged(1234567, 2, '2025-07-09T10:00:00Z')
+    store.close()
@@ -0,0 +1,45 @@
+import pytest
+
+from bagger.wasabi import Wasabi, get_filenames_and_sizes_from_ls
+
+moto_server = pytest.importorskip('moto.server')
+boto3 = pytest.importorskip('boto3')
+
+bag = 'azu_1234567-v02-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709.tar'
+
+
+@pytest.fixture
+def s3host():
+    server = moto_server.ThreadedMotoServer(ip_address='127.0.0.1', port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f'http://{host}:{port}'
+    server.stop()
+
+
+def test_list_objects_prefix(s3host):
+    wasabi = Wasabi('access', 'secret', s3host, 'preservation', '', True, backend='boto3')
+    client = wasabi.get_client()
+    client.create_bucket(Bucket='preservation')
+    client.put_object(Bucket='preservation', Key=bag, Body=b'bag')
+    client.put_object(Bucket='preservation', Key='azu_1234567-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709.tar', Body=b'')
+    client.put_object(Bucket='preservation', Key='folder/' + bag, Body=b'')
+    for i in range(3):
+        client.put_object(Bucket='preservation', Key=f'azu_{i}-v01-Smith-6de0ea5d4b2317d016c6db397bbebe86_bag1of1_20250709.tar', Body=b'')
+
+    objects, error = wasabi.list_objects('azu_1234567-v02-')
+    assert error == ''
+    assert objects == [(bag, 3)]
+
+    objects, error = wasabi.list_objects()
+    assert error == ''
+    assert len(objects) == 5
+
+    objects, error = Wasabi('access', 'secret', s3host, 'missing', '', True, backend='boto3').list_objects()
+    assert objects == []
+    assert error != ''
+
+
+def test_get_filenames_and_sizes_from_ls():
+    ls = f"                          DIR  s3://preservation/folder/\n2025-07-09 10:00         3  s3://preservation/{bag}\n"
+    assert get_filenames_and_sizes_from_ls(ls) == [(bag, 3)]